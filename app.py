@@ -2,6 +2,7 @@ import streamlit as st
 import json
 import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from unified_retrieval import UnifiedRetrievalSystem
 from response_generator import ResponseGenerator
 from login import show_login_page, check_authentication, logout
@@ -299,22 +300,39 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def _create_systems():
+    """Construit la recherche et le générateur (modèle, index, Gemini)"""
+    # Essayer FAISS d'abord, fallback sur TF-IDF
+    retrieval = UnifiedRetrievalSystem("knowledge_base.json", use_faiss=True, query_batching=True, hybrid=True,
+                                       embedding_cache_path="unified_query_embeddings.bin")
+    
+    # Vérifier quelle technologie est utilisée
+    if retrieval.use_faiss:
+        print("🚀 FAISS activé - Recherche sémantique avancée")
+    else:
+        print("🔍 TF-IDF activé - Recherche standard")
+        
+    response_gen = ResponseGenerator(retrieval, shared_cache_path="zamapay_cache.sqlite3")
+    return retrieval, response_gen
+
 @st.cache_resource
+def start_systems_loading():
+    """Lance le chargement en arrière-plan (une seule fois par processus)"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="zamapay-init")
+    return executor.submit(_create_systems)
+
 def initialize_systems():
+    """Attend la fin du chargement lancé par start_systems_loading"""
+    future = start_systems_loading()
     try:
-        # Essayer FAISS d'abord, fallback sur TF-IDF
-        retrieval = UnifiedRetrievalSystem("knowledge_base.json", use_faiss=True)
-        
-        # Vérifier quelle technologie est utilisée
-        if retrieval.use_faiss:
-            print("🚀 FAISS activé - Recherche sémantique avancée")
-        else:
-            print("🔍 TF-IDF activé - Recherche standard")
-            
-        response_gen = ResponseGenerator(retrieval)
-        return retrieval, response_gen
+        if not future.done():
+            with st.spinner("⏳ Chargement de l'assistant..."):
+                return future.result()
+        return future.result()
         
     except Exception as e:
+        # Un nouveau chargement sera tenté au prochain rechargement
+        start_systems_loading.clear()
         st.error(f"❌ Erreur initialisation: {str(e)}")
         return None, None
 
@@ -402,10 +420,21 @@ def process_message(text, response_gen):
         st.session_state.messages.append(user_message)
         print(f"💬 Message utilisateur ajouté: {text[:50]}...")
         
-        with st.spinner("🔍 Analyse..."):
-            start = time.time()
-            response = response_gen.generate_response(text, st.session_state.user_name)
-            duration = time.time() - start
+        # Affichage immédiat de la question, puis de la réponse au fil du streaming
+        st.markdown(f'<div class="message-wrapper"><div class="user-message">{text}</div></div>', unsafe_allow_html=True)
+        placeholder = st.empty()
+        placeholder.markdown("🔍 Analyse...")
+        
+        start = time.time()
+        stream = response_gen.generate_response_stream(text, st.session_state.user_name)
+        partial = ""
+        for chunk in stream:
+            partial += chunk
+            placeholder.markdown(f'<div class="message-wrapper"><div class="assistant-message">{partial}▌</div></div>', unsafe_allow_html=True)
+        duration = time.time() - start
+        
+        # Réponse complète (texte final, confiance) disponible une fois le flux terminé
+        response = stream.response or {'response': partial or 'Erreur', 'source': 'system'}
         
         # Mettre à jour le compteur de conversations
         auth_system.update_user_conversation_count(st.session_state.user_email)
@@ -419,6 +448,8 @@ def process_message(text, response_gen):
             "time": duration,
             "timestamp": datetime.now().isoformat()
         }
+        if response.get('first_token_time') is not None:
+            assistant_message["first_token_time"] = response['first_token_time']
         st.session_state.messages.append(assistant_message)
         print(f"🤖 Réponse assistant ajoutée: {response.get('source', 'unknown')}")
         
@@ -887,6 +918,9 @@ def main():
     if "messages_loaded" not in st.session_state:
         st.session_state.messages_loaded = False
     
+    # Le modèle et les index se chargent pendant l'affichage de la connexion
+    start_systems_loading()
+    
     if not check_authentication():
         show_login_page()
     else:
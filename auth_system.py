@@ -1,4 +1,3 @@
-import streamlit as st
 import json
 import hashlib
 import secrets
@@ -7,6 +6,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import time
 import re
+from lazy_loading import LazyInstance
 
 class AuthenticationSystem:
     def __init__(self, users_file="users.json"):
@@ -313,4 +313,5 @@ class AuthenticationSystem:
             self.save_users()
 
 # Instance globale du système d'authentification
-auth_system = AuthenticationSystem()
+# Construit (lecture de users.json) au premier accès plutôt qu'à l'import
+auth_system = LazyInstance(AuthenticationSystem)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark des conversations simultanées: generate_response (un thread par session)
+contre agenerate_response (une boucle d'événements + pool de recherche)
+Les deux modes disposent du même nombre de threads; l'aller-retour Gemini est
+simulé par une latence fixe (ou réel avec --live)
+
+Usage: python benchmark_sessions.py [--sessions 200] [--threads 8] [--gemini-latency 1.5] [--live]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from response_generator import ResponseGenerator
+
+
+class SimulatedResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class SimulatedGemini:
+    """Modèle Gemini de benchmark: latence réseau fixe, sans consommation de CPU"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        time.sleep(self.latency)
+        return SimulatedResponse(f"Réponse simulée ({len(prompt)} caractères de contexte).")
+
+    async def generate_content_async(self, prompt, request_options=None):
+        await asyncio.sleep(self.latency)
+        return SimulatedResponse(f"Réponse simulée ({len(prompt)} caractères de contexte).")
+
+
+class InFlight:
+    """Compte les sessions en cours de traitement et retient le maximum"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def build_questions(knowledge_base_path: str, sessions: int) -> List[str]:
+    """Questions de la base, rendues uniques pour que les caches ne court-circuitent pas le pipeline"""
+    with open(knowledge_base_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    questions = [qa['question_principale'] for qa in data.get('qa_pairs', []) if qa.get('question_principale')]
+    questions = questions or ["Pourquoi comparer les frais de transfert ?"]
+    return [f"Pourquoi {questions[i % len(questions)].rstrip(' ?').lower()} (session {i}) ?" for i in range(sessions)]
+
+
+def make_generator(retrieval, args) -> ResponseGenerator:
+    generator = ResponseGenerator(retrieval, retrieval_workers=args.threads)
+    if not args.live or generator.gemini_model is None:
+        generator.gemini_model = SimulatedGemini(args.gemini_latency)
+    return generator
+
+
+def run_sync(generator: ResponseGenerator, questions: List[str], threads: int, in_flight: InFlight) -> List[float]:
+    """Modèle actuel: chaque session occupe un thread pendant tout le pipeline"""
+    # Toutes les sessions arrivent ensemble: la latence inclut l'attente d'un thread libre
+    start = time.perf_counter()
+
+    def session(question):
+        with in_flight:
+            generator.generate_response(question, "Benchmark")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(session, questions))
+
+
+def run_async(generator: ResponseGenerator, questions: List[str], in_flight: InFlight) -> List[float]:
+    """Toutes les sessions sur une boucle; seuls la recherche et les caches prennent un thread"""
+    start = time.perf_counter()
+
+    async def session(question):
+        with in_flight:
+            await generator.agenerate_response(question, "Benchmark")
+        return time.perf_counter() - start
+
+    async def main():
+        return await asyncio.gather(*(session(question) for question in questions))
+
+    return asyncio.run(main())
+
+
+def measure(mode: str, run) -> Dict:
+    """Exécute un mode et calcule débit, latences et sessions simultanées par cœur"""
+    cores = os.cpu_count() or 1
+    in_flight = InFlight()
+    peak_threads = threading.active_count()
+    stop = threading.Event()
+
+    def sample_threads():
+        nonlocal peak_threads
+        while not stop.wait(0.01):
+            peak_threads = max(peak_threads, threading.active_count())
+
+    sampler = threading.Thread(target=sample_threads, daemon=True)
+    sampler.start()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies = sorted(run(in_flight))
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    stop.set()
+    sampler.join()
+
+    throughput = len(latencies) / wall
+    return {
+        'mode': mode,
+        'sessions': len(latencies),
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'throughput': throughput,
+        'p50_s': latencies[len(latencies) // 2],
+        'p95_s': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        'peak_threads': peak_threads,
+        # Conversations traitées en même temps (et non en file d'attente), par cœur
+        'concurrent_per_core': in_flight.peak / cores,
+        'throughput_per_core': throughput / cores,
+    }
+
+
+def print_report(rows: List[Dict]):
+    """Affiche le rapport sous forme de tableau"""
+    print(f"\n{'Mode':<7} {'Sessions':>8} {'Durée':>8} {'Débit':>9} {'p50':>7} {'p95':>7} "
+          f"{'Threads':>8} {'Simult./cœur':>13} {'Débit/cœur':>11}")
+    for row in rows:
+        print(f"{row['mode']:<7} {row['sessions']:>8} {row['wall_s']:>7.2f}s {row['throughput']:>7.1f}/s "
+              f"{row['p50_s']:>6.2f}s {row['p95_s']:>6.2f}s {row['peak_threads']:>8} "
+              f"{row['concurrent_per_core']:>13.1f} {row['throughput_per_core']:>9.2f}/s")
+    if len(rows) == 2 and rows[0]['throughput']:
+        print(f"\n⚡ Sessions servies par cœur: x{rows[1]['throughput_per_core'] / rows[0]['throughput_per_core']:.1f} "
+              f"({os.cpu_count()} cœurs)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark sync / async du générateur de réponses")
+    parser.add_argument('--sessions', type=int, default=200, help="Conversations simultanées")
+    parser.add_argument('--threads', type=int, default=8, help="Threads disponibles dans chaque mode")
+    parser.add_argument('--gemini-latency', type=float, default=1.5, help="Latence Gemini simulée (s)")
+    parser.add_argument('--live', action='store_true', help="Appels Gemini réels (clé .env requise)")
+    parser.add_argument('--faiss', action='store_true', help="Recherche dense au lieu de TF-IDF")
+    parser.add_argument('--knowledge-base', default="knowledge_base.json")
+    args = parser.parse_args()
+
+    from unified_retrieval import UnifiedRetrievalSystem
+    print("🔧 Chargement du système de recherche...")
+    with contextlib.redirect_stdout(io.StringIO()):
+        retrieval = UnifiedRetrievalSystem(
+            args.knowledge_base, use_faiss=args.faiss,
+            tfidf_index_path=os.path.join(tempfile.gettempdir(), "zamapay_benchmark_tfidf.bin")
+        )
+        retrieval.search("warm-up")
+
+    questions = build_questions(args.knowledge_base, args.sessions)
+    rows = []
+    for mode in ('sync', 'async'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = make_generator(retrieval, args)
+        print(f"⏱️ Mode {mode}: {args.sessions} sessions, {args.threads} threads...")
+        if mode == 'sync':
+            rows.append(measure(mode, lambda in_flight: run_sync(generator, questions, args.threads, in_flight)))
+        else:
+            rows.append(measure(mode, lambda in_flight: run_async(generator, questions, in_flight)))
+
+    print_report(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
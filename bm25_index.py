@@ -0,0 +1,93 @@
+"""
+Index inversé BM25 pour la recherche lexicale ZamaPay
+Complète la recherche dense sur les termes exacts ("Orange Money", "UEMOA", montants...)
+"""
+
+import re
+import math
+import numpy as np
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Découpe un texte en termes minuscules"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class BM25Index:
+    """Index inversé BM25 (Okapi) sur des textes courts (questions et variations)"""
+
+    def __init__(self, texts: List[str], k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            texts: Textes indexés (une ligne par texte)
+            k1: Saturation de la fréquence des termes
+            b: Normalisation par la longueur du texte
+        """
+        self.k1 = k1
+        self.b = b
+        self.n_rows = len(texts)
+
+        postings = defaultdict(list)
+        lengths = np.zeros(self.n_rows, dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                postings[term].append((row, tf))
+
+        avg_length = float(lengths.mean()) if self.n_rows and lengths.mean() > 0 else 1.0
+        length_norm = k1 * (1 - b + b * lengths / avg_length)
+
+        # Postings: lignes et poids BM25 précalculés (idf * tf saturé)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.idf: Dict[str, float] = {}
+        row_norms = np.zeros(self.n_rows, dtype=np.float32)
+        for term, entries in postings.items():
+            rows = np.array([row for row, _ in entries], dtype=np.int32)
+            tf = np.array([tf for _, tf in entries], dtype=np.float32)
+            idf = math.log(1 + (self.n_rows - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.idf[term] = idf
+            self.postings[term] = (rows, idf * tf * (k1 + 1) / (tf + length_norm[rows]))
+            row_norms[rows] += idf * idf
+
+        # Norme idf des termes distincts de chaque ligne (similarité lexicale bornée)
+        self.row_norms = np.sqrt(row_norms)
+
+        # idf d'un terme absent du corpus (le plus rare possible)
+        self.unknown_idf = math.log(1 + (self.n_rows + 0.5) / 0.5)
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores BM25 d'une requête sur toutes les lignes
+
+        Returns:
+            (scores BM25, similarité) — la similarité est le cosinus entre les
+            ensembles de termes pondérés par l'idf, entre 0 et 1 (1 si la requête
+            et la ligne ont exactement les mêmes termes)
+        """
+        scores = np.zeros(self.n_rows, dtype=np.float32)
+        overlap = np.zeros(self.n_rows, dtype=np.float32)
+        terms = set(tokenize(query))
+        query_norm = math.sqrt(sum(self.idf.get(term, self.unknown_idf) ** 2 for term in terms))
+
+        for term in terms:
+            if term in self.postings:
+                rows, weights = self.postings[term]
+                scores[rows] += weights
+                overlap[rows] += self.idf[term] ** 2
+
+        norms = self.row_norms * query_norm
+        similarity = np.divide(overlap, norms, out=np.zeros_like(overlap), where=norms > 0)
+        return scores, similarity
+
+    def score_batch(self, queries: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores et similarités (n_requêtes, n_lignes) de plusieurs requêtes"""
+        scored = [self.score(query) for query in queries]
+        if not scored:
+            empty = np.zeros((0, self.n_rows), dtype=np.float32)
+            return empty, empty
+        return np.vstack([s for s, _ in scored]), np.vstack([c for _, c in scored])
@@ -0,0 +1,168 @@
+"""
+Cache borné LRU + TTL, thread-safe, avec statistiques
+Remplace les dictionnaires de cache sans éviction (ex: ResponseGenerator.kb_cache):
+taille limitée en entrées et en octets, expiration, compteurs de succès / évictions
+et temps de calcul économisé
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """Taille approximative en octets d'une valeur et de son contenu (objets partagés comptés une fois)"""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+    return size
+
+
+class BoundedCache:
+    """Cache LRU borné (entrées et octets) avec expiration par TTL"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 3600,
+        sizeof: Callable[[Any], int] = estimate_size
+    ):
+        """
+        Args:
+            max_entries: Nombre maximal d'entrées (la moins récemment utilisée est évincée)
+            max_bytes: Taille maximale estimée du contenu
+            ttl: Durée de validité d'une entrée en secondes
+            sizeof: Estimation de la taille d'une valeur en octets
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+
+        self._entries = OrderedDict()   # clé -> (valeur, taille, date d'insertion)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._last_purge = time.time()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._compute_ms = 0.0
+        self._computed = 0
+        self._hit_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.time() - entry[2] < self.ttl
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _purge_expired(self, now: float):
+        """Retire toutes les entrées expirées (au plus une fois par intervalle)"""
+        if now - self._last_purge < min(self.ttl, 60):
+            return
+        self._last_purge = now
+        for key in [key for key, (_, _, created) in self._entries.items() if now - created >= self.ttl]:
+            self._remove(key)
+            self.expirations += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Valeur en cache (marquée comme récemment utilisée) ou default"""
+        start = time.perf_counter()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[2] >= self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._hit_ms += (time.perf_counter() - start) * 1000
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, compute_ms: Optional[float] = None):
+        """
+        Ajoute une valeur puis évince les entrées les moins récentes au-delà des limites
+
+        Args:
+            key: Clé
+            value: Valeur
+            compute_ms: Temps passé à calculer la valeur (pour estimer le temps économisé)
+        """
+        size = self.sizeof(value)
+        now = time.time()
+        with self._lock:
+            if compute_ms is not None:
+                self._compute_ms += compute_ms
+                self._computed += 1
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size, now)
+            self._bytes += size
+            self._purge_expired(now)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute_fn: Callable[[], Any]) -> Any:
+        """Valeur en cache, ou calculée par compute_fn puis mise en cache"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        start = time.perf_counter()
+        value = compute_fn()
+        self.put(key, value, compute_ms=(time.perf_counter() - start) * 1000)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Compteurs: succès, échecs, évictions, expirations, octets et latences moyennes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_compute_ms = self._compute_ms / self._computed if self._computed else 0.0
+            avg_hit_ms = self._hit_ms / self.hits if self.hits else 0.0
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'avg_miss_compute_ms': avg_compute_ms,
+                'avg_hit_ms': avg_hit_ms,
+                'estimated_time_saved_ms': self.hits * max(avg_compute_ms - avg_hit_ms, 0.0),
+            }
@@ -0,0 +1,245 @@
+"""
+Stockage colonnaire mappable en mémoire pour les métadonnées d'index ZamaPay
+Remplace les pickles: chaque colonne texte est un tableau d'offsets + un blob UTF-8,
+décodé ligne par ligne uniquement quand elle est lue
+"""
+
+import os
+import json
+import tempfile
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ALIGNMENT = 64
+
+COLUMNAR_MAGIC = b"ZPCOLS\x00\x00"
+COLUMNAR_VERSION = 1
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def temporary_path(path: str) -> str:
+    """
+    Fichier temporaire unique à côté de path, à renommer sur path avec os.replace
+
+    Un nom propre à chaque écriture évite que deux processus qui sauvegardent le
+    même index écrivent dans le même fichier temporaire.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory or '.')
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)  # mkstemp crée en 0600
+    return tmp_path
+
+
+def write_array_file(path: str, magic: bytes, version: int, header: Dict, arrays: Dict[str, np.ndarray]):
+    """
+    Écrit un fichier binaire versionné: en-tête JSON puis tableaux alignés sur 64 octets
+
+    Format: MAGIC (8 octets) | version (uint32) | réservé (uint32) | taille en-tête (uint64)
+            | en-tête JSON (UTF-8) | tableaux
+
+    L'écriture passe par un fichier temporaire unique renommé atomiquement
+    (supprimé en cas d'échec).
+
+    Args:
+        path: Chemin du fichier
+        magic: Signature de 8 octets du format
+        version: Version du format
+        header: En-tête JSON-sérialisable (la clé 'arrays' est renseignée ici)
+        arrays: Tableaux numpy à écrire
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header = dict(header, arrays={})
+
+    # Deux passes: la taille de l'en-tête détermine les offsets des tableaux
+    header_bytes = b""
+    for _ in range(2):
+        offset = _align(24 + len(header_bytes))
+        for name, array in arrays.items():
+            header['arrays'][name] = {
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': offset,
+            }
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    tmp_path = temporary_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(magic)
+            f.write(np.array([version, 0], dtype='<u4').tobytes())
+            f.write(np.array([len(header_bytes)], dtype='<u8').tobytes())
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.write(b"\x00" * (header['arrays'][name]['offset'] - f.tell()))
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_array_file(path: str, magic: bytes, version: int) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """
+    Lit l'en-tête d'un fichier écrit par write_array_file et mappe ses tableaux en mémoire
+
+    Returns:
+        (en-tête, tableaux en lecture seule)
+
+    Raises:
+        ValueError: si la signature ou la version ne correspondent pas
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"Fichier invalide: {path}")
+        file_version, _ = np.frombuffer(f.read(8), dtype='<u4')
+        if int(file_version) != version:
+            raise ValueError(f"Version non supportée: {file_version}")
+        header_len = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+        header = json.loads(f.read(header_len).decode('utf-8'))
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        shape = tuple(spec['shape'])
+        dtype = np.dtype(spec['dtype'])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=spec['offset'], shape=shape)
+
+    return header, arrays
+
+
+def _encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+class ColumnarStore:
+    """Table en lecture seule: colonnes texte (offsets + blob UTF-8) et colonnes entières"""
+
+    def __init__(self, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.attributes = header.get('attributes', {})
+        self.row_count = header.get('row_count', 0)
+        self.string_columns = header.get('string_columns', [])
+        self._arrays = arrays
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        string_columns: Dict[str, List[str]],
+        int_columns: Dict[str, np.ndarray] = None,
+        attributes: Dict = None
+    ):
+        """
+        Écrit une table colonnaire
+
+        Args:
+            path: Chemin du fichier
+            string_columns: Colonnes texte de même longueur (une valeur par ligne)
+            int_columns: Tableaux entiers libres (longueurs indépendantes)
+            attributes: Attributs JSON-sérialisables (version, modèle...)
+        """
+        row_counts = {len(values) for values in string_columns.values()}
+        if len(row_counts) > 1:
+            raise ValueError("Les colonnes texte doivent avoir la même longueur")
+
+        arrays = {}
+        for name, values in string_columns.items():
+            arrays[f"{name}.offsets"], arrays[f"{name}.blob"] = _encode_strings(values)
+        for name, values in (int_columns or {}).items():
+            arrays[name] = np.asarray(values, dtype=np.int64)
+
+        header = {
+            'row_count': row_counts.pop() if row_counts else 0,
+            'string_columns': list(string_columns),
+            'attributes': attributes or {},
+        }
+        write_array_file(path, COLUMNAR_MAGIC, COLUMNAR_VERSION, header, arrays)
+
+    @classmethod
+    def open(cls, path: str) -> "ColumnarStore":
+        """Ouvre une table en mappant ses colonnes en mémoire"""
+        header, arrays = read_array_file(path, COLUMNAR_MAGIC, COLUMNAR_VERSION)
+        return cls(header, arrays)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def get(self, column: str, row: int) -> str:
+        """Décode une seule valeur d'une colonne texte"""
+        offsets = self._arrays[f"{column}.offsets"]
+        start, end = int(offsets[row]), int(offsets[row + 1])
+        return bytes(self._arrays[f"{column}.blob"][start:end]).decode('utf-8')
+
+    def column(self, column: str) -> List[str]:
+        """Décode toute une colonne texte"""
+        return [self.get(column, row) for row in range(self.row_count)]
+
+    def int_column(self, name: str) -> np.ndarray:
+        """Tableau entier mappé en mémoire"""
+        return self._arrays[name]
+
+
+class LazyDocumentList:
+    """
+    Liste de documents adossée à une table colonnaire
+
+    Les documents ne sont décodés qu'à l'accès; les documents ajoutés après le
+    chargement restent en mémoire jusqu'à la prochaine sauvegarde.
+    """
+
+    FIELDS = ('question', 'answer', 'category', 'text')
+
+    def __init__(self, store: Optional[ColumnarStore] = None, documents: List[Dict] = None):
+        self._store = store
+        self._stored_count = len(store) if store is not None else 0
+        self._appended = list(documents or [])
+
+    def __len__(self) -> int:
+        return self._stored_count + len(self._appended)
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError(index)
+        if index < self._stored_count:
+            return {field: self._store.get(field, index) for field in self.FIELDS}
+        return self._appended[index - self._stored_count]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, document: Dict):
+        self._appended.append(document)
+
+    def save(self, path: str):
+        """Écrit tous les documents dans une table colonnaire"""
+        documents = list(self)
+
+        # Libère le mappage de l'ancien fichier avant de le remplacer
+        self._store = None
+        self._stored_count = 0
+        self._appended = documents
+
+        ColumnarStore.write(path, {
+            field: [str(document.get(field, '')) for document in documents]
+            for field in self.FIELDS
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "LazyDocumentList":
+        return cls(ColumnarStore.open(path))
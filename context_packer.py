@@ -0,0 +1,176 @@
+"""
+Assemblage du contexte KB du prompt Gemini sous budget de tokens
+Les réponses sont découpées en passages aux limites de sections et de paragraphes
+(jamais au milieu d'une ligne de tableau ou d'une liste); les passages sont retenus
+par pertinence tant qu'ils tiennent dans le budget. Le nombre de tokens de chaque
+passage est mis en cache
+"""
+
+import math
+import re
+import hashlib
+from typing import Callable, Dict, List, Optional
+from bounded_cache import BoundedCache
+from passage_index import chunk_markdown
+
+# Mots, nombres et signes isolés
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimation locale du nombre de tokens Gemini (SentencePiece)
+
+    Un mot compte pour un token par tranche de 4 caractères, chaque signe de
+    ponctuation ou symbole pour un token. Assez proche du décompte réel pour
+    dimensionner un budget, sans appel réseau.
+    """
+    return sum(max(1, math.ceil(len(token) / 4)) for token in TOKEN_PATTERN.findall(text or ""))
+
+
+class TokenCounter:
+    """Décompte de tokens avec cache par texte (les passages de la base reviennent souvent)"""
+
+    def __init__(self, count_fn: Callable[[str], int] = estimate_tokens, max_entries: int = 8192):
+        """
+        Args:
+            count_fn: Décompte d'un texte (ex: estimate_tokens, ou l'API count_tokens de Gemini)
+            max_entries: Nombre de décomptes conservés
+        """
+        self.count_fn = count_fn
+        self.cache = BoundedCache(max_entries=max_entries, ttl=float('inf'))
+
+    def count(self, text: str, cache: bool = True) -> int:
+        """Nombre de tokens d'un texte (cache=False pour un texte qui ne reviendra pas)"""
+        if not cache:
+            return self.count_fn(text)
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return self.cache.get_or_compute(key, lambda: self.count_fn(text))
+
+    def get_stats(self) -> Dict:
+        return self.cache.get_stats()
+
+
+class PackedContext:
+    """Contexte retenu: Q&A dans l'ordre de pertinence, passages dans l'ordre du document"""
+
+    def __init__(self, blocks: List[Dict], tokens: int, budget: int, candidates: int, dropped: int):
+        self.blocks = blocks
+        self.tokens = tokens
+        self.budget = budget
+        self.candidates = candidates
+        self.dropped = dropped
+
+    def __repr__(self):
+        return (f"PackedContext({len(self.blocks)} Q&A, {self.tokens}/{self.budget} tokens, "
+                f"{self.dropped}/{self.candidates} passages écartés)")
+
+
+class ContextPacker:
+    """Remplit un budget de tokens avec les passages KB les plus pertinents"""
+
+    def __init__(self, budget_tokens: int = 1200, counter: Optional[TokenCounter] = None,
+                 max_qa: int = 3, max_chunk_chars: int = 600):
+        """
+        Args:
+            budget_tokens: Tokens maximum pour le contexte KB
+            counter: Décompte des tokens (estimation locale par défaut)
+            max_qa: Nombre maximal de Q&A candidates
+            max_chunk_chars: Taille visée des passages (une ligne n'est jamais coupée)
+        """
+        self.budget_tokens = budget_tokens
+        self.counter = counter or TokenCounter()
+        self.max_qa = max_qa
+        self.max_chunk_chars = max_chunk_chars
+
+    def candidates(self, kb_results: List[Dict], passages_by_qa: Optional[Dict[str, List[Dict]]] = None) -> List[Dict]:
+        """
+        Passages candidats avec leur pertinence et leur coût en tokens
+
+        La pertinence d'un passage est le score de sa Q&A, augmenté (jusqu'au double)
+        pour les passages trouvés par la recherche de passages sur la question.
+        """
+        passages_by_qa = passages_by_qa or {}
+        candidates = []
+        for rank, result in enumerate(kb_results[:self.max_qa]):
+            qa_data = result.get('qa_data', {})
+            if not qa_data.get('question_principale') or not qa_data.get('reponse'):
+                continue
+            qa_score = result.get('score', 0)
+            matched = passages_by_qa.get(str(qa_data.get('id')), [])
+            best_match = max((passage.get('score', 0) for passage in matched), default=0) or 1.0
+            match_scores = {passage['text']: passage.get('score', 0) / best_match for passage in matched}
+
+            for position, chunk in enumerate(chunk_markdown(qa_data['reponse'], self.max_chunk_chars)):
+                text = self._render_chunk(chunk)
+                candidates.append({
+                    'rank': rank,
+                    'position': position,
+                    'heading': chunk['heading'],
+                    'text': chunk['text'],
+                    'relevance': qa_score * (1.0 + match_scores.get(chunk['text'], 0.0)),
+                    'tokens': self.counter.count(text),
+                })
+        return candidates
+
+    def pack(self, kb_results: List[Dict], passages_by_qa: Optional[Dict[str, List[Dict]]] = None) -> PackedContext:
+        """
+        Sélectionne les passages par pertinence décroissante tant que le budget le permet
+
+        Args:
+            kb_results: Résultats de la base (score, qa_data)
+            passages_by_qa: Passages trouvés pour la question, par identifiant de Q&A
+
+        Returns:
+            PackedContext (l'en-tête de chaque Q&A retenue est compté dans le budget)
+        """
+        candidates = self.candidates(kb_results, passages_by_qa)
+        # Tri stable: à pertinence égale, meilleure Q&A puis ordre du document
+        ordered = sorted(candidates, key=lambda c: (-c['relevance'], c['rank'], c['position']))
+
+        header_tokens = {}
+        selected = []
+        used = 0
+        for candidate in ordered:
+            rank = candidate['rank']
+            cost = candidate['tokens']
+            if rank not in header_tokens:
+                header = self._render_header(rank + 1, kb_results[rank]['qa_data']['question_principale'],
+                                             kb_results[rank].get('score', 0))
+                cost += self.counter.count(header)
+            if used + cost > self.budget_tokens:
+                continue
+            if rank not in header_tokens:
+                header_tokens[rank] = cost - candidate['tokens']
+            used += cost
+            selected.append(candidate)
+
+        blocks = []
+        for rank in sorted(header_tokens):
+            qa_data = kb_results[rank]['qa_data']
+            blocks.append({
+                'question': qa_data['question_principale'],
+                'score': kb_results[rank].get('score', 0),
+                'passages': sorted((c for c in selected if c['rank'] == rank), key=lambda c: c['position']),
+            })
+        return PackedContext(blocks, used, self.budget_tokens, len(candidates), len(candidates) - len(selected))
+
+    def render(self, packed: PackedContext) -> List[str]:
+        """Lignes du contexte au format du prompt (Q, sections de réponse, note de pertinence)"""
+        lines = []
+        for number, block in enumerate(packed.blocks, start=1):
+            lines.extend(self._render_header(number, block['question'], block['score']).split("\n"))
+            for passage in block['passages']:
+                lines.append(self._render_chunk(passage))
+            lines.append("")  # Ligne vide pour la lisibilité
+        return lines
+
+    @staticmethod
+    def _render_header(number: int, question: str, score: float) -> str:
+        relevance_note = "📊 Pertinence élevée" if score > 0.7 else "📊 Information connexe"
+        return f"{number}. **Q**: {question}\n   *{relevance_note}*"
+
+    @staticmethod
+    def _render_chunk(chunk: Dict) -> str:
+        heading = f" ({chunk['heading']})" if chunk['heading'] else ""
+        return f"   **R**{heading}: {chunk['text']}"
@@ -3,6 +3,7 @@ import json
 import os
 from datetime import datetime
 from config import APP_NAME
+from lazy_loading import LazyInstance
 
 class ConversationManager:
     def __init__(self):
@@ -90,4 +91,5 @@ class ConversationManager:
         return "Réponse non disponible"
 
 # Instance globale
-conversation_manager = ConversationManager()
+# Dossiers créés au premier accès plutôt qu'à l'import
+conversation_manager = LazyInstance(ConversationManager)
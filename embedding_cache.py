@@ -0,0 +1,210 @@
+"""
+Cache LRU des embeddings de requêtes pour les systèmes de recherche ZamaPay
+Clé: identifiant du modèle + requête normalisée; les formulations répétées d'une même
+question ("C'est combien les frais ?") ne repassent ni par l'encodeur ni par l'API
+"""
+
+import os
+import re
+import atexit
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from columnar_store import read_array_file, write_array_file
+
+# Format binaire commun (voir columnar_store.write_array_file)
+MAGIC = b"ZPQEMB\x00\x00"
+FORMAT_VERSION = 1
+
+_WHITESPACE = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([?!.,;:])")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Forme canonique d'une requête: Unicode NFKC, minuscules, apostrophes droites,
+    espaces fusionnés et ponctuation finale retirée
+    """
+    text = unicodedata.normalize('NFKC', text).lower().replace('’', "'")
+    text = _SPACE_BEFORE_PUNCTUATION.sub(r"\1", _WHITESPACE.sub(" ", text))
+    return text.strip().rstrip("?!. ").strip()
+
+
+class EmbeddingCache:
+    """Cache LRU borné et thread-safe: (modèle, requête normalisée) -> vecteur float32"""
+
+    def __init__(self, max_entries: int = 10_000, path: Optional[str] = None, save_every: int = 50):
+        """
+        Args:
+            max_entries: Nombre maximal d'embeddings conservés (le moins récemment utilisé est évincé)
+            path: Fichier de persistance (chargé à la création, sauvegardé à la sortie du processus);
+                None pour un cache en mémoire seulement
+            save_every: Sauvegarde après ce nombre de nouvelles entrées (0: seulement à la sortie)
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self.load()
+            atexit.register(self._save_if_changed)
+
+    @staticmethod
+    def key(model_id: str, query: str) -> Tuple[str, str]:
+        return (model_id, normalize_query(query))
+
+    def get(self, model_id: str, query: str) -> Optional[np.ndarray]:
+        """Embedding en cache (lecture seule) ou None"""
+        key = self.key(model_id, query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_id: str, query: str, vector: np.ndarray):
+        """Ajoute un embedding (copié en float32 lecture seule)"""
+        self._put(self.key(model_id, query), vector)
+        self._maybe_save()
+
+    def _put(self, key: Tuple[str, str], vector: np.ndarray):
+        vector = np.array(vector, dtype=np.float32).reshape(-1)
+        vector.setflags(write=False)
+        with self._lock:
+            if key not in self._entries:
+                self._unsaved += 1
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(
+        self,
+        model_id: str,
+        queries: Sequence[str],
+        compute_fn: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        Embeddings de plusieurs requêtes; les absentes sont calculées en un seul appel
+
+        Args:
+            model_id: Identifiant du modèle (les vecteurs de modèles différents ne se mélangent pas)
+            queries: Requêtes
+            compute_fn: Encode une liste de requêtes -> matrice (n, dimension)
+
+        Returns:
+            Matrice float32 (n_requêtes, dimension), nouvelle à chaque appel
+        """
+        keys = [self.key(model_id, query) for query in queries]
+        vectors = [None] * len(keys)
+        missing = {}
+
+        with self._lock:
+            for row, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(row)
+                else:
+                    self._entries.move_to_end(key)
+                    vectors[row] = vector
+            self.hits += len(keys) - sum(len(rows) for rows in missing.values())
+            self.misses += sum(len(rows) for rows in missing.values())
+
+        if missing:
+            # Une seule requête encodée par clé, même si elle apparaît plusieurs fois
+            to_compute = [queries[rows[0]] for rows in missing.values()]
+            computed = np.asarray(compute_fn(to_compute), dtype=np.float32).reshape(len(to_compute), -1)
+            for (key, rows), vector in zip(missing.items(), computed):
+                self._put(key, vector)
+                for row in rows:
+                    vectors[row] = vector
+            self._maybe_save()
+
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(vectors).astype(np.float32)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unsaved = 0
+
+    def get_stats(self) -> Dict:
+        """Compteurs du cache (succès, échecs, évictions, taille)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'bytes': sum(vector.nbytes for vector in self._entries.values()),
+                'persistent': self.path is not None,
+            }
+
+    def _maybe_save(self):
+        if self.path and self.save_every and self._unsaved >= self.save_every:
+            self.save()
+
+    def _save_if_changed(self):
+        if self._unsaved:
+            self.save()
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """Sauvegarde les entrées (ordre LRU conservé) dans le format binaire commun"""
+        path = path or self.path
+        if not path:
+            return False
+        with self._lock:
+            items = list(self._entries.items())
+            self._unsaved = 0
+
+        try:
+            header = {'entries': [[model_id, query, int(vector.size)] for (model_id, query), vector in items]}
+            vectors = np.concatenate([vector for _, vector in items]) if items else np.zeros(0, dtype=np.float32)
+            write_array_file(path, MAGIC, FORMAT_VERSION, header, {'vectors': vectors})
+            return True
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde cache d'embeddings: {e}")
+            return False
+
+    def load(self, path: Optional[str] = None) -> int:
+        """Charge un cache sauvegardé; retourne le nombre d'entrées chargées"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            header, arrays = read_array_file(path, MAGIC, FORMAT_VERSION)
+            # Copie: le fichier mappé sera remplacé à la prochaine sauvegarde
+            flat = np.array(arrays['vectors'], dtype=np.float32)
+            offset = 0
+            entries = []
+            for model_id, query, size in header['entries']:
+                entries.append(((model_id, query), flat[offset:offset + size]))
+                offset += size
+        except Exception as e:
+            print(f"⚠️ Cache d'embeddings illisible ({e}), cache vide utilisé")
+            return 0
+
+        for key, vector in entries[-self.max_entries:]:
+            self._put(key, vector)
+        with self._lock:
+            self._unsaved = 0
+        print(f"📂 Cache d'embeddings chargé: {len(entries)} requêtes")
+        return len(entries)
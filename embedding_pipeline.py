@@ -0,0 +1,292 @@
+"""
+Pipeline d'embedding en masse pour FAISSGeminiRetrieval
+Requêtes multi-contenus, pool de workers borné, limitation de débit et reprises
+"""
+
+import re
+import time
+import random
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+from resilience import Deadline
+
+EmbedFn = Callable[[List[str]], Sequence[Sequence[float]]]
+
+# Erreurs transitoires (quota, serveur indisponible): reprises avec attente
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# Textes refusés (argument invalide, trop long): lot scindé pour isoler les textes fautifs
+REJECTED_STATUS = {400, 413, 422}
+# Un 400 de clé invalide concerne toute la requête, pas un texte
+FATAL_MARKERS = ("api key", "api_key")
+STATUS_PREFIX = re.compile(r"\s*(\d{3})\b")
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """Code HTTP d'une erreur d'API (google.api_core, requests) ou en tête du message ("429 ...")"""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if isinstance(status, int):
+        return status
+    match = STATUS_PREFIX.match(str(error))
+    return int(match.group(1)) if match else None
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Conduite à tenir après l'échec d'un lot
+
+    Returns:
+        'retry': erreur transitoire ou inconnue, reprise après attente
+        'reject': textes refusés, lot scindé sans reprise
+        'fatal': clé invalide, accès refusé, modèle inconnu... arrêt de tout le pipeline
+    """
+    status = error_status(error)
+    if status is None:
+        return 'reject' if isinstance(error, (ValueError, TypeError)) else 'retry'
+    if status in REJECTED_STATUS:
+        message = str(error).lower()
+        return 'fatal' if any(marker in message for marker in FATAL_MARKERS) else 'reject'
+    if status in RETRYABLE_STATUS or status >= 500:
+        return 'retry'
+    return 'fatal'
+
+
+class EmbeddingError(Exception):
+    """Levée quand des textes n'ont pas pu être encodés après toutes les tentatives"""
+
+    def __init__(self, failed_indices: List[int], last_error: Optional[Exception] = None):
+        self.failed_indices = failed_indices
+        self.last_error = last_error
+        super().__init__(
+            f"{len(failed_indices)} texte(s) non encodé(s) après reprises "
+            f"(dernière erreur: {last_error})"
+        )
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe: `rate` jetons par seconde, rafale de `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Bloque jusqu'à ce que `tokens` jetons soient disponibles"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def gemini_embed_fn(model: str = "models/embedding-001", task_type: str = "retrieval_document") -> EmbedFn:
+    """
+    Fonction d'embedding multi-contenus basée sur l'API Gemini
+
+    Args:
+        model: Modèle d'embedding
+        task_type: Type de tâche Gemini
+
+    Returns:
+        Fonction (textes) -> liste d'embeddings
+    """
+    import google.generativeai as genai
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        result = genai.embed_content(model=model, content=texts, task_type=task_type)
+        return result['embedding']
+
+    return embed
+
+
+class BulkEmbeddingPipeline:
+    """Encode de grands volumes de textes sans jamais insérer de vecteur factice"""
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        dimension: int,
+        batch_size: int = 100,
+        max_workers: int = 4,
+        requests_per_second: float = 20.0,
+        max_retries: int = 5,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        max_retry_time: float = 120.0,
+        progress_callback: Callable[[Dict], None] = None
+    ):
+        """
+        Args:
+            embed_fn: Fonction (textes) -> embeddings, un appel par lot
+            dimension: Dimension attendue des embeddings
+            batch_size: Nombre de textes par requête
+            max_workers: Nombre de requêtes simultanées
+            requests_per_second: Débit maximal de requêtes
+            max_retries: Tentatives supplémentaires par lot (erreurs transitoires)
+            initial_backoff: Attente initiale (s) avant une reprise, doublée à chaque échec
+            max_backoff: Attente maximale (s) entre deux reprises
+            max_retry_time: Durée (s) au-delà de laquelle plus aucune reprise n'est tentée
+            progress_callback: Appelée avec les statistiques après chaque lot terminé
+        """
+        self.embed_fn = embed_fn
+        self.dimension = dimension
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_retry_time = max_retry_time
+        self.progress_callback = progress_callback or self._print_progress
+
+        self._lock = threading.Lock()
+        self.last_stats = {}
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode tous les textes
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Matrice float32 (n_textes, dimension)
+
+        Raises:
+            EmbeddingError: si au moins un texte n'a pas pu être encodé
+        """
+        embeddings = np.zeros((len(texts), self.dimension), dtype='float32')
+        if not texts:
+            return embeddings
+
+        self._stats = {
+            'total': len(texts),
+            'done': 0,
+            'requests': 0,
+            'retries': 0,
+            'failed': [],
+            'last_error': None,
+            'started_at': time.perf_counter(),
+        }
+        self._retry_deadline = Deadline(self.max_retry_time)
+        self._fatal_error = None
+
+        batches = [
+            list(range(start, min(start + self.batch_size, len(texts))))
+            for start in range(0, len(texts), self.batch_size)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda indices: self._embed_indices(texts, indices, embeddings), batches))
+
+        elapsed = time.perf_counter() - self._stats['started_at']
+        self.last_stats = {
+            'total': len(texts),
+            'embedded': self._stats['done'],
+            'failed': len(self._stats['failed']),
+            'requests': self._stats['requests'],
+            'retries': self._stats['retries'],
+            'aborted': self._fatal_error is not None,
+            'elapsed_s': elapsed,
+            'texts_per_second': self._stats['done'] / elapsed if elapsed > 0 else 0.0,
+        }
+
+        if self._stats['failed']:
+            raise EmbeddingError(sorted(self._stats['failed']), self._stats['last_error'])
+
+        return embeddings
+
+    def _embed_indices(self, texts: List[str], indices: List[int], embeddings: np.ndarray):
+        """
+        Encode un lot selon classify_error: reprises avec attente (dans la limite de
+        max_retries et de max_retry_time), scission si des textes sont refusés, arrêt
+        de tous les lots sur une erreur fatale
+        """
+        batch = [texts[i] for i in indices]
+        backoff = self.initial_backoff
+
+        for attempt in range(self.max_retries + 1):
+            if self._fatal_error is not None:
+                self._mark_failed(indices)
+                return
+
+            self.rate_limiter.acquire()
+            try:
+                with self._lock:
+                    self._stats['requests'] += 1
+                vectors = np.asarray(self.embed_fn(batch), dtype='float32')
+                if vectors.shape != (len(batch), self.dimension):
+                    raise ValueError(f"Réponse d'embedding de forme {vectors.shape}, attendu {(len(batch), self.dimension)}")
+
+                embeddings[indices] = vectors
+                with self._lock:
+                    self._stats['done'] += len(indices)
+                    progress = self._progress_snapshot()
+                self.progress_callback(progress)
+                return
+
+            except Exception as e:
+                kind = classify_error(e)
+                with self._lock:
+                    self._stats['last_error'] = e
+                    if kind == 'fatal' and self._fatal_error is None:
+                        self._fatal_error = e
+                        print(f"❌ Embedding interrompu (erreur non récupérable): {e}")
+                if kind == 'fatal':
+                    self._mark_failed(indices)
+                    return
+                if kind == 'reject':
+                    break
+
+                wait = backoff * (1 + random.random() * 0.25)
+                if attempt == self.max_retries or wait > self._retry_deadline.remaining():
+                    self._mark_failed(indices)
+                    print(f"⚠️ Lot de {len(indices)} texte(s) abandonné après reprises: {e}")
+                    return
+                with self._lock:
+                    self._stats['retries'] += 1
+                time.sleep(wait)
+                backoff = min(backoff * 2, self.max_backoff)
+
+        if len(indices) > 1:
+            middle = len(indices) // 2
+            self._embed_indices(texts, indices[:middle], embeddings)
+            self._embed_indices(texts, indices[middle:], embeddings)
+        else:
+            self._mark_failed(indices)
+            print(f"⚠️ Embedding impossible pour le texte {indices[0]}: {self._stats['last_error']}")
+
+    def _mark_failed(self, indices: List[int]):
+        with self._lock:
+            self._stats['failed'].extend(indices)
+
+    def _progress_snapshot(self) -> Dict:
+        elapsed = time.perf_counter() - self._stats['started_at']
+        done = self._stats['done']
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        remaining = self._stats['total'] - done
+        return {
+            'done': done,
+            'total': self._stats['total'],
+            'texts_per_second': throughput,
+            'eta_s': remaining / throughput if throughput > 0 else None,
+            'retries': self._stats['retries'],
+        }
+
+    @staticmethod
+    def _print_progress(progress: Dict):
+        eta = f", reste ~{progress['eta_s']:.0f}s" if progress['eta_s'] is not None else ""
+        print(f"  Traité {progress['done']}/{progress['total']} "
+              f"({progress['texts_per_second']:.1f} textes/s{eta})")
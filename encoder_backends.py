@@ -0,0 +1,214 @@
+"""
+Backends d'encodage des requêtes pour UnifiedRetrievalSystem
+'torch': SentenceTransformer (PyTorch); 'onnx' / 'onnx-int8': ONNX Runtime sur CPU,
+sans import de torch, avec quantification dynamique int8 des poids
+"""
+
+import os
+import numpy as np
+from typing import Dict, List, Sequence
+
+ENCODER_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_qint8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def encoder_available(backend: str) -> bool:
+    """Vérifie que les dépendances d'un backend sont installées (sans les importer)"""
+    import importlib.util
+    if backend == 'torch':
+        modules = ('sentence_transformers',)
+    else:
+        modules = ('onnxruntime', 'tokenizers')
+    return all(importlib.util.find_spec(module) is not None for module in modules)
+
+
+def create_encoder(backend: str, model_name: str, cache_dir: str = "onnx_models", **kwargs):
+    """
+    Crée l'encodeur d'un backend
+
+    Args:
+        backend: Un des ENCODER_BACKENDS
+        model_name: Nom du modèle SentenceTransformer ou dossier local
+        cache_dir: Dossier des modèles ONNX téléchargés ou quantifiés
+
+    Returns:
+        Objet exposant encode(textes, convert_to_numpy=True) comme SentenceTransformer
+    """
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend in ('onnx', 'onnx-int8'):
+        return OnnxEncoder(model_name, quantized=backend == 'onnx-int8', cache_dir=cache_dir, **kwargs)
+    raise ValueError(f"Backend d'encodage inconnu: {backend} (attendu: {', '.join(ENCODER_BACKENDS)})")
+
+
+def _model_directory(model_name: str, cache_dir: str) -> str:
+    """Dossier contenant model.onnx et tokenizer.json (téléchargés depuis le Hub si besoin)"""
+    if os.path.isdir(model_name):
+        return model_name
+
+    local_dir = os.path.join(cache_dir, model_name.replace('/', '--'))
+    if os.path.exists(os.path.join(local_dir, ONNX_MODEL_FILE)) and os.path.exists(os.path.join(local_dir, TOKENIZER_FILE)):
+        return local_dir
+
+    from huggingface_hub import hf_hub_download
+    repo_id = model_name if '/' in model_name else f"sentence-transformers/{model_name}"
+    os.makedirs(local_dir, exist_ok=True)
+    for remote_file, local_file in ((f"onnx/{ONNX_MODEL_FILE}", ONNX_MODEL_FILE), (TOKENIZER_FILE, TOKENIZER_FILE)):
+        downloaded = hf_hub_download(repo_id=repo_id, filename=remote_file)
+        with open(downloaded, 'rb') as source, open(os.path.join(local_dir, local_file), 'wb') as target:
+            target.write(source.read())
+    print(f"📥 Modèle ONNX téléchargé: {repo_id}")
+    return local_dir
+
+
+def quantize_onnx_model(model_path: str, output_path: str) -> str:
+    """Quantification dynamique int8 des poids (activations quantifiées à l'exécution)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    print(f"🗜️ Modèle ONNX quantifié int8: {output_path}")
+    return output_path
+
+
+def export_onnx_model(model_name: str, output_dir: str) -> str:
+    """
+    Exporte le transformer d'un modèle SentenceTransformer en ONNX (nécessite torch)
+
+    Pour les hôtes sans accès au Hub: exporter une fois, puis passer output_dir
+    comme model_name au backend 'onnx'.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device='cpu')
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["ZamaPay"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    class HiddenStates(torch.nn.Module):
+        """Entrées positionnelles -> last_hidden_state (signature stable pour l'export)"""
+
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs)))[0]
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(),
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False
+        )
+    print(f"✅ Modèle exporté en ONNX: {model_path}")
+    return model_path
+
+
+class OnnxEncoder:
+    """Encodeur ONNX Runtime: tokenisation, transformer, mean pooling puis normalisation L2"""
+
+    def __init__(
+        self,
+        model_name: str,
+        quantized: bool = True,
+        cache_dir: str = "onnx_models",
+        max_length: int = 256,
+        batch_size: int = 32,
+        intra_op_threads: int = None
+    ):
+        """
+        Args:
+            model_name: Nom du modèle (téléchargé depuis le Hub) ou dossier contenant
+                model.onnx et tokenizer.json
+            quantized: Utilise le modèle quantifié int8 (créé au premier usage)
+            cache_dir: Dossier des modèles téléchargés ou quantifiés
+            max_length: Longueur maximale en tokens (256 pour all-MiniLM-L6-v2)
+            batch_size: Nombre de textes par passe
+            intra_op_threads: Threads ONNX Runtime par opérateur (défaut: tous les cœurs)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = _model_directory(model_name, cache_dir)
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if quantized:
+            quantized_path = os.path.join(model_dir, ONNX_INT8_MODEL_FILE)
+            if not os.path.exists(quantized_path):
+                quantize_onnx_model(model_path, quantized_path)
+            model_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+        self.model_path = model_path
+
+    def encode(self, texts: Sequence[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Embeddings normalisés (n_textes, dimension), comme SentenceTransformer.encode"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + self.batch_size]))
+            inputs = {
+                'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+                'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+
+            mask = inputs['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+
+        if not batches:
+            dimension = self.session.get_outputs()[0].shape[-1]
+            return np.zeros((0, dimension if isinstance(dimension, int) else 0), dtype=np.float32)
+        return np.vstack(batches).astype(np.float32)
+
+
+def cosine_agreement(embeddings: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """
+    Accord cosinus ligne à ligne entre deux jeux d'embeddings des mêmes textes
+
+    Returns:
+        {'mean': ..., 'min': ...}
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    reference = np.asarray(reference, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1)
+    cosines = (embeddings * reference).sum(axis=1) / np.clip(norms, 1e-12, None)
+    return {'mean': float(cosines.mean()), 'min': float(cosines.min())}
+
+
+def compare_encoders(candidate, reference, texts: List[str]) -> Dict[str, float]:
+    """Accord cosinus entre deux encodeurs sur des textes de validation"""
+    return cosine_agreement(
+        candidate.encode(texts, convert_to_numpy=True),
+        reference.encode(texts, convert_to_numpy=True)
+    )
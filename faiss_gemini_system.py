@@ -5,12 +5,21 @@ Optimisé pour ZamaPay
 
 import os
 import json
+import hashlib
 import numpy as np
 import faiss
 import google.generativeai as genai
 from typing import List, Dict, Tuple
 import pickle
 from dotenv import load_dotenv 
+from embedding_pipeline import BulkEmbeddingPipeline, EmbeddingError, gemini_embed_fn
+from index_wal import WriteAheadLog
+from columnar_store import LazyDocumentList, temporary_path
+from embedding_cache import EmbeddingCache
+from index_factory import (
+    INDEX_MODES, create_index, benchmark_index_modes, print_benchmark_report,
+    apply_search_params, get_search_params
+)
 
 class FAISSGeminiRetrieval:
     """Système FAISS avec API sécurisée"""
@@ -19,14 +28,38 @@ class FAISSGeminiRetrieval:
         self, 
         knowledge_base_path: str = "knowledge_base.json",
         index_path: str = "faiss_index.bin",
-        metadata_path: str = "faiss_metadata.pkl",
-        gemini_api_key: str = None
+        metadata_path: str = "faiss_metadata.zpc",
+        gemini_api_key: str = None,
+        embed_fn=None,
+        query_embed_fn=None,
+        embedding_workers: int = 4,
+        embedding_requests_per_second: float = 20.0,
+        compaction_threshold: int = 500,
+        index_mode: str = 'auto',
+        pca_dim: int = 128,
+        target_recall: float = 0.95,
+        embedding_cache_size: int = 10_000,
+        embedding_cache_path: str = None
     ):
         # Initialiser les chemins
         self.knowledge_base_path = knowledge_base_path
         self.index_path = index_path
         self.metadata_path = metadata_path
         
+        # Journal des ajouts, fusionné dans l'index principal tous les `compaction_threshold` documents
+        self.wal = WriteAheadLog(f"{index_path}.wal")
+        self.compaction_threshold = compaction_threshold
+        
+        # Type d'index à la construction ('auto' choisit flat / IVF / HNSW selon la taille)
+        self.index_mode = index_mode
+        self.pca_dim = pca_dim
+        self.target_recall = target_recall
+        
+        # Embeddings des requêtes déjà vues: pas de nouvel appel API pour une question répétée
+        self.query_embedding_model = "models/embedding-001:retrieval_query"
+        self.query_embed_fn = query_embed_fn
+        self.embedding_cache = EmbeddingCache(embedding_cache_size, embedding_cache_path)
+        
         # Charger depuis .env si pas fourni
         load_dotenv()
         
@@ -46,14 +79,25 @@ class FAISSGeminiRetrieval:
         self.chat_model = genai.GenerativeModel('gemini-2.5-flash')
         
         # Charger ou créer l'index
-        self.documents = []
+        self._kb_digest = None
+        self.documents = LazyDocumentList()
         self.index = None
         self.dimension = 768 
         
+        # Pipeline d'embedding en masse (fonctions d'embedding injectables pour les tests)
+        self.embedding_pipeline = BulkEmbeddingPipeline(
+            embed_fn or gemini_embed_fn("models/embedding-001", "retrieval_document"),
+            dimension=self.dimension,
+            max_workers=embedding_workers,
+            requests_per_second=embedding_requests_per_second
+        )
+        
         self._load_or_create_index()
     
     def _load_or_create_index(self):
         """Charge l'index existant ou en crée un nouveau"""
+        self._migrate_legacy_metadata()
+        
         if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
             print("📚 Chargement de l'index FAISS existant...")
             self._load_index()
@@ -61,8 +105,33 @@ class FAISSGeminiRetrieval:
             print("🔨 Création d'un nouvel index FAISS...")
             self._create_index()
     
+    @property
+    def kb_version(self) -> str:
+        """
+        Empreinte du contenu des documents indexés (invalide les réponses mises en cache)
+        
+        Calculée une fois après chargement ou reconstruction, puis prolongée à chaque
+        ajout: identique d'un redémarrage à l'autre pour les mêmes documents.
+        """
+        if self._kb_digest is None:
+            digest = ""
+            for document in self.documents:
+                digest = self._chain_digest(digest, document)
+            self._kb_digest = digest
+        return self._kb_digest
+    
+    @staticmethod
+    def _chain_digest(previous: str, document: Dict) -> str:
+        payload = previous + json.dumps(document, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Embeddings de questions (cache d'embeddings puis API Gemini)"""
+        return self._generate_query_embeddings(queries)
+    
     def _create_index(self):
         """Crée un nouvel index FAISS depuis la base de connaissances"""
+        self._kb_digest = None
         # Charger la base de connaissances
         with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
             kb_data = json.load(f)
@@ -72,11 +141,12 @@ class FAISSGeminiRetrieval:
         if not qa_pairs:
             print("⚠️ Aucune paire Q/R trouvée")
             self.index = faiss.IndexFlatL2(self.dimension)
-            self.documents = []
+            self.documents = LazyDocumentList()
             return
         
         # Préparer les documents
-        self.documents = []
+        previous_documents = self.documents
+        self.documents = LazyDocumentList()
         texts_to_embed = []
         
         for pair in qa_pairs:
@@ -98,59 +168,60 @@ class FAISSGeminiRetrieval:
         
         print(f"📝 Génération des embeddings pour {len(texts_to_embed)} documents...")
         
-        # Générer les embeddings
-        embeddings = self._generate_embeddings_batch(texts_to_embed)
+        # Générer les embeddings (aucun vecteur factice: l'index existant est conservé en cas d'échec)
+        try:
+            embeddings = self._generate_embeddings_batch(texts_to_embed)
+        except EmbeddingError as e:
+            print(f"❌ Index non reconstruit: {e}")
+            self.documents = previous_documents
+            self._kb_digest = None
+            return
         
-        # Créer l'index FAISS
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(np.array(embeddings).astype('float32'))
+        # Créer l'index FAISS (entraîné sur les embeddings en mode compressé)
+        embeddings = np.array(embeddings).astype('float32')
+        self.index = create_index(self.index_mode, self.dimension, 'l2', embeddings,
+                                  self.pca_dim, target_recall=self.target_recall)
+        self.index.add(embeddings)
         
-        # Sauvegarder
+        # Sauvegarder (le nouvel index remplace aussi les ajouts journalisés)
         self._save_index()
+        self.wal.reset()
         
-        print(f"✅ Index créé avec {len(self.documents)} documents")
+        stats = self.embedding_pipeline.last_stats
+        print(f"✅ Index créé avec {len(self.documents)} documents "
+              f"({stats.get('texts_per_second', 0):.1f} textes/s, {stats.get('retries', 0)} reprises)")
     
-    def _generate_embeddings_batch(self, texts: List[str], batch_size: int = 10) -> np.ndarray:
+    def _generate_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> np.ndarray:
         """
-        Génère des embeddings pour une liste de textes par batch
+        Génère des embeddings pour une liste de textes par requêtes multi-contenus
         
         Args:
             texts: Liste de textes
-            batch_size: Taille des batchs
+            batch_size: Nombre de textes par requête
             
         Returns:
             Array numpy des embeddings
-        """
-        all_embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = []
             
-            for text in batch:
-                try:
-                    # Utiliser l'API d'embedding de Gemini
-                    result = genai.embed_content(
-                        model="models/embedding-001", 
-                        content=text,
-                        task_type="retrieval_document"
-                    )
-                    embedding = result['embedding']
-                    batch_embeddings.append(embedding)
-                    
-                except Exception as e:
-                    print(f"⚠️ Erreur embedding: {e}")
-                    # Embedding par défaut en cas d'erreur
-                    batch_embeddings.append([0.0] * self.dimension)
-            
-            all_embeddings.extend(batch_embeddings)
-            print(f"  Traité {min(i + batch_size, len(texts))}/{len(texts)}")
-        
-        return np.array(all_embeddings)
+        Raises:
+            EmbeddingError: si des textes restent non encodés après les reprises
+        """
+        self.embedding_pipeline.batch_size = batch_size
+        return self.embedding_pipeline.embed(texts)
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Appel API d'embedding des requêtes (lève une exception en cas d'échec)"""
+        if self.query_embed_fn is not None:
+            return np.asarray(self.query_embed_fn(list(queries)), dtype='float32').reshape(len(queries), -1)
+        result = genai.embed_content(
+            model="models/embedding-001", 
+            content=queries[0] if len(queries) == 1 else list(queries),
+            task_type="retrieval_query"
+        )
+        return np.array(result['embedding']).astype('float32').reshape(len(queries), -1)
     
     def _generate_query_embedding(self, query: str) -> np.ndarray:
         """
-        Génère l'embedding pour une requête
+        Génère l'embedding pour une requête (servi par le cache si déjà vue)
         
         Args:
             query: Texte de la requête
@@ -159,16 +230,28 @@ class FAISSGeminiRetrieval:
             Embedding numpy array
         """
         try:
-            result = genai.embed_content(
-                model="models/embedding-001", 
-                content=query,
-                task_type="retrieval_query"
-            )
-            return np.array([result['embedding']]).astype('float32')
+            return self.embedding_cache.get_or_compute(self.query_embedding_model, [query], self._embed_queries)
         except Exception as e:
             print(f"⚠️ Erreur embedding requête: {e}")
             return np.zeros((1, self.dimension)).astype('float32')
     
+    def _generate_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """
+        Génère les embeddings de plusieurs requêtes en un seul appel API
+        (seules les requêtes absentes du cache sont envoyées)
+        
+        Args:
+            queries: Textes des requêtes
+            
+        Returns:
+            Matrice numpy (n_requêtes, dimension)
+        """
+        try:
+            return self.embedding_cache.get_or_compute(self.query_embedding_model, list(queries), self._embed_queries)
+        except Exception as e:
+            print(f"⚠️ Erreur embedding requêtes: {e}")
+            return np.vstack([self._generate_query_embedding(query) for query in queries])
+    
     def search(self, query: str, top_k: int = 3) -> List[Tuple[Dict, float]]:
         """
         Recherche les documents les plus pertinents
@@ -192,13 +275,50 @@ class FAISSGeminiRetrieval:
         # Préparer les résultats
         results = []
         for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.documents):
+            if 0 <= idx < len(self.documents):
                 # Convertir distance en score de similarité (plus proche = meilleur)
                 similarity_score = 1 / (1 + dist)
                 results.append((self.documents[idx], similarity_score))
         
         return results
     
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        confidence_threshold: float = 0.0
+    ) -> List[List[Tuple[Dict, float]]]:
+        """
+        Recherche groupée: un appel d'embedding et une recherche FAISS pour toutes les requêtes
+        
+        Args:
+            queries: Questions des utilisateurs
+            top_k: Nombre de résultats par requête
+            confidence_threshold: Score de similarité minimum
+            
+        Returns:
+            Une liste de (document, score) par requête, dans le même ordre
+        """
+        if not queries:
+            return []
+        if self.index is None or len(self.documents) == 0:
+            return [[] for _ in queries]
+        
+        query_embeddings = self._generate_query_embeddings(queries)
+        distances, indices = self.index.search(query_embeddings, min(top_k, len(self.documents)))
+        
+        batch_results = []
+        for row_distances, row_indices in zip(distances, indices):
+            results = []
+            for dist, idx in zip(row_distances, row_indices):
+                if 0 <= idx < len(self.documents):
+                    similarity_score = 1 / (1 + dist)
+                    if similarity_score >= confidence_threshold:
+                        results.append((self.documents[idx], similarity_score))
+            batch_results.append(results)
+        
+        return batch_results
+    
     def generate_response(
         self, 
         query: str, 
@@ -282,27 +402,74 @@ RÉPONSE:"""
             }
     
     def _save_index(self):
-        """Sauvegarde l'index FAISS et les métadonnées"""
+        """Sauvegarde l'index FAISS et les métadonnées (fichiers temporaires + renommage atomique)"""
         if self.index is not None:
-            faiss.write_index(self.index, self.index_path)
-            
-            with open(self.metadata_path, 'wb') as f:
-                pickle.dump(self.documents, f)
+            tmp_index_path = temporary_path(self.index_path)
+            try:
+                faiss.write_index(self.index, tmp_index_path)
+                
+                # Métadonnées d'abord (écriture atomique): si le processus s'arrête avant le
+                # renommage de l'index, les vecteurs manquants sont rejoués depuis le journal
+                self.documents.save(self.metadata_path)
+                os.replace(tmp_index_path, self.index_path)
+            finally:
+                if os.path.exists(tmp_index_path):
+                    os.remove(tmp_index_path)
             
             print(f"💾 Index sauvegardé: {self.index_path}")
     
+    def _migrate_legacy_metadata(self):
+        """Convertit une fois les anciennes métadonnées pickle au format colonnaire"""
+        legacy_path = os.path.splitext(self.metadata_path)[0] + ".pkl"
+        if os.path.exists(self.metadata_path) or not os.path.exists(legacy_path):
+            return
+        
+        print(f"⚠️ Migration des métadonnées pickle: {legacy_path} -> {self.metadata_path}")
+        with open(legacy_path, 'rb') as f:
+            documents = pickle.load(f)
+        LazyDocumentList(documents=documents).save(self.metadata_path)
+        os.remove(legacy_path)
+    
     def _load_index(self):
-        """Charge l'index FAISS et les métadonnées"""
+        """Charge l'index FAISS et les métadonnées, puis rejoue le journal des ajouts"""
         self.index = faiss.read_index(self.index_path)
         
-        with open(self.metadata_path, 'rb') as f:
-            self.documents = pickle.load(f)
+        # Les documents ne sont décodés qu'à l'accès (résultats de recherche)
+        self.documents = LazyDocumentList.load(self.metadata_path)
+        self._kb_digest = None
+        
+        replayed = self._replay_wal()
+        
+        print(f"✅ Index chargé: {len(self.documents)} documents"
+              + (f" dont {replayed} depuis le journal" if replayed else ""))
+    
+    def _replay_wal(self) -> int:
+        """
+        Réapplique les ajouts journalisés absents de l'index ou des métadonnées
         
-        print(f"✅ Index chargé: {len(self.documents)} documents")
+        Returns:
+            Nombre d'enregistrements réappliqués
+        """
+        replayed = 0
+        for sequence, vector, document in self.wal.replay():
+            if sequence >= self.index.ntotal:
+                self.index.add(vector.reshape(1, -1))
+            if sequence >= len(self.documents):
+                self.documents.append(document)
+                replayed += 1
+        return replayed
+    
+    def compact(self):
+        """Fusionne le journal dans l'index principal puis le vide"""
+        if self.index is None:
+            return
+        self._save_index()
+        self.wal.reset()
+        print(f"🗜️ Journal fusionné: {len(self.documents)} documents dans l'index")
     
     def add_document(self, question: str, answer: str, category: str = "general"):
         """
-        Ajoute un nouveau document à l'index
+        Ajoute un nouveau document à l'index (écriture dans le journal, O(1) amorti)
         
         Args:
             question: Question
@@ -311,28 +478,100 @@ RÉPONSE:"""
         """
         combined_text = f"Question: {question}\nRéponse: {answer}\nCatégorie: {category}"
         
-        # Générer l'embedding
-        embedding = self._generate_query_embedding(combined_text)
+        # Générer l'embedding (document refusé plutôt qu'indexé avec un vecteur nul)
+        try:
+            embedding = self._generate_embeddings_batch([combined_text])
+        except EmbeddingError as e:
+            print(f"❌ Document non ajouté: {e}")
+            return
         
         # Ajouter à l'index
         if self.index is None:
             self.index = faiss.IndexFlatL2(self.dimension)
         
-        self.index.add(embedding)
-        
-        # Ajouter aux documents
-        self.documents.append({
+        document = {
             'question': question,
             'answer': answer,
             'category': category,
             'text': combined_text
-        })
+        }
         
-        # Sauvegarder
-        self._save_index()
+        # Journaliser avant d'appliquer en mémoire
+        self.wal.append(len(self.documents), embedding[0], document)
+        self.index.add(embedding)
+        self.documents.append(document)
+        if self._kb_digest is not None:
+            self._kb_digest = self._chain_digest(self._kb_digest, document)
+        
+        # Compaction périodique
+        if self.wal.record_count >= self.compaction_threshold:
+            self.compact()
         
         print(f"✅ Document ajouté: {question[:50]}...")
     
+    def get_embedding_cache_stats(self) -> Dict:
+        """Compteurs du cache d'embeddings de requêtes (succès, échecs, évictions)"""
+        return self.embedding_cache.get_stats()
+    
+    def set_search_params(self, nprobe: int = None, ef_search: int = None) -> Dict:
+        """
+        Ajuste le compromis rappel / latence à chaud (sauvegardé avec l'index)
+        
+        Args:
+            nprobe: Listes IVF sondées
+            ef_search: Taille de la file de recherche HNSW
+        """
+        if self.index is None:
+            return {}
+        current = get_search_params(self.index)
+        params = {}
+        if nprobe is not None and 'nprobe' in current:
+            params['nprobe'] = int(nprobe)
+        if ef_search is not None and 'efSearch' in current:
+            params['efSearch'] = int(ef_search)
+        apply_search_params(self.index, params)
+        return get_search_params(self.index)
+    
+    def benchmark_index_modes(self, modes: List[str] = None, k: int = 3) -> List[Dict]:
+        """
+        Rappel@k et latence de chaque mode d'index compressé
+        
+        Les variations de la base servent de requêtes étiquetées: chacune doit
+        retrouver le document de sa Q&A. Réencode les documents et les variations.
+        
+        Returns:
+            Le rapport (une ligne par mode), aussi affiché sous forme de tableau
+        """
+        with open(self.knowledge_base_path, 'r', encoding='utf-8') as f:
+            qa_pairs = json.load(f).get('qa_pairs', [])
+        
+        position_by_question = {document['question']: position for position, document in enumerate(self.documents)}
+        queries, labels = [], []
+        for pair in qa_pairs:
+            position = position_by_question.get(pair.get('question_principale', ''))
+            if position is not None:
+                queries.extend(pair.get('variations', []))
+                labels.extend([position] * len(pair.get('variations', [])))
+        
+        if not queries:
+            print("⚠️ Aucune variation à évaluer")
+            return []
+        
+        vectors = self._generate_embeddings_batch([document['text'] for document in self.documents])
+        report = benchmark_index_modes(
+            vectors,
+            self._generate_query_embeddings(queries),
+            query_labels=labels,
+            vector_labels=list(range(len(self.documents))),
+            modes=modes or INDEX_MODES,
+            k=k,
+            metric='l2',
+            pca_dim=self.pca_dim
+        )
+        print(f"📊 Benchmark des index ({len(vectors)} documents, {len(queries)} variations):")
+        print_benchmark_report(report)
+        return report
+    
     def rebuild_index(self):
         """Reconstruit complètement l'index depuis la base de connaissances"""
         print("🔄 Reconstruction de l'index...")
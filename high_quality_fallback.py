@@ -2,6 +2,7 @@ from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
 import torch
 import requests
 import random
+from intent_matcher import detect_intents
 
 class HighQualityFallback:
     def __init__(self):
@@ -322,13 +323,13 @@ Temps de résolution moyen : moins de 1 heure !"""
     
     def _categorize_question(self, message):
         """Catégorise la question pour le template approprié"""
-        message_lower = message.lower()
+        intents = detect_intents(message)
         
-        if any(word in message_lower for word in ["mot de passe", "password", "oublié", "connexion"]):
+        if intents.has('fallback_password'):
             return "password"
-        elif any(word in message_lower for word in ["fermer", "clôturer", "supprimer", "compte"]):
+        elif intents.has('fallback_account_closure'):
             return "account_closure"
-        elif any(word in message_lower for word in ["technique", "bug", "erreur", "planté", "fonctionne pas"]):
+        elif intents.has('fallback_technical'):
             return "technical"
         else:
             return "general"
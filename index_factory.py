@@ -0,0 +1,296 @@
+"""
+Index FAISS compressés et approximatifs pour les index ZamaPay (unifié et Gemini)
+Réduction PCA, quantification scalaire (int8 / fp16), quantification produit, IVF et
+HNSW choisis selon la taille du corpus, avec un rapport rappel@k / latence basé sur
+les variations de la base
+"""
+
+import math
+import time
+import numpy as np
+import faiss
+from typing import Dict, List, Optional, Sequence
+
+INDEX_MODES = ('flat', 'fp16', 'sq8', 'pq', 'pca', 'pca-sq8', 'ivf', 'hnsw')
+
+# Mode résolu à la construction par choose_index_mode
+AUTO_MODE = 'auto'
+
+# En dessous, un parcours exact reste sous la milliseconde
+FLAT_MAX_VECTORS = 10_000
+
+HNSW_M = 32
+
+# Fraction des listes IVF sondées et efSearch HNSW selon le rappel visé
+RECALL_SEARCH_PARAMS = (
+    (0.90, 1 / 64, 32),
+    (0.95, 1 / 16, 64),
+    (0.99, 1 / 4, 128),
+    (1.00, 1.0, 256),
+)
+
+METRICS = {
+    'ip': faiss.METRIC_INNER_PRODUCT,
+    'l2': faiss.METRIC_L2,
+}
+
+
+def choose_index_mode(n_vectors: int, target_recall: float = 0.95) -> str:
+    """
+    Type d'index adapté au nombre de vecteurs
+
+    - moins de FLAT_MAX_VECTORS vecteurs: 'flat' (exact)
+    - au-delà, rappel visé >= 0.99: 'hnsw' (graphe, meilleur rappel à latence égale)
+    - sinon: 'ivf' (listes inversées, mémoire minimale)
+    """
+    if n_vectors < FLAT_MAX_VECTORS:
+        return 'flat'
+    return 'hnsw' if target_recall >= 0.99 else 'ivf'
+
+
+def resolve_index_mode(mode: str, n_vectors: int, target_recall: float = 0.95) -> str:
+    """Remplace le mode 'auto' par le type choisi pour n_vectors"""
+    return choose_index_mode(n_vectors, target_recall) if mode == AUTO_MODE else mode
+
+
+def ivf_nlist(n_vectors: int) -> int:
+    """Nombre de listes IVF: ~4·sqrt(n), avec au moins 39 vecteurs d'entraînement par liste"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def default_search_params(mode: str, n_vectors: int, target_recall: float = 0.95) -> Dict:
+    """Paramètres de recherche (nprobe, efSearch) visant le rappel demandé"""
+    probe_fraction, ef_search = RECALL_SEARCH_PARAMS[-1][1:]
+    for recall, fraction, ef in RECALL_SEARCH_PARAMS:
+        if target_recall <= recall:
+            probe_fraction, ef_search = fraction, ef
+            break
+    if mode == 'ivf':
+        nlist = ivf_nlist(n_vectors)
+        return {'nprobe': max(1, min(nlist, math.ceil(nlist * probe_fraction)))}
+    if mode == 'hnsw':
+        return {'efSearch': ef_search}
+    return {}
+
+
+def apply_search_params(index: faiss.Index, params: Dict):
+    """Applique nprobe / efSearch à un index (y compris enveloppé dans IndexIDMap ou une PCA)"""
+    parameter_space = faiss.ParameterSpace()
+    for name, value in (params or {}).items():
+        parameter_space.set_index_parameter(index, name, value)
+
+
+def get_search_params(index: faiss.Index) -> Dict:
+    """Paramètres de recherche actuels d'un index IVF ou HNSW"""
+    base = _base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return {'nprobe': int(base.nprobe)}
+    if isinstance(base, faiss.IndexHNSW):
+        return {'efSearch': int(base.hnsw.efSearch)}
+    return {}
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """
+    Vrai si remove_ids garde la table d'identifiants cohérente
+
+    HNSW ne permet pas de retirer des vecteurs. L'IVF le permet mais sans
+    renuméroter ses positions internes: sous IndexIDMap2 la table
+    position -> identifiant se décale et les recherches renvoient d'autres
+    Q&A. Dans les deux cas une reconstruction complète est nécessaire.
+    """
+    return not isinstance(_base_index(index), (faiss.IndexHNSW, faiss.IndexIVF))
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """Index de stockage sous les enveloppes IndexIDMap / IndexPreTransform"""
+    index = faiss.downcast_index(index)
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexPreTransform)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def index_description(mode: str, dimension: int, n_train: int, pca_dim: int = 128, pq_m: int = None) -> str:
+    """
+    Chaîne index_factory FAISS d'un mode, adaptée au nombre de vecteurs d'entraînement
+
+    La PCA est limitée à min(pca_dim, n_train, dimension) composantes. Le PQ utilise
+    au plus 2^nbits centroïdes par sous-espace avec 39 vecteurs d'entraînement par
+    centroïde (minimum recommandé par FAISS); en dessous de 16 centroïdes il devient SQ8.
+
+    Args:
+        mode: Un des INDEX_MODES
+        dimension: Dimension des vecteurs
+        n_train: Nombre de vecteurs disponibles pour l'entraînement
+        pca_dim: Dimension cible de la PCA
+        pq_m: Nombre de sous-quantificateurs PQ (diviseur de la dimension)
+    """
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Mode d'index inconnu: {mode} (attendu: {', '.join(INDEX_MODES)})")
+
+    if mode == 'flat':
+        return "Flat"
+    if mode == 'ivf':
+        return f"IVF{ivf_nlist(n_train)},Flat"
+    if mode == 'hnsw':
+        return f"HNSW{HNSW_M}"
+    if mode == 'fp16':
+        return "SQfp16"
+    if mode == 'sq8':
+        return "SQ8"
+    if mode == 'pq':
+        nbits = min(8, int(math.log2(max(n_train / 39, 1))))
+        if nbits < 4:
+            return "SQ8"
+        m = pq_m or next(m for m in (dimension // 8, dimension // 4, dimension // 2, dimension)
+                         if m > 0 and dimension % m == 0)
+        return f"PQ{m}x{nbits}"
+
+    reduced = max(1, min(pca_dim, n_train, dimension))
+    suffix = "SQ8" if mode == 'pca-sq8' else "Flat"
+    return f"PCA{reduced},{suffix}"
+
+
+def create_index(
+    mode: str,
+    dimension: int,
+    metric: str = 'ip',
+    training_vectors: Optional[np.ndarray] = None,
+    pca_dim: int = 128,
+    pq_m: int = None,
+    target_recall: float = 0.95
+) -> faiss.Index:
+    """
+    Crée et entraîne un index vide
+
+    Args:
+        mode: Un des INDEX_MODES ou 'auto'
+        dimension: Dimension des vecteurs
+        metric: 'ip' (vecteurs normalisés) ou 'l2'
+        training_vectors: Vecteurs d'entraînement (requis hors modes 'flat' et 'hnsw');
+            leur nombre détermine aussi le type choisi en mode 'auto'
+        pca_dim: Dimension cible de la PCA
+        pq_m: Nombre de sous-quantificateurs PQ
+        target_recall: Rappel visé (type choisi en mode 'auto', nprobe, efSearch)
+
+    Returns:
+        Index FAISS prêt à recevoir des vecteurs
+    """
+    n_train = 0 if training_vectors is None else len(training_vectors)
+    mode = resolve_index_mode(mode, n_train, target_recall)
+    if mode not in ('flat', 'hnsw') and n_train == 0:
+        print(f"⚠️ Mode {mode} sans vecteurs d'entraînement, index exact utilisé")
+        mode = 'flat'
+
+    description = index_description(mode, dimension, n_train, pca_dim, pq_m)
+    index = faiss.index_factory(dimension, description, METRICS[metric])
+    if not index.is_trained:
+        index.train(np.ascontiguousarray(training_vectors, dtype='float32'))
+    apply_search_params(index, default_search_params(mode, n_train, target_recall))
+    return index
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Taille sérialisée d'un index (vecteurs et paramètres entraînés)"""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def _neighbors(index: faiss.Index, queries: np.ndarray, k: int, exclude_rows: np.ndarray) -> np.ndarray:
+    """Top-k voisins de chaque requête, sans la ligne exclue (la requête elle-même si indexée)"""
+    _, indices = index.search(queries, min(k + 1, index.ntotal))
+    neighbors = np.full((len(queries), k), -1, dtype='int64')
+    for row, (row_indices, excluded) in enumerate(zip(indices, exclude_rows)):
+        kept = [i for i in row_indices if i != excluded and i >= 0][:k]
+        neighbors[row, :len(kept)] = kept
+    return neighbors
+
+
+def benchmark_index_modes(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    query_labels: Sequence[int],
+    vector_labels: Sequence[int],
+    modes: Sequence[str] = INDEX_MODES,
+    k: int = 3,
+    metric: str = 'ip',
+    query_rows: Optional[Sequence[int]] = None,
+    pca_dim: int = 128,
+    pq_m: int = None
+) -> List[Dict]:
+    """
+    Compare les modes d'index sur des requêtes étiquetées
+
+    Args:
+        vectors: Vecteurs indexés
+        queries: Vecteurs des requêtes (ex: variations de la base)
+        query_labels: Q&A attendue de chaque requête
+        vector_labels: Q&A de chaque vecteur indexé
+        modes: Modes à comparer
+        k: Profondeur du rappel
+        metric: 'ip' ou 'l2'
+        query_rows: Ligne de l'index de chaque requête si elle y figure (exclue des résultats)
+        pca_dim: Dimension cible de la PCA
+        pq_m: Nombre de sous-quantificateurs PQ
+
+    Returns:
+        Une ligne par mode: description, mémoire, rappel@k par rapport à l'index exact,
+        taux de bonne Q&A dans le top-k et latence moyenne par requête
+    """
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    query_labels = np.asarray(query_labels)
+    vector_labels = np.asarray(vector_labels)
+    exclude_rows = np.asarray(query_rows if query_rows is not None else [-1] * len(queries))
+
+    exact = create_index('flat', vectors.shape[1], metric)
+    exact.add(vectors)
+    exact_neighbors = _neighbors(exact, queries, k, exclude_rows)
+
+    report = []
+    for mode in modes:
+        index = create_index(mode, vectors.shape[1], metric, vectors, pca_dim, pq_m)
+        index.add(vectors)
+        neighbors = _neighbors(index, queries, k, exclude_rows)
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query.reshape(1, -1), k)
+        latency_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+        recall = np.mean([
+            len(set(found[found >= 0]) & set(expected[expected >= 0])) / max((expected >= 0).sum(), 1)
+            for found, expected in zip(neighbors, exact_neighbors)
+        ]) if len(queries) else 0.0
+        hits = np.mean([
+            label in vector_labels[found[found >= 0]]
+            for found, label in zip(neighbors, query_labels)
+        ]) if len(queries) else 0.0
+
+        memory = index_memory_bytes(index)
+        report.append({
+            'mode': mode,
+            'description': index_description(mode, vectors.shape[1], len(vectors), pca_dim, pq_m),
+            'memory_bytes': memory,
+            'bytes_per_vector': memory / max(len(vectors), 1),
+            f'recall@{k}': float(recall),
+            f'qa_hit@{k}': float(hits),
+            'latency_ms': latency_ms,
+        })
+
+    return report
+
+
+def print_benchmark_report(report: List[Dict]):
+    """Affiche le rapport de benchmark sous forme de tableau"""
+    if not report:
+        print("⚠️ Rapport vide")
+        return
+    recall_key = next(key for key in report[0] if key.startswith('recall@'))
+    hit_key = next(key for key in report[0] if key.startswith('qa_hit@'))
+
+    print(f"{'Mode':<9} {'Index':<16} {'Mémoire':>10} {'o/vect.':>8} "
+          f"{recall_key:>10} {hit_key:>10} {'Latence':>10}")
+    for row in report:
+        print(f"{row['mode']:<9} {row['description']:<16} {row['memory_bytes'] / 1024:>8.1f}Ko "
+              f"{row['bytes_per_vector']:>8.1f} {row[recall_key]:>10.3f} {row[hit_key]:>10.3f} "
+              f"{row['latency_ms']:>8.3f}ms")
@@ -0,0 +1,103 @@
+"""
+Journal append-only (write-ahead log) des ajouts à un index FAISS
+Chaque ajout coûte une écriture en fin de fichier au lieu d'une réécriture complète de l'index
+"""
+
+import os
+import json
+import struct
+import zlib
+import numpy as np
+from typing import Dict, Iterator, Tuple
+
+# En-tête d'enregistrement: magic, numéro de séquence, taille du contenu, CRC32 du contenu
+RECORD_MAGIC = 0x5A50574C  # "ZPWL"
+RECORD_HEADER = struct.Struct('<IQII')
+
+
+class WriteAheadLog:
+    """Journal d'enregistrements (vecteur, métadonnées) résistant aux écritures interrompues"""
+
+    def __init__(self, path: str, fsync: bool = True):
+        """
+        Args:
+            path: Chemin du fichier journal
+            fsync: Force l'écriture sur disque après chaque ajout
+        """
+        self.path = path
+        self.fsync = fsync
+        self.record_count = 0
+
+    def append(self, sequence: int, vector: np.ndarray, metadata: Dict):
+        """
+        Ajoute un enregistrement en fin de journal
+
+        Args:
+            sequence: Position du document dans l'index
+            vector: Embedding du document
+            metadata: Métadonnées JSON-sérialisables du document
+        """
+        vector = np.ascontiguousarray(vector, dtype='float32').reshape(-1)
+        payload = (
+            struct.pack('<I', vector.shape[0])
+            + vector.tobytes()
+            + json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+        )
+        header = RECORD_HEADER.pack(RECORD_MAGIC, sequence, len(payload), zlib.crc32(payload))
+
+        with open(self.path, 'ab') as f:
+            f.write(header + payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        self.record_count += 1
+
+    def replay(self) -> Iterator[Tuple[int, np.ndarray, Dict]]:
+        """
+        Relit les enregistrements valides dans l'ordre d'écriture
+
+        Un enregistrement final tronqué ou corrompu (écriture interrompue) est
+        ignoré et retiré du fichier.
+
+        Yields:
+            (sequence, vecteur, métadonnées)
+        """
+        self.record_count = 0
+        if not os.path.exists(self.path):
+            return
+
+        valid_end = 0
+        with open(self.path, 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                magic, sequence, length, crc = RECORD_HEADER.unpack(header)
+                if magic != RECORD_MAGIC:
+                    break
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+
+                dimension = struct.unpack_from('<I', payload)[0]
+                vector_end = 4 + dimension * 4
+                vector = np.frombuffer(payload[4:vector_end], dtype='float32').copy()
+                metadata = json.loads(payload[vector_end:].decode('utf-8'))
+
+                valid_end = f.tell()
+                self.record_count += 1
+                yield sequence, vector, metadata
+
+        if valid_end < os.path.getsize(self.path):
+            print(f"⚠️ Journal {self.path}: fin tronquée ignorée ({os.path.getsize(self.path) - valid_end} octets)")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+
+    def reset(self):
+        """Vide le journal (après compaction dans l'index principal)"""
+        with open(self.path, 'wb') as f:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.record_count = 0
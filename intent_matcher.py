@@ -0,0 +1,163 @@
+"""
+Détection d'intentions par mots-clés en une seule passe
+Toutes les tables de mots-clés (escalade, tontine, complexité, sujets, templates,
+catégories du fallback) sont compilées en une expression régulière; chaque message
+est parcouru une fois et les détecteurs lisent le vecteur d'intentions obtenu
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping
+
+# Sémantique conservée: un mot-clé est présent s'il apparaît comme sous-chaîne
+# du message en minuscules (comme `keyword in message.lower()`)
+KEYWORD_TABLES: Dict[str, List[str]] = {
+    # ResponseGenerator._detect_escalation
+    'escalation': [
+        "humain", "agent", "conseiller", "personne", "réel", "vrai personne",
+        "parler à", "contact", "support", "urgent", "appeler", "téléphoner",
+        "whatsapp", "téléphone", "appel"
+    ],
+    'frustration': [
+        "mécontent", "fâché", "insatisfait", "problème", "bug", "erreur",
+        "ça marche pas", "fonctionne pas", "insupportable", "ridicule"
+    ],
+    # ResponseGenerator._detect_tontine_query
+    'tontine_query': [
+        "tontine", "épargne collective", "cagnotte", "groupe épargne",
+        "rotative", "cotisation collective", "épargne groupe",
+        "tontine digitale", "tontine en ligne", "tontine numérique"
+    ],
+    # ResponseGenerator._generate_tontine_template_response (testés dans cet ordre)
+    'tontine_create': ["créer", "démarrer", "commencer", "lancer"],
+    'tontine_benefits': ["avantage", "bénéfice", "sécurité", "garantie"],
+    # ResponseGenerator._assess_question_complexity
+    'complexity': [
+        "comparer", "différence", "avantage", "inconvénient", "quelle est la meilleure",
+        "recommander", "conseiller", "pourquoi", "comment fonctionne", "étape par étape",
+        "guide complet", "tutoriel", "expliquer en détail"
+    ],
+    # ResponseGenerator._generate_template_response (testés dans cet ordre)
+    'template_greeting': ["bonjour", "salut", "hello", "slt", "coucou", "bjr"],
+    'template_fees': ["frais", "tarif", "coût", "prix", "combien coûte"],
+    'template_delays': ["délai", "temps", "combien de temps", "durée", "quand"],
+    'template_security': ["sécurité", "sécurisé", "protection", "fraude", "risque"],
+    'template_tontine': ["tontine", "épargne collective", "cagnotte"],
+    # ResponseGenerator._detect_topics
+    'topic_frais': ['frais', 'tarif', 'coût', 'prix'],
+    'topic_délais': ['délai', 'temps', 'combien de temps', 'quand'],
+    'topic_sécurité': ['sécurité', 'sécurisé', 'protection', 'fraude'],
+    'topic_compte': ['compte', 'vérification', 'authentification', 'profil'],
+    'topic_mobile_money': ['mobile money', 'orange', 'moov', 'wave'],
+    'topic_transfert': ['transfert', 'envoyer', 'envoi', 'argent'],
+    'topic_tontine': ['tontine', 'épargne collective', 'cagnotte', 'rotative'],
+    # HighQualityFallback._categorize_question (testés dans cet ordre)
+    'fallback_password': ["mot de passe", "password", "oublié", "connexion"],
+    'fallback_account_closure': ["fermer", "clôturer", "supprimer", "compte"],
+    'fallback_technical': ["technique", "bug", "erreur", "planté", "fonctionne pas"],
+}
+
+TOPIC_PREFIX = "topic_"
+
+
+def trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Alternance de mots-clés factorisée en arbre de préfixes
+
+    "frais|fraude" devient "fra(?:is|ude)": à chaque position le moteur d'expressions
+    régulières teste un caractère au lieu de chaque mot-clé. Les sous-motifs optionnels
+    sont gourmands, donc le mot-clé le plus long commençant à une position est retenu.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+class IntentVector:
+    """Résultat d'une passe: mots-clés présents et nombre de mots-clés distincts par table"""
+
+    __slots__ = ('keywords', 'counts', 'word_count')
+
+    def __init__(self, keywords: FrozenSet[str], counts: Dict[str, int], word_count: int):
+        self.keywords = keywords
+        self.counts = counts
+        self.word_count = word_count
+
+    def has(self, table: str) -> bool:
+        return self.counts.get(table, 0) > 0
+
+    def count(self, table: str) -> int:
+        return self.counts.get(table, 0)
+
+    def topics(self) -> List[str]:
+        """Sujets détectés, dans l'ordre des tables topic_*"""
+        return [table[len(TOPIC_PREFIX):] for table in self.counts if table.startswith(TOPIC_PREFIX)]
+
+    def __repr__(self):
+        return f"IntentVector({self.counts}, mots={self.word_count})"
+
+
+class IntentMatcher:
+    """
+    Matcher multi-motifs compilé une fois à partir de tables de mots-clés
+
+    L'alternance (factorisée par trie_pattern) est placée dans une assertion avant
+    `(?=(...))`: la recherche est tentée à chaque position du texte, donc les
+    occurrences qui se chevauchent sont toutes vues. À une position donnée c'est le
+    mot-clé le plus long qui est retenu; les mots-clés contenus dans celui-ci
+    ("temps" dans "combien de temps") sont ajoutés par la fermeture précalculée
+    `_contained`.
+    """
+
+    def __init__(self, tables: Mapping[str, Iterable[str]]):
+        self.tables = {table: list(dict.fromkeys(k.lower() for k in keywords)) for table, keywords in tables.items()}
+
+        keywords = sorted({k for ks in self.tables.values() for k in ks})
+        self._pattern = re.compile("(?=(" + trie_pattern(keywords) + "))")
+        self._contained = {k: frozenset(other for other in keywords if other in k) for k in keywords}
+
+        self._tables_by_keyword = {}
+        for table, table_keywords in self.tables.items():
+            for keyword in table_keywords:
+                self._tables_by_keyword.setdefault(keyword, []).append(table)
+
+    def match(self, text: str) -> IntentVector:
+        """Vecteur d'intentions d'un texte (une passe sur le texte en minuscules)"""
+        text_lower = text.lower()
+        found = set()
+        for longest in {m.group(1) for m in self._pattern.finditer(text_lower)}:
+            found |= self._contained[longest]
+
+        counts = dict.fromkeys(self.tables, 0)
+        for keyword in found:
+            for table in self._tables_by_keyword[keyword]:
+                counts[table] += 1
+        counts = {table: n for table, n in counts.items() if n}
+
+        return IntentVector(frozenset(found), counts, len(text.split()))
+
+
+INTENT_MATCHER = IntentMatcher(KEYWORD_TABLES)
+
+
+@lru_cache(maxsize=1024)
+def detect_intents(text: str) -> IntentVector:
+    """
+    Vecteur d'intentions d'un message avec le matcher par défaut
+
+    Mis en cache: les détecteurs appelés successivement sur le même message
+    partagent une seule passe.
+    """
+    return INTENT_MATCHER.match(text)
@@ -0,0 +1,80 @@
+"""
+Chargement différé des dépendances lourdes et des singletons ZamaPay
+Les modules (faiss, scikit-learn, Gemini) et les objets globaux (authentification,
+conversations) ne sont importés ou construits qu'au premier accès
+"""
+
+import importlib
+import importlib.util
+import threading
+
+
+def module_available(name: str) -> bool:
+    """Vérifie qu'un module est installé sans l'importer"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Module importé au premier accès à l'un de ses attributs"""
+
+    def __init__(self, name: str):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    object.__setattr__(self, '_module', importlib.import_module(self._name))
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "chargé" if self.loaded else "différé"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+class LazyInstance:
+    """
+    Singleton construit au premier accès à l'un de ses attributs
+
+    Remplace `instance = Classe()` au niveau module: l'import ne lit plus de fichier
+    et ne crée plus de dossier; l'objet est construit une seule fois, même si
+    plusieurs threads y accèdent en même temps.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _load(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, '_instance', self._factory())
+        return self._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        state = "construit" if self.loaded else "différé"
+        return f"<LazyInstance {getattr(self._factory, '__name__', self._factory)} ({state})>"
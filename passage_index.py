@@ -0,0 +1,117 @@
+"""
+Découpage des réponses de la base ZamaPay en passages et index lexical des passages
+Les réponses sont des documents markdown de plusieurs kilo-octets: seules les sections
+pertinentes pour la question sont envoyées à Gemini
+"""
+
+import re
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+from bm25_index import BM25Index
+
+HEADING_PATTERN = re.compile(r'^(#{2,3})\s+(.*\S)\s*$')
+
+
+def _split_long_section(body: str, max_chars: int) -> List[str]:
+    """Découpe une section trop longue aux limites de paragraphes"""
+    chunks = []
+    current = ""
+    for paragraph in re.split(r'\n\s*\n', body):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_markdown(text: str, max_chars: int = 600) -> List[Dict]:
+    """
+    Découpe une réponse markdown en passages selon ses titres ## et ###
+
+    Args:
+        text: Réponse markdown
+        max_chars: Taille maximale d'un passage (les sections plus longues sont
+            découpées par paragraphes)
+
+    Returns:
+        Liste de passages {'heading': titres "## > ###", 'text': contenu}
+    """
+    passages = []
+    h2, h3 = "", ""
+    lines = []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            heading = " > ".join(title for title in (h2, h3) if title)
+            for chunk in _split_long_section(body, max_chars):
+                passages.append({'heading': heading, 'text': chunk})
+        lines.clear()
+
+    for line in (text or "").splitlines():
+        match = HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            if len(match.group(1)) == 2:
+                h2, h3 = match.group(2), ""
+            else:
+                h3 = match.group(2)
+        else:
+            lines.append(line)
+    flush()
+
+    return passages
+
+
+class PassageIndex:
+    """Index BM25 des passages de toutes les réponses de la base"""
+
+    def __init__(self, qa_pairs: List[Dict], max_chars: int = 600):
+        """
+        Args:
+            qa_pairs: Q&A de la base de connaissances
+            max_chars: Taille maximale d'un passage
+        """
+        self.passages = []
+        for position, qa in enumerate(qa_pairs):
+            for passage in chunk_markdown(qa.get('reponse', ''), max_chars):
+                self.passages.append(dict(passage, qa_position=position, qa_id=qa.get('id')))
+
+        # Le titre de la Q&A et des sections est indexé avec le contenu
+        self.bm25 = BM25Index([
+            f"{qa_pairs[p['qa_position']].get('question_principale', '')} {p['heading']} {p['text']}"
+            for p in self.passages
+        ])
+        self.qa_ids = np.array([str(p['qa_id']) for p in self.passages])
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, qa_ids: Optional[Iterable] = None, top_k: int = 3) -> List[Dict]:
+        """
+        Passages les plus pertinents pour une requête
+
+        Args:
+            query: Question de l'utilisateur
+            qa_ids: Limite la recherche aux passages de ces Q&A (identifiants 'id')
+            top_k: Nombre de passages retournés
+
+        Returns:
+            Passages {'heading', 'text', 'qa_position', 'qa_id', 'score'} triés par score BM25
+        """
+        if not self.passages:
+            return []
+
+        scores, _ = self.bm25.score(query)
+        if qa_ids is not None:
+            scores = np.where(np.isin(self.qa_ids, [str(qa_id) for qa_id in qa_ids]), scores, 0.0)
+
+        candidates = np.flatnonzero(scores > 0)
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')][:top_k]
+        return [dict(self.passages[row], score=float(scores[row])) for row in ranked]
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Rapport du coût d'import des modules ZamaPay
+Chaque module est importé dans un processus neuf avec `python -X importtime`;
+le rapport donne le coût cumulé par module et ses dépendances les plus lentes
+
+Usage: python profile_imports.py [modules...] [--top 8] [--budget-ms 300]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+DEFAULT_MODULES = [
+    'login',
+    'auth_system',
+    'conversation_manager',
+    'unified_retrieval',
+    'response_generator',
+    'retrieval_system',
+]
+
+# "import time:      self [us] |  cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Lignes -X importtime -> [{'module', 'self_ms', 'cumulative_ms', 'depth'}]"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                'module': module.strip(),
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2,
+            })
+    return entries
+
+
+def profile_module(module: str, top: int = 8) -> Dict:
+    """
+    Importe un module dans un processus neuf et mesure son coût
+
+    Returns:
+        {'module', 'cumulative_ms', 'top': [(dépendance, ms cumulées)], 'error'}
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    entries = parse_importtime(completed.stderr)
+    target = next((i for i in range(len(entries) - 1, -1, -1)
+                   if entries[i]['module'] == module and entries[i]['depth'] == 0), None)
+
+    # Sous-arbre du module: entrées depuis le dernier import de premier niveau
+    # précédent (site, encodings... chargés au démarrage de l'interpréteur)
+    end = target if target is not None else len(entries)
+    start = next((i + 1 for i in range(end - 1, -1, -1) if entries[i]['depth'] == 0), 0)
+    subtree = entries[start:end]
+
+    error = None
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "échec de l'import"
+
+    # Paquets de premier niveau, au coût cumulé le plus élevé observé
+    heaviest = {}
+    for entry in subtree:
+        if '.' not in entry['module']:
+            heaviest[entry['module']] = max(heaviest.get(entry['module'], 0), entry['cumulative_ms'])
+
+    return {
+        'module': module,
+        'cumulative_ms': entries[target]['cumulative_ms'] if target is not None else sum(e['self_ms'] for e in subtree),
+        'top': sorted(heaviest.items(), key=lambda item: -item[1])[:top],
+        'error': error,
+    }
+
+
+def print_report(reports: List[Dict], budget_ms: float = None):
+    """Affiche le coût cumulé de chaque module et ses dépendances principales"""
+    print(f"{'Module':<24} {'Import':>10}")
+    for report in sorted(reports, key=lambda r: -r['cumulative_ms']):
+        over = budget_ms is not None and report['cumulative_ms'] > budget_ms
+        status = "❌" if report['error'] or over else "✅"
+        print(f"{status} {report['module']:<22} {report['cumulative_ms']:>8.1f}ms")
+        if report['error']:
+            print(f"      ⚠️ {report['error']}")
+        for dependency, cumulative_ms in report['top']:
+            print(f"      {dependency:<26} {cumulative_ms:>8.1f}ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Coût d'import des modules ZamaPay")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=8, help="Dépendances affichées par module")
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="Échoue si un module dépasse ce coût d'import")
+    args = parser.parse_args(argv)
+
+    reports = [profile_module(module, args.top) for module in args.modules]
+    print_report(reports, args.budget_ms)
+
+    failed = [r['module'] for r in reports if r['error']]
+    if failed:
+        print(f"\n⚠️ Import impossible: {', '.join(failed)}")
+
+    if args.budget_ms is not None:
+        over_budget = [r['module'] for r in reports if r['cumulative_ms'] > args.budget_ms]
+        if over_budget:
+            print(f"\n❌ Budget de {args.budget_ms:.0f}ms dépassé: {', '.join(over_budget)}")
+            return 1
+        print(f"\n✅ Tous les modules sous {args.budget_ms:.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Regroupement des requêtes concurrentes pour l'encodeur SentenceTransformer
+Les requêtes arrivées dans une même fenêtre sont encodées et recherchées ensemble
+"""
+
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+
+class _PendingQuery:
+    """Requête en attente dans la file du batcher"""
+
+    __slots__ = ('query', 'top_k', 'confidence_threshold', 'future', 'enqueued_at')
+
+    def __init__(self, query: str, top_k: int, confidence_threshold: float):
+        self.query = query
+        self.top_k = top_k
+        self.confidence_threshold = confidence_threshold
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class QueryBatcher:
+    """Micro-batching des recherches: une passe d'encodage et une recherche d'index par lot"""
+
+    def __init__(
+        self,
+        search_batch_fn: Callable[[List[str], int, float], List[List[Dict]]],
+        window_ms: float = 5.0,
+        max_batch_size: int = 32,
+        metrics_window: int = 1000
+    ):
+        """
+        Args:
+            search_batch_fn: Fonction de recherche groupée (queries, top_k, confidence_threshold)
+            window_ms: Durée maximale d'attente pour compléter un lot
+            max_batch_size: Taille maximale d'un lot
+            metrics_window: Nombre de mesures conservées pour les percentiles
+        """
+        self.search_batch_fn = search_batch_fn
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+        # Métriques
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._queue_delays_ms = deque(maxlen=metrics_window)
+        self._search_times_ms = deque(maxlen=metrics_window)
+        self.total_batches = 0
+        self.total_queries = 0
+
+    def submit(self, query: str, top_k: int = 3, confidence_threshold: float = 0.1) -> Future:
+        """
+        Ajoute une requête à la file
+
+        Returns:
+            Future résolu avec la liste des résultats de la requête
+        """
+        if self._closed:
+            raise RuntimeError("QueryBatcher fermé")
+
+        self._ensure_worker()
+        pending = _PendingQuery(query, top_k, confidence_threshold)
+        self._queue.put(pending)
+        return pending.future
+
+    def search(self, query: str, top_k: int = 3, confidence_threshold: float = 0.1, timeout: float = None) -> List[Dict]:
+        """Recherche bloquante passant par le batcher"""
+        return self.submit(query, top_k, confidence_threshold).result(timeout=timeout)
+
+    def close(self):
+        """Arrête le thread de traitement après les requêtes en cours"""
+        self._closed = True
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join(timeout=1.0)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self, first: _PendingQuery) -> List[_PendingQuery]:
+        """Complète le lot jusqu'à la fin de la fenêtre ou la taille maximale"""
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000.0
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if pending is None:
+                self._queue.put(None)
+                break
+            batch.append(pending)
+
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = self._collect_batch(first)
+            self._process_batch(batch)
+
+    def _process_batch(self, batch: List[_PendingQuery]):
+        """
+        Exécute les recherches groupées du lot et distribue les résultats aux futures
+
+        Une recherche par couple (top_k, seuil): les résultats d'une recherche plus
+        large puis filtrée ne sont pas ceux de la recherche demandée (le seuil est
+        appliqué avant la troncature, et la fusion hybride ne trie pas par score).
+        """
+        groups = {}
+        for pending in batch:
+            groups.setdefault((pending.top_k, pending.confidence_threshold), []).append(pending)
+        for (top_k, threshold), group in groups.items():
+            self._search_group(group, top_k, threshold)
+
+    def _search_group(self, batch: List[_PendingQuery], top_k: int, threshold: float):
+        """Recherche groupée de requêtes de mêmes paramètres"""
+        started = time.perf_counter()
+
+        try:
+            batch_results = self.search_batch_fn([pending.query for pending in batch], top_k, threshold)
+        except Exception as e:
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        search_time_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.total_batches += 1
+            self.total_queries += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._search_times_ms.append(search_time_ms)
+            for pending in batch:
+                self._queue_delays_ms.append((started - pending.enqueued_at) * 1000)
+
+        for pending, results in zip(batch, batch_results):
+            pending.future.set_result(results)
+
+        # Résultats manquants: les appelants concernés ne doivent pas attendre indéfiniment
+        for pending in batch[len(batch_results):]:
+            pending.future.set_exception(RuntimeError(
+                f"Recherche groupée incomplète: {len(batch_results)} résultats pour {len(batch)} requêtes"
+            ))
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def get_metrics(self) -> Dict:
+        """Retourne la taille des lots et les délais d'attente (ms) observés"""
+        with self._lock:
+            batch_sizes = list(self._batch_sizes)
+            delays = list(self._queue_delays_ms)
+            search_times = list(self._search_times_ms)
+
+        histogram = {}
+        for size in batch_sizes:
+            histogram[size] = histogram.get(size, 0) + 1
+
+        return {
+            'window_ms': self.window_ms,
+            'max_batch_size': self.max_batch_size,
+            'total_batches': self.total_batches,
+            'total_queries': self.total_queries,
+            'avg_batch_size': sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0.0,
+            'batch_size_histogram': dict(sorted(histogram.items())),
+            'queue_delay_p50_ms': self._percentile(delays, 50),
+            'queue_delay_p95_ms': self._percentile(delays, 95),
+            'queue_delay_max_ms': max(delays) if delays else 0.0,
+            'search_time_p50_ms': self._percentile(search_times, 50),
+            'search_time_p95_ms': self._percentile(search_times, 95),
+        }
@@ -0,0 +1,137 @@
+"""
+Budget de latence par requête et disjoncteur pour les appels Gemini
+Une échéance (Deadline) est créée à l'arrivée de la question et transmise à chaque
+étape; le disjoncteur (CircuitBreaker) coupe Gemini après des échecs ou des appels
+lents successifs, le temps d'un refroidissement, pour servir la base immédiatement
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+
+class Deadline:
+    """Échéance absolue d'une requête (horloge monotone)"""
+
+    def __init__(self, budget_s: float):
+        """
+        Args:
+            budget_s: Temps total accordé à la requête en secondes
+        """
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_s
+
+    def remaining(self) -> float:
+        """Secondes restantes (0 si l'échéance est passée)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Délai à accorder à une étape: le temps restant, plafonné par cap"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(remaining, cap)
+
+    def __repr__(self):
+        return f"Deadline(reste={self.remaining():.2f}s / {self.budget_s:.2f}s)"
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur: fermé (appels autorisés), ouvert (appels refusés), semi-ouvert (essai)
+
+    Après failure_threshold échecs consécutifs (erreurs, délais dépassés ou appels
+    plus lents que slow_call_s), le circuit s'ouvre pendant cooldown_s. Ensuite un
+    appel d'essai est autorisé par période de refroidissement: un succès referme le
+    circuit, un échec le rouvre.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, slow_call_s: float = 8.0, cooldown_s: float = 30.0):
+        """
+        Args:
+            failure_threshold: Échecs consécutifs avant ouverture
+            slow_call_s: Durée au-delà de laquelle un appel réussi compte comme un échec
+            cooldown_s: Durée d'ouverture avant un appel d'essai
+        """
+        self.failure_threshold = failure_threshold
+        self.slow_call_s = slow_call_s
+        self.cooldown_s = cooldown_s
+
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.openings = 0
+
+    def allow(self) -> bool:
+        """True si un appel peut être tenté maintenant"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.cooldown_s:
+                # Un essai par période: sans résultat, un autre sera permis plus tard
+                self.state = self.HALF_OPEN
+                self._opened_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration_s: float):
+        """Enregistre un appel terminé; trop lent, il compte comme un échec"""
+        if duration_s > self.slow_call_s:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self.calls += 1
+            self._consecutive_failures = 0
+            if self.state != self.CLOSED:
+                print("✅ Disjoncteur Gemini refermé")
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        """Enregistre une erreur ou un délai dépassé"""
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.openings += 1
+                    print(f"🔌 Disjoncteur Gemini ouvert pour {self.cooldown_s:.0f}s "
+                          f"({self._consecutive_failures} échecs consécutifs)")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._consecutive_failures = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self._consecutive_failures,
+                'calls': self.calls,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'rejected': self.rejected,
+                'openings': self.openings,
+            }
@@ -0,0 +1,170 @@
+"""
+Cache sémantique des réponses finales de ResponseGenerator
+Une question proche d'une question déjà traitée (similarité cosinus au-dessus du seuil)
+reçoit la réponse mémorisée sans nouvelle recherche ni appel Gemini; les entrées
+sont liées à la version de la base de connaissances
+"""
+
+import re
+import copy
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from embedding_cache import normalize_query
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+class SemanticResponseCache:
+    """Réponses indexées par l'embedding normalisé de la question, par version de la base"""
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[List[str]], Optional[np.ndarray]]] = None,
+        similarity_threshold: float = 0.93,
+        max_entries: int = 1000,
+        ttl: float = 3600
+    ):
+        """
+        Args:
+            embed_fn: Encode des questions -> matrice (n, dimension), ou None si indisponible;
+                sans encodeur, seules les questions de même forme normalisée correspondent
+            similarity_threshold: Cosinus minimum pour réutiliser une réponse
+            max_entries: Nombre maximal de réponses conservées (LRU)
+            ttl: Durée de validité d'une réponse en secondes
+        """
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.kb_version = None
+        self._entries = OrderedDict()   # question normalisée -> entrée
+        self._matrix = None             # embeddings des entrées de _matrix_keys
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.embed_fn is None:
+            return None
+        try:
+            embeddings = self.embed_fn([question])
+        except Exception as e:
+            print(f"⚠️ Erreur embedding cache de réponses: {e}")
+            return None
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        vector = np.asarray(embeddings, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def _check_version(self, kb_version: str):
+        """Vide le cache quand la base de connaissances change (appelé sous verrou)"""
+        if kb_version != self.kb_version:
+            if self._entries:
+                self.invalidations += 1
+                print(f"🔄 Base modifiée, {len(self._entries)} réponses en cache invalidées")
+            self._entries.clear()
+            self.kb_version = kb_version
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry['time'] >= self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _embedding_matrix(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """Matrice des embeddings, reconstruite seulement si l'ensemble des entrées a changé"""
+        keys = [key for key, entry in self._entries.items() if entry['embedding'] is not None]
+        if set(keys) != set(self._matrix_keys):
+            self._matrix = np.vstack([self._entries[key]['embedding'] for key in keys]) if keys else None
+            self._matrix_keys = keys
+        return self._matrix_keys, self._matrix
+
+    def lookup(self, question: str, kb_version: str) -> Optional[Tuple[Dict, float]]:
+        """
+        Réponse mémorisée pour la question la plus proche
+
+        Returns:
+            (copie de la réponse, similarité) ou None
+        """
+        key = normalize_query(question)
+        now = time.time()
+        with self._lock:
+            self._check_version(kb_version)
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry['response']), 1.0
+            if not self._entries or self.embed_fn is None:
+                self.misses += 1
+                return None
+
+        embedding = self._embed(question)
+        numbers = _NUMBER.findall(key)
+
+        with self._lock:
+            if embedding is None or kb_version != self.kb_version:
+                self.misses += 1
+                return None
+            keys, matrix = self._embedding_matrix()
+            if matrix is None or matrix.shape[1] != embedding.shape[0]:
+                self.misses += 1
+                return None
+
+            similarities = matrix @ embedding
+            for row in np.argsort(-similarities):
+                if similarities[row] < self.similarity_threshold:
+                    break
+                entry = self._entries[keys[row]]
+                # "envoyer 5000 F" et "envoyer 50000 F" restent des questions distinctes
+                if entry['numbers'] != numbers:
+                    continue
+                self._entries.move_to_end(keys[row])
+                self.hits += 1
+                return copy.deepcopy(entry['response']), float(similarities[row])
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, kb_version: str, response: Dict):
+        """Mémorise la réponse finale d'une question"""
+        key = normalize_query(question)
+        embedding = self._embed(question)
+        with self._lock:
+            self._check_version(kb_version)
+            self._entries[key] = {
+                'response': copy.deepcopy(response),
+                'embedding': embedding,
+                'numbers': _NUMBER.findall(key),
+                'time': time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._matrix_keys = []
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Compteurs du cache (succès, échecs, invalidations)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'similarity_threshold': self.similarity_threshold,
+                'kb_version': self.kb_version,
+            }
@@ -4,26 +4,183 @@ RESPONSE_GENERATOR OPTIMISÉ - ZAMAPAY
 Version professionnelle avec gestion du contenu enrichi et tontine digitale
 """
 import os
+import re
 import random
 import json
 import time
+import queue
+import asyncio
 import threading
-from typing import Dict, List, Optional
-import google.generativeai as genai
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Iterator, List, Optional
 from dotenv import load_dotenv
+from lazy_loading import LazyModule
+from response_cache import SemanticResponseCache
+from bounded_cache import BoundedCache
+from shared_cache import SharedCache
+from embedding_cache import normalize_query
+from intent_matcher import detect_intents
+from resilience import CircuitBreaker, Deadline
+from context_packer import ContextPacker, TokenCounter, estimate_tokens
+
+# SDK Gemini (~1 s d'import) chargé à la configuration du modèle
+genai = LazyModule('google.generativeai')
+
+class ResponseStream:
+    """
+    Réponse diffusée par ResponseGenerator.generate_response_stream
+    
+    L'itération produit les fragments de texte; une fois le flux épuisé, `response`
+    contient la réponse complète (response, confidence, source...) à persister.
+    """
+    
+    def __init__(self, events: Iterator):
+        self._events = events
+        self.response: Optional[Dict] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        for event in self._events:
+            if isinstance(event, dict):
+                self.response = event
+            else:
+                yield event
+
+
+class SpeculativeStream:
+    """
+    Génération Gemini en streaming lancée en arrière-plan pendant la recherche
+    
+    Les fragments sont mis en file au fur et à mesure; replay() les restitue (ceux
+    déjà reçus puis les suivants) si la réponse est retenue, cancel() arrête la
+    génération sinon.
+    """
+    
+    _END = object()
+    
+    def __init__(self, events: Iterator, executor: ThreadPoolExecutor):
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self.future = executor.submit(self._consume, events)
+    
+    def _consume(self, events: Iterator):
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    self._queue.put(next(events))
+                except StopIteration as stop:
+                    # Valeur de retour du générateur: la réponse complète
+                    if stop.value:
+                        self._queue.put(stop.value)
+                    break
+        finally:
+            events.close()
+            self._queue.put(self._END)
+    
+    def cancel(self) -> bool:
+        self._cancelled.set()
+        return self.future.cancel()
+    
+    def replay(self) -> Iterator:
+        """Fragments de texte; retourne (valeur de `yield from`) la réponse complète ou None"""
+        response = None
+        while True:
+            event = self._queue.get()
+            if event is self._END:
+                return response
+            if isinstance(event, dict):
+                response = event
+            else:
+                yield event
+
 
 class ResponseGenerator:
     """Générateur de réponses sécurisé avec gestion de contenu enrichi"""
     
-    def __init__(self, retrieval_system):
+    # Sources dont la réponse finale peut être réutilisée pour une question proche
+    CACHEABLE_SOURCES = ('gemini', 'knowledge_base')
+    
+    # Réponses mises en cache sous forme de modèle: nom et confiance remplis à chaque service
+    NAME_PLACEHOLDER = "{user_name}"
+    CONFIDENCE_PLACEHOLDER = "{confidence}"
+    CONFIDENCE_LINE = re.compile(r"(📊 \*\*Confiance\*\*: )\d+%")
+    
+    def __init__(
+        self,
+        retrieval_system,
+        semantic_cache_threshold: float = 0.93,
+        kb_cache_size: int = 512,
+        kb_cache_max_bytes: int = 32 * 1024 * 1024,
+        shared_cache_path: Optional[str] = None,
+        retrieval_workers: int = 4,
+        speculative_gemini: bool = True,
+        speculative_confident_score: float = 0.85,
+        speculative_reuse_score: float = 0.4,
+        speculative_workers: int = 8,
+        request_budget_s: float = 15.0,
+        gemini_timeout_s: float = 10.0,
+        min_gemini_budget_s: float = 1.0,
+        breaker_failure_threshold: int = 3,
+        breaker_slow_call_s: float = 8.0,
+        breaker_cooldown_s: float = 30.0,
+        context_token_budget: int = 1200,
+        token_counter: Optional[Callable[[str], int]] = None
+    ):
         # Charger les variables d'environnement
         load_dotenv()
         
         self.retrieval_system = retrieval_system
         self.conversation_memory = {}
-        self.kb_cache = {}
         self.cache_timeout = 3600
         
+        # Résultats de recherche par question (LRU + TTL, borné en entrées et en octets)
+        self.kb_cache = BoundedCache(kb_cache_size, kb_cache_max_bytes, ttl=self.cache_timeout)
+        
+        # Réponses finales des questions déjà traitées, retrouvées par similarité
+        self.response_cache = SemanticResponseCache(
+            getattr(retrieval_system, 'embed_queries', None),
+            similarity_threshold=semantic_cache_threshold,
+            ttl=self.cache_timeout
+        )
+        
+        # Second niveau partagé entre processus et redémarrages (SQLite), si configuré
+        self.shared_cache = None
+        if shared_cache_path:
+            try:
+                self.shared_cache = SharedCache(shared_cache_path, ttl=self.cache_timeout)
+                print(f"✅ Cache partagé: {shared_cache_path}")
+            except Exception as e:
+                print(f"⚠️ Cache partagé indisponible: {e}")
+        
+        # Threads pour la recherche (CPU) et les caches (E/S) en mode asynchrone
+        self.retrieval_workers = retrieval_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
+        # Questions complexes: appel Gemini lancé en parallèle de la recherche
+        # - score KB >= speculative_confident_score: réponse de la base, appel abandonné
+        #   (en mode synchrone, un appel déjà lancé va à son terme et reste facturé)
+        # - score KB < speculative_reuse_score: contexte inutile, réponse spéculative réutilisée
+        # - entre les deux: nouvelle génération avec le contexte KB
+        self.speculative_gemini = speculative_gemini
+        self.speculative_confident_score = speculative_confident_score
+        self.speculative_reuse_score = speculative_reuse_score
+        self.speculative_workers = speculative_workers
+        self._speculation_executor = None
+        self.speculation_stats = {'started': 0, 'reuse': 0, 'generate': 0, 'skip': 0}
+        
+        # Budget de latence par requête et délai maximal d'un appel Gemini; après des
+        # échecs ou des appels lents successifs, Gemini est ignoré pendant breaker_cooldown_s
+        self.request_budget_s = request_budget_s
+        self.gemini_timeout_s = gemini_timeout_s
+        self.min_gemini_budget_s = min_gemini_budget_s
+        self.gemini_breaker = CircuitBreaker(breaker_failure_threshold, breaker_slow_call_s, breaker_cooldown_s)
+        
+        # Contexte KB du prompt limité à context_token_budget tokens (décomptes en cache);
+        # tokens de prompt et latence Gemini de chaque requête pour get_prompt_token_report
+        self.context_packer = ContextPacker(context_token_budget, TokenCounter(token_counter or estimate_tokens))
+        self._prompt_token_log = deque(maxlen=1000)
+        
         # ✅ RÉCUPÉRER LA CLÉ DEPUIS .env
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         
@@ -68,47 +225,371 @@ class ResponseGenerator:
             Dict avec response, confidence, source
         """
         print(f"💬 Question: '{user_message[:50]}...'")
+        deadline = Deadline(self.request_budget_s)
         
         try:
-            # 1. Détection prioritaire d'escalade
-            if self._detect_escalation(user_message):
-                return self._create_escalation_response(user_name)
+            # 1-3. Escalade, tontine, cache
+            immediate_response, kb_version = self._route_message(user_message, user_name)
+            if immediate_response:
+                return immediate_response
+            
+            # 4. Recherche dans la base (appel Gemini spéculatif en parallèle si question complexe)
+            speculative = None
+            if self._should_speculate(user_message, deadline):
+                speculative = self._get_speculation_executor().submit(
+                    self._generate_with_gemini, user_message, user_name, [], deadline
+                )
+            kb_results = self._search_knowledge_base(user_message)
             
-            # 2. Détection spécifique tontine
-            if self._detect_tontine_query(user_message):
-                return self._handle_tontine_query(user_message, user_name)
+            # 5. Si résultats insuffisants, utiliser Gemini
+            plan = self._gemini_plan(speculative, kb_results, user_message, deadline)
+            gemini_response = None
+            if plan == 'reuse':
+                gemini_response = self._mark_speculative(self._speculative_result(speculative, deadline))
+            elif plan == 'generate':
+                gemini_response = self._generate_with_gemini(user_message, user_name, kb_results, deadline)
+            if gemini_response:
+                self._cache_response(user_message, user_name, kb_version, gemini_response)
+                return gemini_response
             
-            # 3. Recherche dans la base de connaissances enrichie
+            # 6-7. Meilleure réponse de la base et mémoire conversationnelle
+            # (Gemini prévu mais indisponible: réponse de repli, non mise en cache)
+            return self._finalize_kb_response(user_message, user_name, kb_version, kb_results,
+                                              degraded=plan != 'skip')
+            
+        except Exception as e:
+            print(f"❌ Erreur dans generate_response: {e}")
+            return self._create_error_response(user_name)
+
+    def generate_response_stream(self, user_message: str, user_name: str = "Utilisateur") -> 'ResponseStream':
+        """
+        Variante de generate_response qui diffuse la réponse au fil de la génération
+        
+        Les réponses Gemini arrivent fragment par fragment (mode streaming); les autres
+        sources (escalade, tontine, cache, base de connaissances) en un seul fragment.
+        
+        Args:
+            user_message: Question de l'utilisateur
+            user_name: Nom de l'utilisateur
+            
+        Returns:
+            ResponseStream: itérable de fragments de texte; la réponse complète
+            (response, confidence, source...) est dans .response une fois épuisé
+        """
+        return ResponseStream(self._stream_response(user_message, user_name))
+
+    def _stream_response(self, user_message: str, user_name: str) -> Iterator:
+        """Fragments de texte puis, en dernier élément, le dict de réponse complet"""
+        print(f"💬 Question (streaming): '{user_message[:50]}...'")
+        deadline = Deadline(self.request_budget_s)
+        
+        try:
+            immediate_response, kb_version = self._route_message(user_message, user_name)
+            if immediate_response:
+                yield immediate_response['response']
+                yield immediate_response
+                return
+            
+            speculative = None
+            if self._should_speculate(user_message, deadline):
+                speculative = SpeculativeStream(
+                    self._stream_with_gemini(user_message, user_name, [], deadline), self._get_speculation_executor()
+                )
             kb_results = self._search_knowledge_base(user_message)
             
-            # 4. Si résultats insuffisants, utiliser Gemini
-            if self._should_use_gemini(kb_results, user_message):
-                gemini_response = self._generate_with_gemini(user_message, user_name, kb_results)
-                if gemini_response:
-                    return gemini_response
+            plan = self._gemini_plan(speculative, kb_results, user_message, deadline)
+            gemini_response = None
+            if plan == 'reuse':
+                # Fragments déjà reçus pendant la recherche, puis la suite
+                gemini_response = self._mark_speculative((yield from speculative.replay()))
+            elif plan == 'generate':
+                gemini_response = yield from self._stream_with_gemini(user_message, user_name, kb_results, deadline)
+            if gemini_response:
+                # Mise en cache seulement une fois la génération terminée
+                self._cache_response(user_message, user_name, kb_version, gemini_response)
+                yield gemini_response
+                return
+            
+            final_response = self._finalize_kb_response(user_message, user_name, kb_version, kb_results,
+                                                        degraded=plan != 'skip')
+            yield final_response['response']
+            yield final_response
+            
+        except Exception as e:
+            print(f"❌ Erreur dans generate_response_stream: {e}")
+            error_response = self._create_error_response(user_name)
+            yield error_response['response']
+            yield error_response
+
+    async def agenerate_response(self, user_message: str, user_name: str = "Utilisateur") -> Dict:
+        """
+        Variante asynchrone de generate_response
+        
+        La recherche (CPU) et les caches (SQLite) s'exécutent dans un pool de threads
+        borné; l'appel Gemini utilise le client asynchrone. Pendant l'aller-retour
+        Gemini, aucun thread n'est occupé: une seule boucle d'événements sert de
+        nombreuses conversations simultanées.
+        
+        Args:
+            user_message: Question de l'utilisateur
+            user_name: Nom de l'utilisateur
+            
+        Returns:
+            Dict avec response, confidence, source
+        """
+        print(f"💬 Question (async): '{user_message[:50]}...'")
+        deadline = Deadline(self.request_budget_s)
+        
+        try:
+            # 1-3. Escalade, tontine, cache
+            immediate_response, kb_version = await self._run_in_executor(
+                self._route_message, user_message, user_name
+            )
+            if immediate_response:
+                return immediate_response
             
-            # 5. Formater et retourner la meilleure réponse
-            final_response = self._format_best_response(kb_results, user_message, user_name)
+            # 4. Recherche dans la base (appel Gemini spéculatif en parallèle si question complexe)
+            speculative = None
+            if self._should_speculate(user_message, deadline):
+                speculative = asyncio.ensure_future(self._agenerate_with_gemini(user_message, user_name, [], deadline))
+            kb_results = await self._run_in_executor(self._search_knowledge_base, user_message)
             
-            # 6. Mettre à jour la mémoire conversationnelle
-            self._update_conversation_memory(user_name, user_message, final_response)
+            # 5. Si résultats insuffisants, utiliser Gemini
+            plan = self._gemini_plan(speculative, kb_results, user_message, deadline)
+            gemini_response = None
+            if plan == 'reuse':
+                gemini_response = self._mark_speculative(await speculative)
+            elif plan == 'generate':
+                gemini_response = await self._agenerate_with_gemini(user_message, user_name, kb_results, deadline)
+            if gemini_response:
+                await self._run_in_executor(
+                    self._cache_response, user_message, user_name, kb_version, gemini_response
+                )
+                return gemini_response
             
-            return final_response
+            # 6-7. Meilleure réponse de la base et mémoire conversationnelle
+            # (Gemini prévu mais indisponible: réponse de repli, non mise en cache)
+            return await self._run_in_executor(
+                self._finalize_kb_response, user_message, user_name, kb_version, kb_results, plan != 'skip'
+            )
             
         except Exception as e:
-            print(f"❌ Erreur dans generate_response: {e}")
+            print(f"❌ Erreur dans agenerate_response: {e}")
             return self._create_error_response(user_name)
 
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Pool de threads du mode asynchrone (créé au premier appel)"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.retrieval_workers, thread_name_prefix="zamapay-retrieval"
+                )
+            return self._executor
+
+    async def _run_in_executor(self, function, *args):
+        """Exécute une étape bloquante dans le pool sans bloquer la boucle d'événements"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), function, *args)
+
+    def _get_speculation_executor(self) -> ThreadPoolExecutor:
+        """Pool des appels Gemini spéculatifs (séparé: un appel lent n'y bloque pas la recherche)"""
+        with self._executor_lock:
+            if self._speculation_executor is None:
+                self._speculation_executor = ThreadPoolExecutor(
+                    max_workers=self.speculative_workers, thread_name_prefix="zamapay-speculative"
+                )
+            return self._speculation_executor
+
+    def _should_speculate(self, user_message: str, deadline: Optional[Deadline] = None) -> bool:
+        """Gemini sera très probablement appelé: lancer l'appel sans attendre la recherche"""
+        if not self.speculative_gemini or not self.gemini_model:
+            return False
+        if self._assess_question_complexity(user_message) != "high":
+            return False
+        if not self._gemini_allowed(deadline):
+            return False
+        with self._executor_lock:
+            self.speculation_stats['started'] += 1
+        print("🔮 Appel Gemini spéculatif (question complexe)")
+        return True
+
+    def _gemini_plan(self, speculative, kb_results: List[Dict], user_message: str,
+                     deadline: Optional[Deadline] = None) -> str:
+        """
+        Décide de l'étape 5 une fois les résultats de la base connus
+        
+        Args:
+            speculative: Appel Gemini spéculatif en cours (Future, Task, SpeculativeStream) ou None
+            
+        Returns:
+            'reuse' (réponse spéculative), 'generate' (Gemini avec le contexte KB),
+            'skip' (réponse de la base) ou 'fallback' (Gemini nécessaire mais disjoncteur
+            ouvert ou budget épuisé: réponse de la base en mode dégradé)
+        """
+        if speculative is None:
+            # Sans Gemini configuré, la réponse de la base est la réponse normale
+            if not self.gemini_model or not self._should_use_gemini(kb_results, user_message):
+                return 'skip'
+            return 'generate' if self._gemini_allowed(deadline) else 'fallback'
+        
+        best_score = kb_results[0].get('score', 0) if kb_results else 0
+        if best_score >= self.speculative_confident_score:
+            plan = 'skip'
+        elif best_score < self.speculative_reuse_score:
+            plan = 'reuse'
+        elif self._gemini_allowed(deadline, breaker_checked=True):
+            # Disjoncteur déjà consulté au lancement de l'appel spéculatif: en semi-ouverture,
+            # l'essai unique accordé alors couvre toute la requête
+            plan = 'generate'
+        else:
+            plan = 'fallback'
+        
+        if plan != 'reuse':
+            # Task asyncio et SpeculativeStream s'arrêtent; un Future déjà démarré ne peut
+            # pas être interrompu: l'appel synchrone abandonné va à son terme (et est facturé)
+            speculative.cancel()
+        with self._executor_lock:
+            self.speculation_stats['skip' if plan == 'fallback' else plan] += 1
+        print(f"🔮 Spéculation Gemini: {plan} (score KB {best_score:.2f})")
+        return plan
+
+    def _speculative_result(self, speculative, deadline: Deadline) -> Optional[Dict]:
+        """Attend la réponse spéculative, au plus jusqu'à l'échéance de la requête"""
+        try:
+            return speculative.result(timeout=deadline.remaining())
+        except FutureTimeoutError:
+            speculative.cancel()
+            print(f"⏱️ Réponse spéculative hors budget ({deadline.budget_s:.0f}s)")
+            return None
+
+    def _gemini_allowed(self, deadline: Optional[Deadline] = None, breaker_checked: bool = False) -> bool:
+        """
+        Gemini configuré, disjoncteur fermé et assez de temps restant pour un appel
+        
+        Args:
+            breaker_checked: Disjoncteur déjà consulté pour cette requête (appel spéculatif):
+                ne pas le reconsulter, allow() n'accordant qu'un essai en semi-ouverture
+        """
+        if not self.gemini_model:
+            return False
+        if deadline is not None and deadline.remaining() < self.min_gemini_budget_s:
+            print(f"⏱️ Budget épuisé ({deadline}): réponse de la base")
+            return False
+        if not breaker_checked and not self.gemini_breaker.allow():
+            print("🔌 Disjoncteur Gemini ouvert: réponse de la base")
+            return False
+        return True
+
+    def _gemini_request_options(self, deadline: Optional[Deadline]) -> Dict:
+        """Délai dur de l'appel Gemini: gemini_timeout_s, réduit au temps restant de la requête"""
+        timeout = self.gemini_timeout_s if deadline is None else deadline.timeout(self.gemini_timeout_s)
+        return {'timeout': max(timeout, 0.1)}
+
+    @staticmethod
+    def _mark_speculative(response: Optional[Dict]) -> Optional[Dict]:
+        if response:
+            response['speculative'] = True
+        return response
+
+    def _route_message(self, user_message: str, user_name: str):
+        """
+        Étapes communes aux modes direct, streaming et asynchrone avant la recherche
+        
+        Returns:
+            (réponse immédiate ou None, version de la base)
+        """
+        # 1. Détection prioritaire d'escalade
+        if self._detect_escalation(user_message):
+            return self._create_escalation_response(user_name), None
+        
+        # 2. Détection spécifique tontine
+        if self._detect_tontine_query(user_message):
+            return self._handle_tontine_query(user_message, user_name), None
+        
+        # 3. Réponse déjà produite pour une question proche (même version de la base)
+        kb_version = self._kb_version()
+        cached_response = self._get_cached_response(user_message, user_name, kb_version)
+        if cached_response:
+            self._update_conversation_memory(user_name, user_message, cached_response)
+            return cached_response, kb_version
+        
+        return None, kb_version
+
+    def _finalize_kb_response(self, user_message: str, user_name: str, kb_version: str, kb_results: List[Dict],
+                              degraded: bool = False) -> Dict:
+        """
+        Réponse issue de la base (ou template), mise en cache et mémorisée
+        
+        degraded: Gemini était nécessaire mais n'a pas répondu (disjoncteur, budget,
+        erreur ou délai dépassé); la réponse de repli est servie sans être mise en cache
+        """
+        # 6. Formater et retourner la meilleure réponse
+        final_response = self._format_best_response(kb_results, user_message, user_name)
+        if degraded:
+            final_response['degraded'] = True
+        self._cache_response(user_message, user_name, kb_version, final_response)
+        
+        # 7. Mettre à jour la mémoire conversationnelle
+        self._update_conversation_memory(user_name, user_message, final_response)
+        
+        return final_response
+
+    def _kb_version(self) -> str:
+        """Version de la base de connaissances du système de recherche"""
+        return str(getattr(self.retrieval_system, 'kb_version', None) or 'unversioned')
+    
+    def _get_cached_response(self, user_message: str, user_name: str, kb_version: str) -> Optional[Dict]:
+        """
+        Réponse mise en cache pour une question proche, personnalisée pour cette requête
+        
+        Le nom de l'utilisateur est inséré dans le modèle mis en cache; la confiance est
+        celle de la réponse d'origine pondérée par la similarité des deux questions.
+        """
+        cached = self.response_cache.lookup(user_message, kb_version)
+        if not cached and self.shared_cache is not None:
+            # Réponse produite par un autre processus ou avant un redémarrage
+            entry = self.shared_cache.get('responses', normalize_query(user_message), kb_version)
+            if entry and 'template' in entry:
+                self.response_cache.store(user_message, kb_version, entry)
+                cached = (entry, 1.0)
+        if not cached or 'template' not in cached[0]:
+            return None
+        entry, similarity = cached
+        response = entry['template']
+        response['confidence'] = response.get('confidence', 0) * similarity
+        response['response'] = (
+            response['response']
+            .replace(self.NAME_PLACEHOLDER, user_name)
+            .replace(self.CONFIDENCE_PLACEHOLDER, f"{response['confidence']:.0%}")
+        )
+        
+        response['cached'] = True
+        response['cache_similarity'] = similarity
+        print(f"💾 Réponse en cache (similarité {similarity:.2f})")
+        return response
+    
+    def _cache_response(self, user_message: str, user_name: str, kb_version: str, response: Dict):
+        """Mémorise une réponse finale coûteuse (Gemini ou base de connaissances)"""
+        if response.get('interrupted') or response.get('degraded'):
+            # Flux coupé ou repli pendant un incident Gemini: à ne pas resservir ensuite
+            return
+        if response.get('source') in self.CACHEABLE_SOURCES:
+            entry = {'template': self._response_template(response, user_name)}
+            self.response_cache.store(user_message, kb_version, entry)
+            if self.shared_cache is not None:
+                self.shared_cache.put('responses', normalize_query(user_message), entry, kb_version)
+    
+    def _response_template(self, response: Dict, user_name: str) -> Dict:
+        """Copie de la réponse dont le nom (mots entiers) et la confiance affichée sont des marqueurs"""
+        text = response['response']
+        if user_name and user_name != "Utilisateur":
+            text = re.sub(rf"(?<!\w){re.escape(user_name)}(?!\w)", lambda _: self.NAME_PLACEHOLDER, text)
+        text = self.CONFIDENCE_LINE.sub(lambda match: match.group(1) + self.CONFIDENCE_PLACEHOLDER, text)
+        return dict(response, response=text)
+    
     def _detect_tontine_query(self, message: str) -> bool:
         """Détecte les questions spécifiques sur la tontine"""
-        tontine_keywords = [
-            "tontine", "épargne collective", "cagnotte", "groupe épargne",
-            "rotative", "cotisation collective", "épargne groupe",
-            "tontine digitale", "tontine en ligne", "tontine numérique"
-        ]
-        
-        message_lower = message.lower()
-        return any(keyword in message_lower for keyword in tontine_keywords)
+        return detect_intents(message).has('tontine_query')
 
     def _handle_tontine_query(self, query: str, user_name: str) -> Dict:
         """Gère spécifiquement les questions sur la tontine"""
@@ -128,9 +609,9 @@ class ResponseGenerator:
 
     def _generate_tontine_template_response(self, query: str, user_name: str) -> Dict:
         """Génère une réponse template pour la tontine"""
-        query_lower = query.lower()
+        intents = detect_intents(query)
         
-        if any(word in query_lower for word in ["créer", "démarrer", "commencer", "lancer"]):
+        if intents.has('tontine_create'):
             return {
                 'response': f"""**🔄 Créer une Tontine ZamaPay - Guide Complet**
 
@@ -163,7 +644,7 @@ Bonjour {user_name} ! Voici comment créer votre tontine digitale :
                 'source': 'template_tontine'
             }
         
-        elif any(word in query_lower for word in ["avantage", "bénéfice", "sécurité", "garantie"]):
+        elif intents.has('tontine_benefits'):
             return {
                 'response': f"""**🛡️ Avantages & Sécurité Tontine ZamaPay**
 
@@ -229,26 +710,14 @@ Contactez notre équipe tontine : +226 25 40 92 76
 
     def _detect_escalation(self, message: str) -> bool:
         """Détecte si l'utilisateur veut parler à un humain"""
-        escalation_keywords = [
-            "humain", "agent", "conseiller", "personne", "réel", "vrai personne",
-            "parler à", "contact", "support", "urgent", "appeler", "téléphoner",
-            "whatsapp", "téléphone", "appel"
-        ]
-        
-        frustration_keywords = [
-            "mécontent", "fâché", "insatisfait", "problème", "bug", "erreur",
-            "ça marche pas", "fonctionne pas", "insupportable", "ridicule"
-        ]
-        
-        message_lower = message.lower()
+        intents = detect_intents(message)
         
         # Détection directe d'escalade
-        if any(kw in message_lower for kw in escalation_keywords):
+        if intents.has('escalation'):
             return True
             
         # Détection de frustration
-        frustration_count = sum(1 for kw in frustration_keywords if kw in message_lower)
-        if frustration_count >= 2:
+        if intents.count('frustration') >= 2:
             return True
             
         return False
@@ -282,15 +751,22 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
         Recherche optimisée avec support pour tous les systèmes
         """
         cache_key = query.lower().strip()
-        current_time = time.time()
         
         # Vérifier le cache
-        if cache_key in self.kb_cache:
-            cached = self.kb_cache[cache_key]
-            if current_time - cached['time'] < self.cache_timeout:
-                print("💾 Cache hit")
-                return cached['results']
+        cached = self.kb_cache.get(cache_key)
+        if cached is not None:
+            print("💾 Cache hit")
+            return cached
         
+        kb_version = self._kb_version()
+        if self.shared_cache is not None:
+            cached = self.shared_cache.get('kb', cache_key, kb_version)
+            if cached is not None:
+                print("💾 Cache partagé hit")
+                self.kb_cache.put(cache_key, cached)
+                return cached
+        
+        start_time = time.perf_counter()
         try:
             # ✅ CORRECTION: Gestion unifiée de tous les systèmes
             results = []
@@ -338,13 +814,15 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
                 if isinstance(result, dict) and result.get('score', 0) > 0.1:
                     relevant_results.append(result)
             
-            relevant_results.sort(key=lambda x: x.get('score', 0), reverse=True)
+            # Recherche hybride: l'ordre de fusion (RRF) prime sur le score affiché
+            if not any('rrf_score' in result for result in relevant_results):
+                relevant_results.sort(key=lambda x: x.get('score', 0), reverse=True)
             
             # Mettre en cache
-            self.kb_cache[cache_key] = {
-                'results': relevant_results[:3],
-                'time': current_time
-            }
+            self.kb_cache.put(cache_key, relevant_results[:3],
+                              compute_ms=(time.perf_counter() - start_time) * 1000)
+            if self.shared_cache is not None:
+                self.shared_cache.put('kb', cache_key, relevant_results[:3], kb_version)
             
             print(f"📚 Trouvé {len(relevant_results)} résultats pertinents")
             return relevant_results[:3]
@@ -383,7 +861,8 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
         
         return False
 
-    def _generate_with_gemini(self, query: str, user_name: str, kb_results: List[Dict]) -> Optional[Dict]:
+    def _generate_with_gemini(self, query: str, user_name: str, kb_results: List[Dict],
+                              deadline: Optional[Deadline] = None) -> Optional[Dict]:
         """
         Génère une réponse avec Gemini 2.5 Flash
         
@@ -391,6 +870,7 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
             query: Question de l'utilisateur
             user_name: Nom de l'utilisateur
             kb_results: Résultats de la KB pour contexte
+            deadline: Échéance de la requête (borne le délai de l'appel)
             
         Returns:
             Réponse formatée ou None en cas d'erreur
@@ -399,58 +879,178 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
             return None
         
         try:
-            prompt = self._build_gemini_prompt(query, user_name, kb_results)
+            prompt, token_info = self._build_gemini_request(query, user_name, kb_results)
+            request_options = self._gemini_request_options(deadline)
             
             print("🤖 Génération Gemini...")
             start_time = time.time()
-            response = self.gemini_model.generate_content(prompt)
+            response = self.gemini_model.generate_content(prompt, request_options=request_options)
             response_time = time.time() - start_time
+            self.gemini_breaker.record_success(response_time)
             
-            if response and hasattr(response, 'text') and response.text:
-                answer = response.text.strip()
-                
-                # ✅ CORRECTION: Calcul de confiance amélioré pour Gemini
-                # Base de confiance plus élevée pour Gemini
-                base_confidence = 0.85  # Augmenté de 0.8 à 0.85
-                
-                # Ajustement basé sur les résultats KB (plus favorable)
-                if kb_results:
-                    best_score = kb_results[0].get('score', 0)
-                    # Si la KB a des résultats pertinents, on augmente la confiance
-                    if best_score > 0.3:  # Seuil abaissé
-                        base_confidence = max(0.8, min(0.95, base_confidence + (best_score * 0.3)))
-                
-                # ✅ CORRECTION: Ajustement temps de réponse plus favorable
-                # Temps de réponse optimal entre 2-5 secondes
-                if response_time < 2.0:
-                    time_boost = 0.1  # Réponse très rapide
-                elif response_time < 5.0:
-                    time_boost = 0.05  # Réponse rapide
-                elif response_time > 10.0:
-                    time_boost = -0.1  # Réponse lente
-                else:
-                    time_boost = 0.0  # Temps normal
-                
-                final_confidence = base_confidence + time_boost
-                
-                # ✅ CORRECTION: Confiance minimale garantie pour Gemini
-                final_confidence = max(0.75, min(0.95, final_confidence))
-                
-                print(f"📊 Confiance Gemini: base={base_confidence:.2f}, temps={response_time:.2f}s, final={final_confidence:.2f}")
-                
-                return {
-                    'response': answer,
-                    'confidence': final_confidence,
-                    'source': 'gemini',
-                    'response_time': response_time
-                }
-            else:
-                print("⚠️ Réponse Gemini vide")
-                return None
+            return self._record_prompt_tokens(
+                token_info, self._format_gemini_response(response, kb_results, response_time), response_time
+            )
                 
         except Exception as e:
+            self.gemini_breaker.record_failure()
             print(f"⚠️ Erreur Gemini: {e}")
             return None
+
+    async def _agenerate_with_gemini(self, query: str, user_name: str, kb_results: List[Dict],
+                                     deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """Comme _generate_with_gemini, avec le client Gemini asynchrone"""
+        if not self.gemini_model:
+            return None
+        
+        try:
+            # La sélection des passages encode la question: hors de la boucle d'événements
+            prompt, token_info = await self._run_in_executor(self._build_gemini_request, query, user_name, kb_results)
+            request_options = self._gemini_request_options(deadline)
+            
+            print("🤖 Génération Gemini (async)...")
+            start_time = time.time()
+            response = await asyncio.wait_for(
+                self.gemini_model.generate_content_async(prompt, request_options=request_options),
+                timeout=request_options['timeout']
+            )
+            response_time = time.time() - start_time
+            self.gemini_breaker.record_success(response_time)
+            
+            return self._record_prompt_tokens(
+                token_info, self._format_gemini_response(response, kb_results, response_time), response_time
+            )
+        
+        except asyncio.CancelledError:
+            # Appel spéculatif annulé: ni succès ni échec du fournisseur
+            raise
+        except Exception as e:
+            self.gemini_breaker.record_failure()
+            print(f"⚠️ Erreur Gemini: {e or type(e).__name__}")
+            return None
+
+    def _format_gemini_response(self, response, kb_results: List[Dict], response_time: float) -> Optional[Dict]:
+        """Réponse formatée à partir du résultat Gemini, ou None si elle est vide"""
+        if response and hasattr(response, 'text') and response.text:
+            answer = response.text.strip()
+            
+            return {
+                'response': answer,
+                'confidence': self._gemini_confidence(kb_results, response_time),
+                'source': 'gemini',
+                'response_time': response_time
+            }
+        else:
+            print("⚠️ Réponse Gemini vide")
+            return None
+
+    def _stream_with_gemini(self, query: str, user_name: str, kb_results: List[Dict],
+                            deadline: Optional[Deadline] = None) -> Iterator:
+        """
+        Génère une réponse Gemini en mode streaming
+        
+        Générateur: produit les fragments de texte au fur et à mesure et retourne
+        (valeur de `yield from`) la réponse formatée, ou None si Gemini n'a rien produit.
+        Une coupure en cours de génération (erreur, échéance dépassée) conserve le
+        texte déjà reçu.
+        """
+        if not self.gemini_model:
+            return None
+        
+        prompt, token_info = self._build_gemini_request(query, user_name, kb_results)
+        request_options = self._gemini_request_options(deadline)
+        
+        print("🤖 Génération Gemini (streaming)...")
+        start_time = time.time()
+        first_token_time = None
+        parts = []
+        interrupted = False
+        try:
+            for chunk in self.gemini_model.generate_content(prompt, stream=True, request_options=request_options):
+                if deadline is not None and deadline.expired():
+                    print(f"⏱️ Échéance atteinte pendant le streaming ({deadline.budget_s:.0f}s)")
+                    interrupted = True
+                    break
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Fragment sans texte (ex: métadonnées de fin, blocage de sécurité)
+                    continue
+                if not text:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.time() - start_time
+                    print(f"⚡ Premier fragment Gemini après {first_token_time:.2f}s")
+                parts.append(text)
+                yield text
+        except Exception as e:
+            print(f"⚠️ Erreur Gemini (streaming): {e}")
+            interrupted = True
+        response_time = time.time() - start_time
+        
+        # Lenteur jugée sur le premier fragment: une longue réponse n'est pas un incident
+        if interrupted or first_token_time is None:
+            self.gemini_breaker.record_failure()
+        else:
+            self.gemini_breaker.record_success(first_token_time)
+        
+        answer = "".join(parts).strip()
+        if not answer:
+            print("⚠️ Réponse Gemini vide")
+            return self._record_prompt_tokens(token_info, None, None)
+        
+        response = {
+            'response': answer,
+            'confidence': self._gemini_confidence(kb_results, response_time),
+            'source': 'gemini',
+            'response_time': response_time,
+            'first_token_time': first_token_time
+        }
+        if interrupted:
+            response['interrupted'] = True
+        return self._record_prompt_tokens(token_info, response, response_time)
+
+    def _record_prompt_tokens(self, token_info: Dict, response: Optional[Dict],
+                              response_time: Optional[float]) -> Optional[Dict]:
+        """Joint le décompte de tokens à la réponse et l'enregistre pour le rapport"""
+        if response:
+            response.update(token_info)
+        with self._executor_lock:
+            self._prompt_token_log.append((token_info['prompt_tokens'], token_info['context_tokens'],
+                                           response_time if response else None))
+        return response
+
+    def _gemini_confidence(self, kb_results: List[Dict], response_time: float) -> float:
+        """Confiance d'une réponse Gemini selon le contexte KB et le temps de génération"""
+        # ✅ CORRECTION: Calcul de confiance amélioré pour Gemini
+        # Base de confiance plus élevée pour Gemini
+        base_confidence = 0.85  # Augmenté de 0.8 à 0.85
+        
+        # Ajustement basé sur les résultats KB (plus favorable)
+        if kb_results:
+            best_score = kb_results[0].get('score', 0)
+            # Si la KB a des résultats pertinents, on augmente la confiance
+            if best_score > 0.3:  # Seuil abaissé
+                base_confidence = max(0.8, min(0.95, base_confidence + (best_score * 0.3)))
+        
+        # ✅ CORRECTION: Ajustement temps de réponse plus favorable
+        # Temps de réponse optimal entre 2-5 secondes
+        if response_time < 2.0:
+            time_boost = 0.1  # Réponse très rapide
+        elif response_time < 5.0:
+            time_boost = 0.05  # Réponse rapide
+        elif response_time > 10.0:
+            time_boost = -0.1  # Réponse lente
+        else:
+            time_boost = 0.0  # Temps normal
+        
+        final_confidence = base_confidence + time_boost
+        
+        # ✅ CORRECTION: Confiance minimale garantie pour Gemini
+        final_confidence = max(0.75, min(0.95, final_confidence))
+        
+        print(f"📊 Confiance Gemini: base={base_confidence:.2f}, temps={response_time:.2f}s, final={final_confidence:.2f}")
+        return final_confidence
         
     def _should_use_gemini(self, kb_results: List[Dict], user_message: str) -> bool:
         """
@@ -496,17 +1096,11 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
         Returns:
             "low", "medium", "high"
         """
-        message_lower = message.lower()
-        word_count = len(message.split())
-        
-        # Mots indiquant une question complexe
-        complex_indicators = [
-            "comparer", "différence", "avantage", "inconvénient", "quelle est la meilleure",
-            "recommander", "conseiller", "pourquoi", "comment fonctionne", "étape par étape",
-            "guide complet", "tutoriel", "expliquer en détail"
-        ]
+        intents = detect_intents(message)
+        word_count = intents.word_count
         
-        complex_count = sum(1 for indicator in complex_indicators if indicator in message_lower)
+        # Mots indiquant une question complexe (table 'complexity')
+        complex_count = intents.count('complexity')
         
         if complex_count >= 2 or word_count > 20:
             return "high"
@@ -515,30 +1109,63 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
         else:
             return "low"
     
+    def _select_passages(self, query: str, kb_results: List[Dict], per_qa: int = 2) -> Dict[str, List[Dict]]:
+        """
+        Sections des réponses KB les plus pertinentes pour la question
+        
+        Returns:
+            Au plus per_qa passages par identifiant de Q&A (vide si le système de
+            recherche n'a pas d'index de passages)
+        """
+        if not hasattr(self.retrieval_system, 'search_passages'):
+            return {}
+        
+        qa_ids = [result.get('qa_data', {}).get('id') for result in kb_results]
+        qa_ids = [qa_id for qa_id in qa_ids if qa_id is not None]
+        if not qa_ids:
+            return {}
+        
+        try:
+            # Un passage par Q&A en moyenne: le contexte reste court
+            passages = self.retrieval_system.search_passages(query, qa_ids=qa_ids, top_k=len(qa_ids) + 1)
+        except Exception as e:
+            print(f"⚠️ Erreur recherche passages: {e}")
+            return {}
+        
+        passages_by_qa = {}
+        for passage in passages:
+            selected = passages_by_qa.setdefault(str(passage['qa_id']), [])
+            if len(selected) < per_qa:
+                selected.append(passage)
+        return passages_by_qa
+    
     def _build_gemini_prompt(self, query: str, user_name: str, kb_results: List[Dict]) -> str:
         """
         Construit un prompt optimisé pour Gemini - Version améliorée
         """
-        # Construire le contexte à partir des résultats KB
+        return self._build_gemini_request(query, user_name, kb_results)[0]
+
+    def _build_gemini_request(self, query: str, user_name: str, kb_results: List[Dict]):
+        """
+        Prompt Gemini et décompte de ses tokens
+        
+        Returns:
+            (prompt, {'prompt_tokens', 'context_tokens', 'context_budget', 'passages_dropped'})
+        """
+        # Construire le contexte à partir des résultats KB: passages entiers, par
+        # pertinence (les sections trouvées pour la question d'abord), dans le budget
         context_lines = []
+        packed = None
         if kb_results:
-            context_lines.append("**INFORMATIONS ZAMAPAY PERTINENTES:**")
-            for i, result in enumerate(kb_results[:3]):  # Prendre les 3 meilleurs maintenant
-                qa_data = result.get('qa_data', {})
-                question = qa_data.get('question_principale', '')
-                answer = qa_data.get('reponse', '')
-                score = result.get('score', 0)
-                
-                if question and answer:
-                    relevance_note = "📊 Pertinence élevée" if score > 0.7 else "📊 Information connexe"
-                    context_lines.append(f"{i+1}. **Q**: {question}")
-                    context_lines.append(f"   **R**: {answer[:400]}...")  # Limiter moins strictement
-                    context_lines.append(f"   *{relevance_note}*")
-                    context_lines.append("")  # Ligne vide pour la lisibilité
+            passages_by_qa = self._select_passages(query, kb_results[:self.context_packer.max_qa])
+            packed = self.context_packer.pack(kb_results, passages_by_qa)
+            if packed.blocks:
+                context_lines.append("**INFORMATIONS ZAMAPAY PERTINENTES:**")
+                context_lines.extend(self.context_packer.render(packed))
         
         context_text = "\n".join(context_lines) if context_lines else "Aucune information spécifique trouvée dans la base de connaissances ZamaPay."
 
-        return f"""Tu es l'assistant expert de ZamaPay, plateforme leader de finance inclusive en Afrique de l'Ouest.
+        prompt = f"""Tu es l'assistant expert de ZamaPay, plateforme leader de finance inclusive en Afrique de l'Ouest.
 
     **INFORMATIONS ENTREPRISE ZAMAPAY:**
     - Siège: Ouagadougou, Burkina Faso
@@ -575,6 +1202,16 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
     - Orienté service client
 
     **RÉPONSE ZAMAPAY (format structuré et utile):**"""
+        
+        token_info = {
+            'prompt_tokens': self.context_packer.counter.count(prompt, cache=False),
+            'context_tokens': packed.tokens if packed else 0,
+            'context_budget': self.context_packer.budget_tokens,
+            'passages_dropped': packed.dropped if packed else 0,
+        }
+        print(f"🧮 Prompt Gemini: {token_info['prompt_tokens']} tokens "
+              f"(contexte {token_info['context_tokens']}/{token_info['context_budget']})")
+        return prompt, token_info
 
     def _format_best_response(self, kb_results: List[Dict], query: str, user_name: str) -> Dict:
         """
@@ -653,10 +1290,10 @@ Notre équipe est là pour vous aider personnellement ! 💙""",
         Returns:
             Réponse template
         """
-        query_lower = query.lower()
+        intents = detect_intents(query)
         
         # Salutations
-        if any(w in query_lower for w in ["bonjour", "salut", "hello", "slt", "coucou", "bjr"]):
+        if intents.has('template_greeting'):
             return {
                 'response': f"""👋 Bonjour {user_name} !
 
@@ -678,7 +1315,7 @@ Je suis l'assistant ZamaPay, votre expert en services financiers digitaux.
             }
         
         # Frais
-        elif any(w in query_lower for w in ["frais", "tarif", "coût", "prix", "combien coûte"]):
+        elif intents.has('template_fees'):
             return {
                 'response': f"""**💰 Frais ZamaPay - Transparence Totale**
 
@@ -706,7 +1343,7 @@ Je suis l'assistant ZamaPay, votre expert en services financiers digitaux.
             }
         
         # Délais
-        elif any(w in query_lower for w in ["délai", "temps", "combien de temps", "durée", "quand"]):
+        elif intents.has('template_delays'):
             return {
                 'response': f"""**⏱️ Délais de Traitement ZamaPay**
 
@@ -727,7 +1364,7 @@ Je suis l'assistant ZamaPay, votre expert en services financiers digitaux.
             }
         
         # Sécurité
-        elif any(w in query_lower for w in ["sécurité", "sécurisé", "protection", "fraude", "risque"]):
+        elif intents.has('template_security'):
             return {
                 'response': f"""**🔒 Sécurité ZamaPay - Niveau Maximum**
 
@@ -753,7 +1390,7 @@ Je suis l'assistant ZamaPay, votre expert en services financiers digitaux.
             }
         
         # Tontine spécifique
-        elif any(w in query_lower for w in ["tontine", "épargne collective", "cagnotte"]):
+        elif intents.has('template_tontine'):
             return self._generate_tontine_template_response(query, user_name)
         
         # Défaut - réponse générique
@@ -844,25 +1481,8 @@ Le service normal sera rétabli rapidement ! 🔧""",
             print(f"⚠️ Erreur mise à jour mémoire: {e}")
 
     def _detect_topics(self, message: str) -> List[str]:
-        """Détecte les topics dans un message"""
-        topics = []
-        message_lower = message.lower()
-        
-        topic_keywords = {
-            'frais': ['frais', 'tarif', 'coût', 'prix'],
-            'délais': ['délai', 'temps', 'combien de temps', 'quand'],
-            'sécurité': ['sécurité', 'sécurisé', 'protection', 'fraude'],
-            'compte': ['compte', 'vérification', 'authentification', 'profil'],
-            'mobile_money': ['mobile money', 'orange', 'moov', 'wave'],
-            'transfert': ['transfert', 'envoyer', 'envoi', 'argent'],
-            'tontine': ['tontine', 'épargne collective', 'cagnotte', 'rotative']
-        }
-        
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                topics.append(topic)
-        
-        return topics
+        """Détecte les topics dans un message (tables topic_* du matcher d'intentions)"""
+        return detect_intents(message).topics()
 
     def get_conversation_stats(self, user_name: str) -> Dict:
         """Retourne les statistiques de conversation"""
@@ -888,9 +1508,64 @@ Le service normal sera rétabli rapidement ! 🔧""",
             del self.conversation_memory[user_name]
             print(f"🧹 Conversation effacée pour {user_name}")
 
+    def get_speculation_stats(self) -> Dict:
+        """Appels Gemini spéculatifs lancés et décisions prises (réutilisé, régénéré, annulé)"""
+        with self._executor_lock:
+            stats = dict(self.speculation_stats)
+        decided = stats['reuse'] + stats['generate'] + stats['skip']
+        stats['reuse_rate'] = stats['reuse'] / decided if decided else 0.0
+        return stats
+
+    def get_resilience_stats(self) -> Dict:
+        """Budget de latence, délai Gemini et état du disjoncteur"""
+        return {
+            'request_budget_s': self.request_budget_s,
+            'gemini_timeout_s': self.gemini_timeout_s,
+            'breaker': self.gemini_breaker.get_stats()
+        }
+
+    def get_prompt_token_report(self) -> Dict:
+        """
+        Tokens de prompt des dernières requêtes Gemini et latence par taille de prompt
+        
+        Sert à arbitrer le budget de contexte (context_token_budget) entre qualité,
+        latence et coût.
+        """
+        with self._executor_lock:
+            entries = list(self._prompt_token_log)
+        if not entries:
+            return {'requests': 0, 'context_budget': self.context_packer.budget_tokens}
+        
+        prompt_tokens = sorted(entry[0] for entry in entries)
+        latency_by_size = {}
+        for tokens, _, latency in entries:
+            if latency is None:
+                continue
+            bucket = next((f"<{bound}" for bound in (500, 1000, 2000, 4000) if tokens < bound), ">=4000")
+            stats = latency_by_size.setdefault(bucket, {'requests': 0, 'total_s': 0.0})
+            stats['requests'] += 1
+            stats['total_s'] += latency
+        
+        return {
+            'requests': len(entries),
+            'context_budget': self.context_packer.budget_tokens,
+            'avg_prompt_tokens': sum(prompt_tokens) / len(prompt_tokens),
+            'p95_prompt_tokens': prompt_tokens[min(int(len(prompt_tokens) * 0.95), len(prompt_tokens) - 1)],
+            'max_prompt_tokens': prompt_tokens[-1],
+            'avg_context_tokens': sum(entry[1] for entry in entries) / len(entries),
+            'latency_by_prompt_tokens': {
+                bucket: {'requests': stats['requests'], 'avg_latency_s': stats['total_s'] / stats['requests']}
+                for bucket, stats in latency_by_size.items()
+            },
+            'token_count_cache': self.context_packer.counter.get_stats(),
+        }
+
     def clear_all_caches(self):
         """Efface tous les caches"""
         self.kb_cache.clear()
+        self.response_cache.clear()
+        if self.shared_cache is not None:
+            self.shared_cache.clear()
         self.conversation_memory.clear()
         print("🧹 Tous les caches effacés")
 
@@ -898,8 +1573,11 @@ Le service normal sera rétabli rapidement ! 🔧""",
         """Retourne des informations sur les caches"""
         return {
             'kb_cache_size': len(self.kb_cache),
+            'kb_cache': self.kb_cache.get_stats(),
             'conversation_memory_size': len(self.conversation_memory),
-            'cache_timeout': self.cache_timeout
+            'cache_timeout': self.cache_timeout,
+            'response_cache': self.response_cache.get_stats(),
+            'shared_cache': self.shared_cache.get_stats() if self.shared_cache is not None else None
         }
 
 # Test du système
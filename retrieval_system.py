@@ -1,15 +1,29 @@
 import json
+import hashlib
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
 import re
+from lazy_loading import LazyModule
+from passage_index import PassageIndex
+
+# scikit-learn et scipy importés à la construction du système, pas à l'import
+sklearn_text = LazyModule('sklearn.feature_extraction.text')
+sklearn_pairwise = LazyModule('sklearn.metrics.pairwise')
+tfidf_index = LazyModule('tfidf_index')
+score_aggregation = LazyModule('score_aggregation')
 
 class RetrievalSystem:
-    def __init__(self, knowledge_base_path="knowledge_base.json"):
-        self.vectorizer = TfidfVectorizer(stop_words=None)
+    def __init__(self, knowledge_base_path="knowledge_base.json", tfidf_index_path="tfidf_index.bin"):
+        self.vectorizer = sklearn_text.TfidfVectorizer(stop_words=None)
+        self.tfidf_index_path = tfidf_index_path
         self.knowledge_base = self.load_knowledge_base(knowledge_base_path)
+        self.kb_version = hashlib.sha256(
+            json.dumps(self.knowledge_base.get('qa_pairs', []), ensure_ascii=False, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:16]
         self.qa_vectors = None
+        self.valid_qa_pairs = []
         self.build_vectors()
+        # Mêmes Q&A que l'index TF-IDF (entrées invalides écartées par build_vectors)
+        self.passage_index = PassageIndex(self.valid_qa_pairs)
     
     def load_knowledge_base(self, path):
         """Charge la base de connaissances avec gestion d'erreurs améliorée"""
@@ -50,16 +64,18 @@ class RetrievalSystem:
         return text
     
     def build_vectors(self):
-        """Construit les vecteurs TF-IDF avec gestion d'erreurs"""
+        """Construit les vecteurs TF-IDF (ou les recharge depuis l'artefact persistant)"""
         texts_to_vectorize = []
+        ref_qa = []
         self.qa_references = []
+        self.valid_qa_pairs = []
         
         # Vérifier que knowledge_base a la bonne structure
         if not isinstance(self.knowledge_base, dict) or 'qa_pairs' not in self.knowledge_base:
             print("❌ Structure knowledge_base invalide")
             return
         
-        for qa in self.knowledge_base['qa_pairs']:
+        for qa_position, qa in enumerate(self.knowledge_base['qa_pairs']):
             # Vérifier que qa est un dictionnaire valide
             if not isinstance(qa, dict):
                 print("⚠️ Q&A ignoré: n'est pas un dictionnaire")
@@ -68,11 +84,13 @@ class RetrievalSystem:
             if 'question_principale' not in qa:
                 print("⚠️ Q&A ignoré: question_principale manquante")
                 continue
+            self.valid_qa_pairs.append(qa)
             
             # Question principale
             question_text = self.preprocess_text(qa['question_principale'])
             if question_text:
                 texts_to_vectorize.append(question_text)
+                ref_qa.append(qa_position)
                 self.qa_references.append({
                     'id': qa.get('id', len(self.qa_references)),
                     'type': 'main',
@@ -87,6 +105,7 @@ class RetrievalSystem:
                         variation_text = self.preprocess_text(variation)
                         if variation_text:
                             texts_to_vectorize.append(variation_text)
+                            ref_qa.append(qa_position)
                             self.qa_references.append({
                                 'id': qa.get('id', len(self.qa_references)),
                                 'type': 'variation', 
@@ -95,7 +114,11 @@ class RetrievalSystem:
         
         if texts_to_vectorize:
             try:
-                self.qa_vectors = self.vectorizer.fit_transform(texts_to_vectorize)
+                ref_type = [tfidf_index.ref_type_code(ref['type']) for ref in self.qa_references]
+                artifact = tfidf_index.load_or_build_tfidf_index(self.tfidf_index_path, texts_to_vectorize, ref_qa, ref_type)
+                self.vectorizer = artifact.vectorizer
+                self.qa_vectors = artifact.matrix
+                self.qa_aggregator = score_aggregation.QaScoreAggregator(artifact.ref_qa)
                 print(f"✅ Système TF-IDF initialisé avec {len(texts_to_vectorize)} questions")
             except Exception as e:
                 print(f"❌ Erreur initialisation TF-IDF: {e}")
@@ -106,39 +129,44 @@ class RetrievalSystem:
     
     def search(self, query, top_k=3, confidence_threshold=0.1):  
         """Recherche avec seuil de confiance plus bas"""
+        return self.search_batch([query], top_k, confidence_threshold)[0]
+    
+    def search_batch(self, queries, top_k=3, confidence_threshold=0.1):
+        """Recherche groupée: une seule transformation TF-IDF et un seul produit matriciel"""
         if self.qa_vectors is None or self.qa_vectors.shape[0] == 0:
-            return []
+            return [[] for _ in queries]
         
         try:
-            query_vec = self.vectorizer.transform([self.preprocess_text(query)])
-            similarities = cosine_similarity(query_vec, self.qa_vectors)
+            query_vecs = self.vectorizer.transform([self.preprocess_text(query) for query in queries])
+            similarities = sklearn_pairwise.cosine_similarity(query_vecs, self.qa_vectors)
             
-            top_indices = np.argsort(similarities[0])[-top_k:][::-1]
-            
-            results = []
-            for idx in top_indices:
-                score = similarities[0][idx]
-                if score >= confidence_threshold:  
-                    qa_ref = self.qa_references[idx]
+            # Meilleur score par Q&A (question ou variation), top-k sans doublons
+            batch_results = []
+            for matches in self.qa_aggregator.top_k(similarities, top_k, confidence_threshold):
+                results = []
+                for _, score, row in matches:
+                    qa_ref = self.qa_references[row]
                     
                     # Vérifier que qa_data existe
                     if 'qa_data' not in qa_ref:
                         continue
                     
-                    # Éviter les doublons
-                    qa_id = qa_ref['qa_data'].get('id')
-                    if not any(r['qa_data'].get('id') == qa_id for r in results):
-                        results.append({
-                            'qa_data': qa_ref['qa_data'],
-                            'score': float(score),
-                            'match_type': qa_ref['type']
-                        })
+                    results.append({
+                        'qa_data': qa_ref['qa_data'],
+                        'score': score,
+                        'match_type': qa_ref['type']
+                    })
+                batch_results.append(results)
             
-            return results
+            return batch_results
             
         except Exception as e:
             print(f"❌ Erreur recherche: {e}")
-            return []
+            return [[] for _ in queries]
+    
+    def search_passages(self, query, qa_ids=None, top_k=3):
+        """Sections de réponses les plus pertinentes (limitées éventuellement à certaines Q&A)"""
+        return self.passage_index.search(query, qa_ids, top_k)
     
     def get_qa_by_id(self, qa_id):
         """Récupère une Q&A par son ID"""
@@ -0,0 +1,91 @@
+"""
+Agrégation vectorisée des scores par Q&A
+Une Q&A indexée par plusieurs textes (question + variations) ne compte qu'une fois,
+avec le meilleur score de ses textes
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from typing import List, Tuple
+
+
+class QaScoreAggregator:
+    """Max-pooling des scores ligne -> Q&A via une matrice creuse précalculée"""
+
+    def __init__(self, row_qa):
+        """
+        Args:
+            row_qa: Identifiant de Q&A (position dans la base) de chaque ligne indexée
+        """
+        row_qa = np.asarray(row_qa)
+        self.qa_ids, row_group = np.unique(row_qa, return_inverse=True)
+        n_rows = row_qa.shape[0]
+
+        # Matrice (lignes x Q&A) de correspondance
+        self.mapping = csr_matrix(
+            (np.ones(n_rows, dtype=np.int8), (np.arange(n_rows), row_group)),
+            shape=(n_rows, len(self.qa_ids))
+        )
+
+        # En CSC, les lignes de chaque Q&A sont contiguës: indptr délimite les groupes
+        mapping_csc = self.mapping.tocsc()
+        mapping_csc.sort_indices()
+        self._row_order = mapping_csc.indices
+        self._group_starts = mapping_csc.indptr[:-1]
+        self._group_ends = mapping_csc.indptr[1:]
+
+    def qa_scores(self, similarities: np.ndarray) -> np.ndarray:
+        """
+        Meilleur score de chaque Q&A
+
+        Args:
+            similarities: Scores (n_requêtes, n_lignes)
+
+        Returns:
+            Scores (n_requêtes, n_qa)
+        """
+        similarities = np.atleast_2d(similarities)
+        return np.maximum.reduceat(similarities[:, self._row_order], self._group_starts, axis=1)
+
+    def best_row(self, row_scores: np.ndarray, group: int) -> int:
+        """Ligne ayant obtenu le meilleur score d'une Q&A"""
+        rows = self._row_order[self._group_starts[group]:self._group_ends[group]]
+        return int(rows[np.argmax(row_scores[rows])])
+
+    def top_k(self, similarities: np.ndarray, top_k: int, confidence_threshold: float) -> List[List[Tuple[int, float, int]]]:
+        """
+        Les top_k Q&A distinctes de chaque requête
+
+        Args:
+            similarities: Scores (n_requêtes, n_lignes)
+            top_k: Nombre de Q&A par requête
+            confidence_threshold: Score minimum
+
+        Returns:
+            Pour chaque requête, liste de (position Q&A, score, meilleure ligne) triée par score
+        """
+        similarities = np.atleast_2d(similarities)
+        scores = self.qa_scores(similarities)
+        n_qa = scores.shape[1]
+        k = min(top_k, n_qa)
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+
+        if k < n_qa:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(n_qa), (scores.shape[0], 1))
+
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+        batch_results = []
+        for row_scores, groups, group_scores in zip(similarities, candidates, candidate_scores):
+            batch_results.append([
+                (int(self.qa_ids[group]), float(score), self.best_row(row_scores, group))
+                for group, score in zip(groups, group_scores)
+                if score >= confidence_threshold
+            ])
+        return batch_results
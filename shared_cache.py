@@ -0,0 +1,168 @@
+"""
+Cache partagé entre processus, adossé à SQLite
+Les workers Streamlit d'un même serveur réutilisent les recherches et réponses des
+autres, et le cache survit aux redémarrages. Mode WAL: lectures concurrentes,
+chaque écriture est une transaction atomique
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    kb_version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SharedCache:
+    """Cache clé -> valeur JSON par espace de noms, partagé par tous les processus d'un hôte"""
+
+    def __init__(self, path: str = "zamapay_cache.sqlite3", ttl: float = 3600,
+                 max_entries: int = 20_000, prune_every: int = 200):
+        """
+        Args:
+            path: Fichier SQLite partagé
+            ttl: Durée de validité d'une entrée en secondes
+            max_entries: Nombre maximal d'entrées (les moins récemment lues sont supprimées)
+            prune_every: Nettoyage (expirées, excédent) toutes les prune_every écritures
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+
+        # Une connexion par thread (les connexions sqlite3 ne se partagent pas entre threads)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+        with self._connection() as connection:
+            connection.execute(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, namespace: str, key: str, kb_version: str = "") -> Optional[Any]:
+        """Valeur valide (même version de la base, non expirée) ou None"""
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT value, kb_version, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[1] != kb_version or now - row[2] >= self.ttl:
+                self._count('misses')
+                return None
+            with connection:
+                connection.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+            self._count('hits')
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self._count('errors')
+            print(f"⚠️ Erreur lecture cache partagé: {e}")
+            return None
+
+    def put(self, namespace: str, key: str, value: Any, kb_version: str = "") -> bool:
+        """Écrit (ou remplace) une entrée en une transaction"""
+        now = time.time()
+        try:
+            payload = json.dumps(value, ensure_ascii=False, default=str)
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache_entries "
+                    "(namespace, key, kb_version, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, kb_version, payload, now, now)
+                )
+            self._count('writes')
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._count('errors')
+            print(f"⚠️ Erreur écriture cache partagé: {e}")
+            return False
+
+        with self._lock:
+            self._writes_since_prune += 1
+            prune = self._writes_since_prune >= self.prune_every
+            if prune:
+                self._writes_since_prune = 0
+        if prune:
+            self.prune()
+        return True
+
+    def prune(self) -> int:
+        """Supprime les entrées expirées puis les moins récemment lues au-delà de max_entries"""
+        try:
+            connection = self._connection()
+            with connection:
+                removed = connection.execute(
+                    "DELETE FROM cache_entries WHERE created_at <= ?", (time.time() - self.ttl,)
+                ).rowcount
+                removed += connection.execute(
+                    "DELETE FROM cache_entries WHERE rowid IN ("
+                    "SELECT rowid FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+            return removed
+        except sqlite3.Error as e:
+            self._count('errors')
+            print(f"⚠️ Erreur nettoyage cache partagé: {e}")
+            return 0
+
+    def clear(self, namespace: Optional[str] = None):
+        try:
+            connection = self._connection()
+            with connection:
+                if namespace is None:
+                    connection.execute("DELETE FROM cache_entries")
+                else:
+                    connection.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Erreur vidage cache partagé: {e}")
+
+    def get_stats(self) -> Dict:
+        """Compteurs de ce processus et nombre d'entrées par espace de noms"""
+        try:
+            entries = dict(self._connection().execute(
+                "SELECT namespace, COUNT(*) FROM cache_entries GROUP BY namespace"
+            ).fetchall())
+        except sqlite3.Error:
+            entries = {}
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'writes': self.writes,
+            'errors': self.errors,
+        }
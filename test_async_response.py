@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test du pipeline asynchrone de ZamaPay (agenerate_response)
+Vérifie l'équivalence avec generate_response et le traitement simultané de
+nombreuses conversations avec peu de threads
+"""
+
+import time
+import asyncio
+import threading
+from response_generator import ResponseGenerator
+
+
+class Retrieval:
+    """Recherche factice: un résultat moyen, enregistre les threads utilisés"""
+
+    use_faiss = False
+    kb_version = "v1"
+
+    def __init__(self):
+        self.threads = set()
+
+    def search(self, query, top_k=3, confidence_threshold=0.1):
+        self.threads.add(threading.current_thread().name)
+        return [{'score': 0.4, 'qa_data': {'id': 1, 'question_principale': "Frais", 'reponse': "Frais de 1%"}}]
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class AsyncModel:
+    """Modèle Gemini factice avec client asynchrone"""
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.sync_calls = 0
+        self.async_calls = 0
+
+    def generate_content(self, prompt, request_options=None):
+        self.sync_calls += 1
+        return Response("Réponse Gemini")
+
+    async def generate_content_async(self, prompt, request_options=None):
+        self.async_calls += 1
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("Gemini indisponible")
+        return Response("Réponse Gemini")
+
+
+def make_generator(model, workers=2):
+    generator = ResponseGenerator(Retrieval(), retrieval_workers=workers)
+    generator.gemini_model = model
+    return generator
+
+
+def test_same_as_sync():
+    """Même routage et même réponse que generate_response, avec le client asynchrone"""
+    print("🧪 TEST ÉQUIVALENCE SYNC / ASYNC")
+    print("-" * 40)
+
+    for message in ["Quels sont les frais ?", "Je veux parler à un conseiller", "Comment créer une tontine ?"]:
+        sync_generator = make_generator(AsyncModel())
+        async_generator = make_generator(AsyncModel())
+        expected = sync_generator.generate_response(message, "Awa")
+        response = asyncio.run(async_generator.agenerate_response(message, "Awa"))
+        assert response['source'] == expected['source'], message
+        assert response['response'] == expected['response'], message
+        assert async_generator.gemini_model.sync_calls == 0
+    print("   ✅ Réponses identiques")
+
+
+def test_gemini_failure_falls_back():
+    """Une erreur Gemini retombe sur la réponse de la base"""
+    print("\n🧪 TEST REPLI")
+    print("-" * 40)
+
+    generator = make_generator(AsyncModel(fail=True))
+    response = asyncio.run(generator.agenerate_response("Quels sont les frais ?", "Awa"))
+    assert generator.gemini_model.async_calls == 1
+    assert response['source'] != 'gemini'
+    print(f"   ✅ Source de repli: {response['source']}")
+
+
+def test_concurrent_sessions():
+    """50 conversations simultanées: durée ~ une latence Gemini, recherche sur 2 threads"""
+    print("\n🧪 TEST CONVERSATIONS SIMULTANÉES")
+    print("-" * 40)
+
+    generator = make_generator(AsyncModel(latency=0.3), workers=2)
+
+    async def main():
+        return await asyncio.gather(*(
+            generator.agenerate_response(f"Quels sont les frais pour {i} envois ?", f"Client{i}")
+            for i in range(50)
+        ))
+
+    start = time.perf_counter()
+    responses = asyncio.run(main())
+    duration = time.perf_counter() - start
+    assert all(response['source'] == 'gemini' for response in responses)
+    assert generator.gemini_model.async_calls == 50
+    assert duration < 3.0, f"{duration:.2f}s"
+    assert len(generator.retrieval_system.threads) <= 2
+    print(f"   ✅ 50 conversations en {duration:.2f}s")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Équivalence", run_test(test_same_as_sync)),
+        ("Repli", run_test(test_gemini_failure_falls_back)),
+        ("Simultanées", run_test(test_concurrent_sessions)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test du cache borné LRU + TTL pour ZamaPay
+Vérifie l'éviction par nombre d'entrées et par octets, l'expiration et les statistiques
+"""
+
+import time
+import threading
+from bounded_cache import BoundedCache, estimate_size
+from response_generator import ResponseGenerator
+
+
+def test_lru_eviction():
+    """Au-delà de max_entries, l'entrée la moins récemment utilisée est évincée"""
+    print("🧪 TEST ÉVICTION LRU")
+    print("-" * 40)
+
+    cache = BoundedCache(max_entries=2)
+    cache.put("frais", [1])
+    cache.put("compte", [2])
+    assert cache.get("frais") == [1]
+    cache.put("uemoa", [3])
+
+    assert cache.get("compte") is None
+    assert cache.get("frais") == [1] and cache.get("uemoa") == [3]
+    assert cache.get_stats()['evictions'] == 1
+    print("   ✅ Entrée la moins récente évincée")
+
+
+def test_byte_limit():
+    """La taille estimée reste sous max_bytes; une valeur trop grande n'est pas stockée"""
+    print("\n🧪 TEST LIMITE EN OCTETS")
+    print("-" * 40)
+
+    value = ["x" * 1000]
+    limit = estimate_size(value) * 3
+    cache = BoundedCache(max_entries=100, max_bytes=limit)
+    for i in range(10):
+        cache.put(i, ["x" * 1000])
+    stats = cache.get_stats()
+    assert stats['bytes'] <= limit and stats['entries'] == 3
+
+    cache.put("énorme", ["y" * (limit + 1)])
+    assert cache.get("énorme") is None
+    print(f"   ✅ {stats['entries']} entrées, {stats['bytes']} octets")
+
+
+def test_ttl_expiry():
+    """Les entrées expirées ne sont plus servies et sont retirées du cache"""
+    print("\n🧪 TEST EXPIRATION")
+    print("-" * 40)
+
+    cache = BoundedCache(ttl=0.05)
+    cache.put("frais", [1])
+    assert "frais" in cache
+    time.sleep(0.06)
+    assert cache.get("frais") is None
+    assert len(cache) == 0 and cache.get_stats()['expirations'] == 1
+    print("   ✅ Entrée expirée retirée")
+
+
+def test_stats_and_threads():
+    """get_or_compute calcule une fois, compte succès et échecs sous accès concurrents"""
+    print("\n🧪 TEST STATISTIQUES")
+    print("-" * 40)
+
+    cache = BoundedCache(max_entries=50)
+    computed = []
+
+    def slow_search(key):
+        time.sleep(0.005)
+        computed.append(key)
+        return [key]
+
+    cache.get_or_compute("frais", lambda: slow_search("frais"))
+    threads = [threading.Thread(target=lambda: cache.get_or_compute("frais", lambda: slow_search("frais")))
+               for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.get_stats()
+    assert len(computed) == 1
+    assert (stats['hits'], stats['misses']) == (10, 1)
+    assert stats['avg_miss_compute_ms'] >= 5 and stats['estimated_time_saved_ms'] > 0
+    print(f"   ✅ Temps économisé estimé: {stats['estimated_time_saved_ms']:.1f} ms")
+
+
+def test_response_generator_kb_cache():
+    """ResponseGenerator.get_cache_info expose les statistiques du cache de recherche"""
+    print("\n🧪 TEST CACHE DU GÉNÉRATEUR")
+    print("-" * 40)
+
+    class Retrieval:
+        use_faiss = False
+        calls = 0
+
+        def search(self, query, top_k=3, confidence_threshold=0.1):
+            Retrieval.calls += 1
+            return [{'score': 0.9, 'qa_data': {'question_principale': "Frais", 'reponse': "1%"}}]
+
+    generator = ResponseGenerator(Retrieval(), kb_cache_size=2)
+    for query in ["frais", "Frais ", "compte", "uemoa", "frais"]:
+        generator._search_knowledge_base(query)
+
+    info = generator.get_cache_info()
+    assert Retrieval.calls == 4
+    assert info['kb_cache_size'] == 2
+    assert info['kb_cache']['hits'] == 1 and info['kb_cache']['evictions'] == 2
+    print("   ✅ Cache borné et statistiques exposées")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Éviction", run_test(test_lru_eviction)),
+        ("Octets", run_test(test_byte_limit)),
+        ("Expiration", run_test(test_ttl_expiry)),
+        ("Statistiques", run_test(test_stats_and_threads)),
+        ("Générateur", run_test(test_response_generator_kb_cache)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test du stockage colonnaire des métadonnées d'index ZamaPay
+Vérifie l'aller-retour sur disque, l'accès paresseux aux documents et la
+migration des anciennes métadonnées pickle
+"""
+
+import os
+import pickle
+import tempfile
+import numpy as np
+from columnar_store import ColumnarStore, LazyDocumentList
+from test_index_wal import make_retrieval
+
+DOCUMENTS = [
+    {'question': "Quels sont vos frais ?", 'answer': "1% par transfert", 'category': "frais", 'text': "frais 1%"},
+    {'question': "Envoi vers la Côte d'Ivoire ?", 'answer': "Oui, zone UEMOA 🌍", 'category': "pays", 'text': ""},
+    {'question': "Orange Money", 'answer': "Accepté", 'category': "opérateurs", 'text': "orange money"},
+]
+
+
+def test_round_trip():
+    """Colonnes texte (UTF-8, vides), colonnes entières et attributs relus à l'identique"""
+    print("🧪 TEST ALLER-RETOUR")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "table.zpc")
+        questions = [document['question'] for document in DOCUMENTS]
+        texts = [document['text'] for document in DOCUMENTS]
+        ColumnarStore.write(
+            path,
+            string_columns={'question': questions, 'text': texts},
+            int_columns={'ids': [3, 1, 2, 7], 'empty': []},
+            attributes={'model_name': "all-MiniLM-L6-v2", 'next_id': 8}
+        )
+
+        store = ColumnarStore.open(path)
+        assert len(store) == len(DOCUMENTS)
+        assert store.column('question') == questions and store.column('text') == texts
+        assert store.get('question', 1) == "Envoi vers la Côte d'Ivoire ?"
+        assert store.int_column('ids').tolist() == [3, 1, 2, 7]
+        assert store.int_column('empty').shape == (0,)
+        assert store.attributes == {'model_name': "all-MiniLM-L6-v2", 'next_id': 8}
+        assert not [name for name in os.listdir(tmp_dir) if name.endswith(".tmp")]
+
+        ColumnarStore.write(path, string_columns={})
+        assert len(ColumnarStore.open(path)) == 0
+
+        try:
+            ColumnarStore.write(path, string_columns={'a': ["x"], 'b': []})
+            assert False, "colonnes de longueurs différentes acceptées"
+        except ValueError:
+            pass
+
+        with open(path, 'wb') as f:
+            f.write(pickle.dumps(DOCUMENTS))
+        try:
+            ColumnarStore.open(path)
+            assert False, "fichier pickle accepté"
+        except ValueError:
+            pass
+    print("   ✅ Table relue à l'identique")
+
+
+def test_lazy_access_matches_eager():
+    """Les documents décodés à l'accès sont ceux de la liste en mémoire"""
+    print("\n🧪 TEST ACCÈS PARESSEUX")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "documents.zpc")
+        LazyDocumentList(documents=DOCUMENTS).save(path)
+
+        lazy = LazyDocumentList.load(path)
+        assert len(lazy) == len(DOCUMENTS)
+        assert list(lazy) == DOCUMENTS
+        assert [lazy[i] for i in range(len(DOCUMENTS))] == DOCUMENTS
+        assert lazy[-1] == DOCUMENTS[-1]
+        try:
+            lazy[len(DOCUMENTS)]
+            assert False, "IndexError attendue"
+        except IndexError:
+            pass
+
+        # Ajouts en mémoire après chargement, puis sauvegarde sur le même fichier
+        added = {'question': "Nouveau ?", 'answer': "Oui", 'category': "divers"}
+        lazy.append(added)
+        assert lazy[len(DOCUMENTS)] == added
+        lazy.save(path)
+
+        eager = DOCUMENTS + [dict(added, text='')]
+        assert list(LazyDocumentList.load(path)) == eager
+        assert list(lazy) == DOCUMENTS + [added]
+    print("   ✅ Accès paresseux identique à la liste")
+
+
+def test_legacy_pickle_migration():
+    """Les anciennes métadonnées pickle sont converties une fois puis supprimées"""
+    print("\n🧪 TEST MIGRATION PICKLE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        retrieval = make_retrieval(tmp_dir)
+        documents = list(retrieval.documents)
+        legacy_path = os.path.splitext(retrieval.metadata_path)[0] + ".pkl"
+
+        # Installation antérieure: métadonnées en pickle, pas encore de fichier colonnaire
+        with open(legacy_path, 'wb') as f:
+            pickle.dump(documents, f)
+        os.remove(retrieval.metadata_path)
+
+        migrated = make_retrieval(tmp_dir)
+        assert not os.path.exists(legacy_path)
+        assert os.path.exists(migrated.metadata_path)
+        assert list(migrated.documents) == documents
+        assert list(LazyDocumentList.load(migrated.metadata_path)) == documents
+        assert migrated.index.ntotal == len(documents)
+    print("   ✅ Pickle converti au format colonnaire")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Aller-retour", run_test(test_round_trip)),
+        ("Accès paresseux", run_test(test_lazy_access_matches_eager)),
+        ("Migration pickle", run_test(test_legacy_pickle_migration)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
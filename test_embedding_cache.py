@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test du cache d'embeddings de requêtes pour ZamaPay
+Vérifie la normalisation des clés, l'éviction LRU et la persistance sur disque
+"""
+
+import os
+import tempfile
+import threading
+import numpy as np
+from embedding_cache import EmbeddingCache, normalize_query
+
+
+class CountingEncoder:
+    """Encodeur factice qui compte les textes encodés"""
+
+    def __init__(self, dimension=4):
+        self.dimension = dimension
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(text), i, 1.0, 0.5][:self.dimension] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+def test_normalized_keys():
+    """Les formulations qui ne diffèrent que par la casse, les espaces ou la ponctuation partagent une clé"""
+    print("🧪 TEST NORMALISATION")
+    print("-" * 40)
+
+    assert normalize_query("C'est combien les frais ?") == "c'est combien les frais"
+    assert normalize_query("  c’est   COMBIEN les frais?? ") == "c'est combien les frais"
+    assert normalize_query("Frais, transfert UEMOA") != normalize_query("Frais transfert UEMOA")
+
+    encoder = CountingEncoder()
+    cache = EmbeddingCache()
+    first = cache.get_or_compute('minilm', ["C'est combien les frais ?", "Ouvrir un compte"], encoder)
+    second = cache.get_or_compute('minilm', ["c'est combien les frais", "c'est combien les frais ?"], encoder)
+    assert len(encoder.encoded) == 2
+    assert np.array_equal(second[0], first[0]) and np.array_equal(second[1], first[0])
+
+    cache.get_or_compute('gemini', ["c'est combien les frais"], encoder)
+    assert len(encoder.encoded) == 3, "le modèle fait partie de la clé"
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (2, 3)
+    print(f"   ✅ Taux de succès: {stats['hit_rate']:.0%}")
+
+
+def test_lru_eviction():
+    """Au-delà de max_entries, la requête la moins récemment utilisée est évincée"""
+    print("\n🧪 TEST ÉVICTION LRU")
+    print("-" * 40)
+
+    cache = EmbeddingCache(max_entries=2)
+    cache.put('m', "a", np.ones(3))
+    cache.put('m', "b", np.ones(3))
+    assert cache.get('m', "a") is not None
+    cache.put('m', "c", np.ones(3))
+
+    assert cache.get('m', "b") is None
+    assert cache.get('m', "a") is not None and cache.get('m', "c") is not None
+    assert cache.get_stats()['evictions'] == 1
+    print("   ✅ Entrée la plus ancienne évincée")
+
+
+def test_duplicates_and_concurrency():
+    """Une requête répétée dans un lot n'est encodée qu'une fois; accès concurrents cohérents"""
+    print("\n🧪 TEST DOUBLONS ET THREADS")
+    print("-" * 40)
+
+    encoder = CountingEncoder()
+    cache = EmbeddingCache()
+    embeddings = cache.get_or_compute('m', ["frais", "Frais ?", "compte"], encoder)
+    assert embeddings.shape == (3, 4) and encoder.encoded == ["frais", "compte"]
+
+    errors = []
+
+    def worker(i):
+        try:
+            result = cache.get_or_compute('m', [f"question {i % 5}", "frais"], encoder)
+            assert result.shape == (2, 4)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert cache.get_stats()['entries'] == 7
+    print("   ✅ Cache cohérent sous accès concurrents")
+
+
+def test_persistence():
+    """Le cache sauvegardé est rechargé par une nouvelle instance (redémarrage)"""
+    print("\n🧪 TEST PERSISTANCE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "query_embeddings.bin")
+        encoder = CountingEncoder()
+        cache = EmbeddingCache(path=path)
+        original = cache.get_or_compute('m', ["C'est combien les frais ?", "Ouvrir un compte"], encoder)
+        assert cache.save()
+
+        restarted = EmbeddingCache(path=path)
+        reloaded = restarted.get_or_compute('m', ["c'est combien les frais", "ouvrir un compte"], encoder)
+        assert len(encoder.encoded) == 2, "aucun ré-encodage après redémarrage"
+        assert np.array_equal(reloaded, original)
+
+        with open(path, 'wb') as f:
+            f.write(b"corrompu")
+        assert EmbeddingCache(path=path).get_stats()['entries'] == 0
+    print("   ✅ Embeddings rechargés sans ré-encodage")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Normalisation", run_test(test_normalized_keys)),
+        ("Éviction", run_test(test_lru_eviction)),
+        ("Doublons", run_test(test_duplicates_and_concurrency)),
+        ("Persistance", run_test(test_persistence)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
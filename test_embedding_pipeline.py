@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test du pipeline d'embedding en masse pour ZamaPay
+Utilise un endpoint d'embedding local simulé (erreurs transitoires et textes rejetés)
+"""
+
+import time
+import threading
+import numpy as np
+from embedding_pipeline import BulkEmbeddingPipeline, EmbeddingError, TokenBucket, classify_error
+
+DIMENSION = 8
+
+
+class ApiError(Exception):
+    """Erreur d'API avec code HTTP (comme google.api_core.exceptions)"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FailingEndpoint:
+    """Endpoint qui échoue toujours avec la même erreur"""
+
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.calls += 1
+        raise self.error
+
+
+class LocalEmbedEndpoint:
+    """Endpoint d'embedding local: échoue sur certains appels et rejette certains textes"""
+
+    def __init__(self, fail_every=0, poison=None):
+        self.fail_every = fail_every
+        self.poison = poison
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+        if self.fail_every and call_number % self.fail_every == 0:
+            raise RuntimeError("429 Resource exhausted")
+        if self.poison is not None and self.poison in texts:
+            raise ValueError("Texte refusé par l'API")
+        return [[float(len(text))] + [float(i)] * (DIMENSION - 1) for i, text in enumerate(texts)]
+
+
+def make_pipeline(endpoint, **kwargs):
+    return BulkEmbeddingPipeline(
+        endpoint, dimension=DIMENSION, batch_size=10, max_workers=4,
+        requests_per_second=1000, initial_backoff=0.001, max_backoff=0.01,
+        progress_callback=lambda progress: None, **kwargs
+    )
+
+
+def test_transient_errors_are_retried():
+    """Les erreurs transitoires sont reprises sans vecteur nul"""
+    print("🧪 TEST REPRISE DES ERREURS TRANSITOIRES")
+    print("-" * 40)
+
+    texts = [f"question {'x' * i}" for i in range(95)]
+    endpoint = LocalEmbedEndpoint(fail_every=3)
+    pipeline = make_pipeline(endpoint)
+    embeddings = pipeline.embed(texts)
+
+    assert embeddings.shape == (len(texts), DIMENSION)
+    assert np.allclose(embeddings[:, 0], [len(text) for text in texts])
+    assert pipeline.last_stats['retries'] > 0
+    assert pipeline.last_stats['embedded'] == len(texts)
+    print(f"   ✅ {len(texts)} textes encodés, {pipeline.last_stats['retries']} reprises")
+
+
+def test_poisoned_text_is_reported():
+    """Un texte toujours rejeté fait échouer le pipeline au lieu d'être remplacé par des zéros"""
+    print("\n🧪 TEST TEXTE REJETÉ")
+    print("-" * 40)
+
+    texts = [f"texte {i}" for i in range(30)]
+    pipeline = make_pipeline(LocalEmbedEndpoint(poison="texte 17"), max_retries=1)
+
+    try:
+        pipeline.embed(texts)
+        assert False, "EmbeddingError attendue"
+    except EmbeddingError as e:
+        assert e.failed_indices == [17]
+    assert pipeline.last_stats['embedded'] == len(texts) - 1
+    assert pipeline.last_stats['retries'] == 0, "texte refusé: scission sans reprise"
+    print("   ✅ Seul le texte fautif est signalé")
+
+
+def test_error_classification():
+    """Transitoire: reprise; texte refusé: scission; clé invalide ou accès refusé: arrêt"""
+    print("\n🧪 TEST CLASSIFICATION DES ERREURS")
+    print("-" * 40)
+
+    assert classify_error(RuntimeError("429 Resource exhausted")) == 'retry'
+    assert classify_error(ApiError(503, "Service unavailable")) == 'retry'
+    assert classify_error(ConnectionError("reset")) == 'retry'
+    assert classify_error(ApiError(400, "Request payload size exceeds the limit")) == 'reject'
+    assert classify_error(ValueError("Texte refusé par l'API")) == 'reject'
+    assert classify_error(ApiError(400, "API key not valid. Please pass a valid API key.")) == 'fatal'
+    assert classify_error(ApiError(403, "Permission denied")) == 'fatal'
+    assert classify_error(ApiError(404, "Model not found")) == 'fatal'
+    print("   ✅ Erreurs classées")
+
+
+def test_fatal_error_fails_fast():
+    """Une clé invalide arrête tous les lots sans reprise ni scission"""
+    print("\n🧪 TEST ÉCHEC IMMÉDIAT")
+    print("-" * 40)
+
+    texts = [f"texte {i}" for i in range(200)]
+    endpoint = FailingEndpoint(ApiError(403, "Permission denied"))
+    pipeline = make_pipeline(endpoint)
+    pipeline.initial_backoff = pipeline.max_backoff = 10.0
+
+    started = time.perf_counter()
+    try:
+        pipeline.embed(texts)
+        assert False, "EmbeddingError attendue"
+    except EmbeddingError as e:
+        assert e.failed_indices == list(range(len(texts)))
+        assert isinstance(e.last_error, ApiError)
+    assert time.perf_counter() - started < 1.0
+    assert endpoint.calls <= pipeline.max_workers, f"{endpoint.calls} appels"
+    assert pipeline.last_stats['aborted'] and pipeline.last_stats['retries'] == 0
+    print(f"   ✅ Arrêt après {endpoint.calls} appel(s)")
+
+
+def test_transient_failure_is_not_split():
+    """Une panne persistante épuise les reprises du lot sans le scinder"""
+    print("\n🧪 TEST PANNE PERSISTANTE")
+    print("-" * 40)
+
+    texts = [f"texte {i}" for i in range(30)]
+    endpoint = FailingEndpoint(ApiError(503, "Service unavailable"))
+    pipeline = make_pipeline(endpoint, max_retries=2)
+
+    try:
+        pipeline.embed(texts)
+        assert False, "EmbeddingError attendue"
+    except EmbeddingError as e:
+        assert e.failed_indices == list(range(len(texts)))
+    assert endpoint.calls == 3 * 3, f"{endpoint.calls} appels pour 3 lots x 3 tentatives"
+    print(f"   ✅ {endpoint.calls} appels, aucun lot scindé")
+
+
+def test_retry_time_is_capped():
+    """Les reprises s'arrêtent une fois max_retry_time écoulé"""
+    print("\n🧪 TEST DURÉE MAXIMALE DES REPRISES")
+    print("-" * 40)
+
+    endpoint = FailingEndpoint(RuntimeError("429 Resource exhausted"))
+    pipeline = make_pipeline(endpoint, max_retries=10, max_retry_time=0.5)
+    pipeline.initial_backoff = pipeline.max_backoff = 0.2
+
+    started = time.perf_counter()
+    try:
+        pipeline.embed([f"texte {i}" for i in range(10)])
+        assert False, "EmbeddingError attendue"
+    except EmbeddingError:
+        pass
+    elapsed = time.perf_counter() - started
+    assert elapsed < 0.8, f"{elapsed:.2f}s"
+    assert endpoint.calls < 11
+    print(f"   ✅ Abandon après {elapsed:.2f}s et {endpoint.calls} appels")
+
+
+def test_token_bucket_limits_rate():
+    """Le seau à jetons borne le débit de requêtes"""
+    print("\n🧪 TEST LIMITATION DE DÉBIT")
+    print("-" * 40)
+
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    elapsed = time.perf_counter() - started
+    assert elapsed >= 0.18
+    print(f"   ✅ 11 requêtes en {elapsed:.2f}s pour 50 req/s")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Reprises", run_test(test_transient_errors_are_retried)),
+        ("Texte rejeté", run_test(test_poisoned_text_is_reported)),
+        ("Classification", run_test(test_error_classification)),
+        ("Échec immédiat", run_test(test_fatal_error_fails_fast)),
+        ("Panne persistante", run_test(test_transient_failure_is_not_split)),
+        ("Durée des reprises", run_test(test_retry_time_is_capped)),
+        ("Débit", run_test(test_token_bucket_limits_rate)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
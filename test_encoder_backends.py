@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test du backend d'encodage ONNX Runtime pour ZamaPay
+Utilise un petit modèle ONNX (table d'embeddings) construit localement, sans torch ni Hub
+"""
+
+import os
+import tempfile
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+from tokenizers import Tokenizer, models, pre_tokenizers
+from encoder_backends import ENCODER_BACKENDS, OnnxEncoder, cosine_agreement, create_encoder
+
+VOCAB = ["[PAD]", "[UNK]", "frais", "transfert", "uemoa", "orange", "money", "compte", "zamapay"]
+
+
+def build_model_directory(directory, dimension=16, seed=0):
+    """model.onnx: last_hidden_state = table[input_ids]; tokenizer.json: découpage par mots"""
+    table = np.random.default_rng(seed).standard_normal((len(VOCAB), dimension)).astype(np.float32)
+
+    graph = helper.make_graph(
+        [helper.make_node('Gather', ['table', 'input_ids'], ['last_hidden_state'])],
+        'embedding',
+        [
+            helper.make_tensor_value_info('input_ids', TensorProto.INT64, ['batch', 'sequence']),
+            helper.make_tensor_value_info('attention_mask', TensorProto.INT64, ['batch', 'sequence']),
+        ],
+        [helper.make_tensor_value_info('last_hidden_state', TensorProto.FLOAT, ['batch', 'sequence', dimension])],
+        initializer=[numpy_helper.from_array(table, 'table')]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 17)])
+    model.ir_version = 8
+    onnx.save(model, os.path.join(directory, "model.onnx"))
+
+    tokenizer = Tokenizer(models.WordLevel({token: i for i, token in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(os.path.join(directory, "tokenizer.json"))
+    return table
+
+
+def test_mean_pooling_matches_reference():
+    """Mean pooling sur les tokens non masqués puis normalisation L2"""
+    print("🧪 TEST MEAN POOLING ONNX")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        table = build_model_directory(directory)
+        encoder = OnnxEncoder(directory, quantized=False)
+        embeddings = encoder.encode(["frais transfert uemoa", "orange money"])
+
+        for row, ids in enumerate([[2, 3, 4], [5, 6]]):
+            expected = table[ids].mean(axis=0)
+            expected /= np.linalg.norm(expected)
+            assert np.allclose(embeddings[row], expected, atol=1e-5)
+        assert embeddings.shape == (2, table.shape[1])
+    print("   ✅ Embeddings identiques à la référence (avec padding)")
+
+
+def test_int8_agreement():
+    """Le modèle quantifié int8 reste aligné sur le modèle float32"""
+    print("\n🧪 TEST QUANTIFICATION INT8")
+    print("-" * 40)
+
+    texts = ["frais transfert", "compte zamapay", "orange money uemoa", "transfert"]
+    with tempfile.TemporaryDirectory() as directory:
+        build_model_directory(directory)
+        reference = create_encoder('onnx', directory)
+        quantized = create_encoder('onnx-int8', directory)
+        assert os.path.exists(os.path.join(directory, "model_qint8.onnx"))
+
+        agreement = cosine_agreement(quantized.encode(texts), reference.encode(texts))
+        print(f"   Accord cosinus: moyen {agreement['mean']:.4f}, min {agreement['min']:.4f}")
+        assert agreement['min'] > 0.99
+    print("   ✅ Quantification compatible")
+
+
+def test_cosine_agreement_and_backends():
+    """cosine_agreement détecte des embeddings divergents; backend inconnu refusé"""
+    print("\n🧪 TEST ACCORD COSINUS")
+    print("-" * 40)
+
+    vectors = np.eye(3, dtype=np.float32)
+    assert cosine_agreement(vectors * 2, vectors) == {'mean': 1.0, 'min': 1.0}
+    assert cosine_agreement(vectors[[1, 2, 0]], vectors)['min'] == 0.0
+
+    assert 'onnx-int8' in ENCODER_BACKENDS
+    try:
+        create_encoder('tensorrt', 'all-MiniLM-L6-v2')
+        assert False, "backend inconnu accepté"
+    except ValueError:
+        pass
+    print("   ✅ Accord et validation des backends")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Mean pooling", run_test(test_mean_pooling_matches_reference)),
+        ("Int8", run_test(test_int8_agreement)),
+        ("Accord", run_test(test_cosine_agreement_and_backends)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
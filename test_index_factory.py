@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test des modes d'index compressés pour ZamaPay
+Vérifie la construction de chaque mode et le rapport rappel@k / latence
+"""
+
+import numpy as np
+import faiss
+from index_factory import (
+    FLAT_MAX_VECTORS, INDEX_MODES, benchmark_index_modes, choose_index_mode, create_index,
+    default_search_params, get_search_params, index_description, ivf_nlist, supports_removal
+)
+
+
+def make_vectors(n=700, dimension=32, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def test_descriptions_adapt_to_training_size():
+    """Le PQ et la PCA s'adaptent au nombre de vecteurs d'entraînement"""
+    print("🧪 TEST DESCRIPTIONS")
+    print("-" * 40)
+
+    assert index_description('pq', 384, 100) == "SQ8"
+    assert index_description('pq', 384, 700) == "PQ48x4"
+    assert index_description('pq', 384, 20000) == "PQ48x8"
+    assert index_description('pca', 768, 15) == "PCA15,Flat"
+    assert index_description('pca-sq8', 384, 1000, pca_dim=64) == "PCA64,SQ8"
+    assert index_description('ivf', 384, 10000) == "IVF256,Flat"
+    assert index_description('hnsw', 384, 10) == "HNSW32"
+    try:
+        index_description('lsh', 384, 1000)
+        assert False, "mode inconnu accepté"
+    except ValueError:
+        pass
+    print("   ✅ Descriptions adaptées")
+
+
+def test_every_mode_supports_id_removal():
+    """Chaque mode compressé s'entraîne, accepte des identifiants et supporte remove_ids"""
+    print("\n🧪 TEST MODES D'INDEX")
+    print("-" * 40)
+
+    vectors = make_vectors()
+    for mode in INDEX_MODES:
+        index = faiss.IndexIDMap2(create_index(mode, vectors.shape[1], 'ip', vectors, pca_dim=16))
+        if mode in ('ivf', 'hnsw'):
+            assert not supports_removal(index)
+            print(f"   ✅ {mode} (reconstruction complète)")
+            continue
+        assert supports_removal(index)
+        index.add_with_ids(vectors, np.arange(len(vectors), dtype='int64'))
+        index.remove_ids(np.array([0, 1], dtype='int64'))
+        assert index.ntotal == len(vectors) - 2
+        for query_id in (5, 300, len(vectors) - 1):
+            _, ids = index.search(vectors[query_id:query_id + 1], 1)
+            assert ids[0][0] == query_id, (mode, query_id, ids[0][0])
+        _, ids = index.search(vectors[:2], 1)
+        assert 0 not in ids and 1 not in ids
+        print(f"   ✅ {mode}")
+
+
+def test_auto_selection():
+    """Le mode 'auto' choisit flat, IVF ou HNSW selon la taille et le rappel visé"""
+    print("\n🧪 TEST SÉLECTION AUTOMATIQUE")
+    print("-" * 40)
+
+    assert choose_index_mode(170) == 'flat'
+    assert choose_index_mode(FLAT_MAX_VECTORS) == 'ivf'
+    assert choose_index_mode(100_000, target_recall=0.99) == 'hnsw'
+
+    assert ivf_nlist(100_000) == 1264
+    assert default_search_params('ivf', 100_000, 0.9)['nprobe'] < default_search_params('ivf', 100_000, 0.99)['nprobe']
+    assert default_search_params('hnsw', 100_000, 0.99) == {'efSearch': 128}
+    assert default_search_params('flat', 100_000) == {}
+
+    vectors = make_vectors(n=FLAT_MAX_VECTORS, dimension=16)
+    index = faiss.IndexIDMap2(create_index('auto', 16, 'ip', vectors))
+    assert get_search_params(index) == default_search_params('ivf', FLAT_MAX_VECTORS)
+    assert not supports_removal(index)
+    assert not supports_removal(faiss.IndexIDMap2(create_index('hnsw', 16, 'ip')))
+    assert supports_removal(faiss.IndexIDMap2(create_index('auto', 16, 'ip', vectors[:100])))
+    print("   ✅ Type et paramètres adaptés au corpus")
+
+
+def test_benchmark_report():
+    """Le rapport mesure mémoire, rappel et taux de bonne Q&A par mode"""
+    print("\n🧪 TEST BENCHMARK")
+    print("-" * 40)
+
+    vectors = make_vectors()
+    labels = np.arange(len(vectors)) % 50
+    noise = np.random.default_rng(1).standard_normal((50, vectors.shape[1])).astype('float32')
+    queries = vectors[:50] + 0.05 * noise
+
+    report = benchmark_index_modes(vectors, queries, labels[:50], labels, modes=['flat', 'sq8', 'pq'], k=3)
+    by_mode = {row['mode']: row for row in report}
+    assert by_mode['flat']['recall@3'] == 1.0
+    assert by_mode['flat']['qa_hit@3'] == 1.0
+    assert by_mode['sq8']['memory_bytes'] < by_mode['flat']['memory_bytes']
+    assert by_mode['pq']['bytes_per_vector'] < by_mode['sq8']['bytes_per_vector']
+    assert all(row['latency_ms'] > 0 for row in report)
+    print("   ✅ Rapport complet")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Descriptions", run_test(test_descriptions_adapt_to_training_size)),
+        ("Modes", run_test(test_every_mode_supports_id_removal)),
+        ("Auto", run_test(test_auto_selection)),
+        ("Benchmark", run_test(test_benchmark_report)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test du chargement différé des dépendances lourdes ZamaPay
+Vérifie qu'importer les modules de l'application ne charge ni faiss, ni
+scikit-learn, ni Gemini, et ne lit ni n'écrit aucun fichier
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+import subprocess
+from lazy_loading import LazyInstance, LazyModule, module_available
+from profile_imports import parse_importtime
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ['faiss', 'sklearn', 'google.generativeai']
+
+
+def test_imports_stay_light():
+    """Importer unified_retrieval, auth_system et conversation_manager reste léger et sans effet disque"""
+    print("🧪 TEST IMPORTS LÉGERS")
+    print("-" * 40)
+
+    script = (
+        "import sys, json, unified_retrieval, auth_system, conversation_manager\n"
+        f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))\n"
+    )
+    watched = [os.path.join(PACKAGE_DIR, name) for name in ('users.json', 'conversations')]
+    before = {path: os.path.getmtime(path) for path in watched if os.path.exists(path)}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        completed = subprocess.run(
+            [sys.executable, '-B', '-c', script], cwd=work_dir, capture_output=True, text=True,
+            env=dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+        )
+        assert completed.returncode == 0, completed.stderr
+        loaded = json.loads(completed.stdout.strip().splitlines()[-1])
+        assert loaded == [], f"modules lourds importés: {loaded}"
+        assert os.listdir(work_dir) == [], f"fichiers créés: {os.listdir(work_dir)}"
+
+    after = {path: os.path.getmtime(path) for path in watched if os.path.exists(path)}
+    assert after == before, "fichiers du dépôt modifiés"
+    print("   ✅ Ni faiss, ni scikit-learn, ni Gemini; aucun fichier créé")
+
+
+def test_lazy_module():
+    """LazyModule n'importe qu'au premier accès, une seule fois"""
+    print("\n🧪 TEST LAZYMODULE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as module_dir:
+        with open(os.path.join(module_dir, "zamapay_lazy_probe.py"), 'w', encoding='utf-8') as f:
+            f.write("IMPORTS = []\nIMPORTS.append(1)\nVALUE = 42\n")
+        sys.path.insert(0, module_dir)
+        try:
+            probe = LazyModule('zamapay_lazy_probe')
+            assert not probe.loaded and 'zamapay_lazy_probe' not in sys.modules
+            assert "différé" in repr(probe)
+
+            assert probe.VALUE == 42
+            assert probe.loaded and probe.IMPORTS == [1]
+            assert "chargé" in repr(probe)
+
+            missing = LazyModule('zamapay_module_absent')
+            try:
+                missing.anything
+                assert False, "ModuleNotFoundError attendue"
+            except ModuleNotFoundError:
+                pass
+        finally:
+            sys.path.remove(module_dir)
+            sys.modules.pop('zamapay_lazy_probe', None)
+
+    assert module_available('json') and not module_available('zamapay_module_absent')
+    print("   ✅ Import au premier accès")
+
+
+def test_lazy_instance():
+    """LazyInstance construit le singleton une seule fois, même en accès concurrent"""
+    print("\n🧪 TEST LAZYINSTANCE")
+    print("-" * 40)
+
+    built = []
+
+    class Service:
+        def __init__(self):
+            built.append(self)
+            self.name = "zamapay"
+
+    instance = LazyInstance(Service)
+    assert not instance.loaded and built == []
+    assert "différé" in repr(instance)
+
+    barrier = threading.Barrier(8)
+    names = []
+
+    def access():
+        barrier.wait()
+        names.append(instance.name)
+
+    threads = [threading.Thread(target=access) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1 and names == ["zamapay"] * 8
+    instance.name = "modifié"
+    assert built[0].name == "modifié", "écriture transmise à l'instance"
+    assert "construit" in repr(instance)
+    print("   ✅ Une seule construction pour 8 threads")
+
+
+def test_parse_importtime():
+    """Le profil d'import lit les lignes de -X importtime"""
+    print("\n🧪 TEST PROFIL D'IMPORT")
+    print("-" * 40)
+
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     _json\n"
+        "import time:      1500 |       1620 |   json\n"
+        "import time:       300 |       1920 | unified_retrieval\n"
+    )
+    entries = parse_importtime(stderr)
+    assert [entry['module'] for entry in entries] == ['_json', 'json', 'unified_retrieval']
+    assert [entry['depth'] for entry in entries] == [2, 1, 0]
+    assert entries[-1]['cumulative_ms'] == 1.92
+    print("   ✅ Lignes analysées")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Imports légers", run_test(test_imports_stay_light)),
+        ("LazyModule", run_test(test_lazy_module)),
+        ("LazyInstance", run_test(test_lazy_instance)),
+        ("Profil d'import", run_test(test_parse_importtime)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
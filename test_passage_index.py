@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test du découpage des réponses en passages pour ZamaPay
+Vérifie le découpage par titres, la recherche limitée à certaines Q&A et les
+entrées invalides de la base
+"""
+
+import os
+import json
+import tempfile
+from passage_index import PassageIndex, chunk_markdown
+from retrieval_system import RetrievalSystem
+
+ANSWER = """**FRAIS ZAMAPAY**
+
+## Transferts
+
+### Transfert national
+Frais de 1% avec un minimum de 100 F CFA.
+
+### Transfert UEMOA
+Frais de 1.5% vers les 8 pays de la zone.
+
+## Mobile Money
+Retrait Orange Money gratuit.
+"""
+
+
+def test_chunk_by_headings():
+    """Chaque section ## / ### devient un passage avec son chemin de titres"""
+    print("🧪 TEST DÉCOUPAGE")
+    print("-" * 40)
+
+    passages = chunk_markdown(ANSWER)
+    headings = [passage['heading'] for passage in passages]
+    assert headings == ["", "Transferts > Transfert national", "Transferts > Transfert UEMOA", "Mobile Money"]
+    assert passages[2]['text'] == "Frais de 1.5% vers les 8 pays de la zone."
+    print(f"   ✅ {len(passages)} passages")
+
+
+def test_long_section_split():
+    """Une section trop longue est découpée aux limites de paragraphes"""
+    print("\n🧪 TEST SECTION LONGUE")
+    print("-" * 40)
+
+    paragraphs = [f"Paragraphe {i} " + "x" * 80 for i in range(10)]
+    passages = chunk_markdown("## Section\n" + "\n\n".join(paragraphs), max_chars=300)
+    assert len(passages) > 1
+    assert all(len(passage['text']) <= 300 for passage in passages)
+    assert "\n\n".join(passage['text'] for passage in passages) == "\n\n".join(paragraphs)
+    print(f"   ✅ Section découpée en {len(passages)} passages")
+
+
+def test_search_restricted_to_qa():
+    """La recherche retourne la section pertinente, limitée aux Q&A demandées"""
+    print("\n🧪 TEST RECHERCHE DE PASSAGES")
+    print("-" * 40)
+
+    qa_pairs = [
+        {'id': 1, 'question_principale': "Quels sont les frais ?", 'reponse': ANSWER},
+        {'id': 2, 'question_principale': "Transfert UEMOA", 'reponse': "## Délais\nTransfert UEMOA en 2 heures."},
+    ]
+    index = PassageIndex(qa_pairs)
+
+    results = index.search("frais UEMOA", qa_ids=[1], top_k=1)
+    assert results[0]['heading'] == "Transferts > Transfert UEMOA"
+    assert all(result['qa_id'] == 1 for result in index.search("UEMOA", qa_ids=[1]))
+    assert index.search("bitcoin") == []
+    print("   ✅ Section UEMOA retrouvée")
+
+
+def test_invalid_entries_skipped():
+    """Les entrées écartées par l'index TF-IDF ne sont pas indexées en passages"""
+    print("\n🧪 TEST ENTRÉES INVALIDES")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        kb_path = os.path.join(directory, "kb.json")
+        with open(kb_path, 'w', encoding='utf-8') as f:
+            json.dump({"qa_pairs": [
+                "entrée texte",
+                None,
+                {'id': 3, 'reponse': "Sans question"},
+                {'id': 1, 'question_principale': "Quels sont les frais ?", 'reponse': ANSWER},
+            ]}, f, ensure_ascii=False)
+
+        retrieval = RetrievalSystem(kb_path, os.path.join(directory, "tfidf.bin"))
+        assert {passage['qa_id'] for passage in retrieval.passage_index.passages} == {1}
+        assert retrieval.search_passages("frais UEMOA", top_k=1)[0]['heading'] == "Transferts > Transfert UEMOA"
+    print("   ✅ Seules les Q&A valides sont indexées")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Découpage", run_test(test_chunk_by_headings)),
+        ("Section longue", run_test(test_long_section_split)),
+        ("Recherche", run_test(test_search_restricted_to_qa)),
+        ("Entrées invalides", run_test(test_invalid_entries_skipped)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test du micro-batching des requêtes pour ZamaPay
+Vérifie le regroupement des requêtes concurrentes, la distribution des résultats
+et les lots incomplets
+"""
+
+import threading
+from query_batcher import QueryBatcher
+
+
+class RecordingSearch:
+    """Recherche groupée factice qui enregistre la taille des lots reçus"""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.params = []
+
+    def __call__(self, queries, top_k, confidence_threshold):
+        self.batch_sizes.append(len(queries))
+        self.params.append((top_k, confidence_threshold))
+        results = []
+        for query in queries:
+            matches = [{'query': query, 'rank': rank, 'score': 1.0 - rank * 0.3} for rank in range(4)]
+            results.append([m for m in matches if m['score'] >= confidence_threshold][:top_k])
+        return results
+
+
+def test_concurrent_queries_are_batched():
+    """Les requêtes arrivées dans la même fenêtre partagent un lot"""
+    print("🧪 TEST REGROUPEMENT DES REQUÊTES")
+    print("-" * 40)
+
+    search = RecordingSearch()
+    batcher = QueryBatcher(search, window_ms=50, max_batch_size=64)
+    queries = [f"question {i}" for i in range(16)]
+    results = [None] * len(queries)
+    barrier = threading.Barrier(len(queries))
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.search(queries[i], top_k=2, confidence_threshold=0.0, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(queries))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert sum(search.batch_sizes) == len(queries)
+    assert len(search.batch_sizes) < len(queries)
+    for query, query_results in zip(queries, results):
+        assert [r['query'] for r in query_results] == [query, query]
+
+    metrics = batcher.get_metrics()
+    assert metrics['total_queries'] == len(queries)
+    assert metrics['avg_batch_size'] > 1
+    print(f"   ✅ {len(queries)} requêtes traitées en {len(search.batch_sizes)} lot(s)")
+
+
+def test_per_caller_top_k_and_threshold():
+    """Chaque couple (top_k, seuil) a sa propre recherche dans le lot"""
+    print("\n🧪 TEST TOP_K ET SEUIL PAR APPELANT")
+    print("-" * 40)
+
+    search = RecordingSearch()
+    batcher = QueryBatcher(search, window_ms=50, max_batch_size=8)
+    wide = batcher.submit("a", top_k=3, confidence_threshold=0.0)
+    strict = batcher.submit("b", top_k=3, confidence_threshold=0.5)
+    narrow = batcher.submit("c", top_k=1, confidence_threshold=0.0)
+
+    assert len(wide.result(timeout=5)) == 3
+    assert [r['rank'] for r in strict.result(timeout=5)] == [0, 1]
+    assert len(narrow.result(timeout=5)) == 1
+    batcher.close()
+    assert sorted(search.params) == [(1, 0.0), (3, 0.0), (3, 0.5)]
+    print("   ✅ Une recherche par couple de paramètres")
+
+
+def test_incomplete_batch_fails_waiters():
+    """Une recherche qui renvoie moins de listes que de requêtes fait échouer les appelants restants"""
+    print("\n🧪 TEST LOT INCOMPLET")
+    print("-" * 40)
+
+    batcher = QueryBatcher(lambda queries, top_k, threshold: [[{'score': 1.0}]], window_ms=50, max_batch_size=8)
+    first = batcher.submit("a")
+    second = batcher.submit("b")
+    assert first.result(timeout=5) == [{'score': 1.0}]
+    try:
+        second.result(timeout=5)
+        assert False, "résultat manquant non signalé"
+    except RuntimeError:
+        pass
+    batcher.close()
+    print("   ✅ Appelant sans résultat notifié")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Regroupement", run_test(test_concurrent_queries_are_batched)),
+        ("Top-k par appelant", run_test(test_per_caller_top_k_and_threshold)),
+        ("Lot incomplet", run_test(test_incomplete_batch_fails_waiters)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
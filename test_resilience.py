@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Test du budget de latence et du disjoncteur Gemini pour ZamaPay
+Vérifie l'échéance, l'ouverture / la refermeture du disjoncteur et la latence
+bornée des réponses quand Gemini est dégradé
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+from resilience import CircuitBreaker, Deadline
+from response_generator import ResponseGenerator
+
+
+def test_deadline():
+    """Temps restant, expiration et délai plafonné"""
+    print("🧪 TEST ÉCHÉANCE")
+    print("-" * 40)
+
+    deadline = Deadline(0.2)
+    assert 0.15 < deadline.remaining() <= 0.2
+    assert deadline.timeout(0.05) == 0.05
+    time.sleep(0.25)
+    assert deadline.expired() and deadline.remaining() == 0.0 and deadline.timeout(5) == 0.0
+    print("   ✅ Échéance respectée")
+
+
+def test_circuit_breaker():
+    """Ouverture après échecs ou lenteurs, essai après refroidissement, refermeture"""
+    print("\n🧪 TEST DISJONCTEUR")
+    print("-" * 40)
+
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_s=1.0, cooldown_s=0.1)
+    breaker.record_failure()
+    breaker.record_success(0.2)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED, "les échecs doivent être consécutifs"
+    breaker.record_success(2.0)
+    assert breaker.state == CircuitBreaker.OPEN, "appel lent = échec"
+    assert not breaker.allow()
+
+    time.sleep(0.12)
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow(), "un seul essai par période"
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    stats = breaker.get_stats()
+    assert (stats['openings'], stats['slow_calls'], stats['rejected']) == (2, 1, 2)
+    print("   ✅ Transitions correctes")
+
+
+class Retrieval:
+    """Recherche factice: un résultat moyen, durée configurable"""
+
+    use_faiss = False
+    kb_version = "v1"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def search(self, query, top_k=3, confidence_threshold=0.1):
+        time.sleep(self.delay)
+        return [{'score': 0.45, 'qa_data': {'id': 1, 'question_principale': "Frais", 'reponse': "Frais de 1%"}}]
+
+
+class HangingModel:
+    """Fournisseur dégradé: ne répond jamais avant le délai demandé"""
+
+    def __init__(self):
+        self.calls = 0
+        self.timeouts = []
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls += 1
+        self.timeouts.append(request_options['timeout'])
+        time.sleep(request_options['timeout'])
+        raise TimeoutError("504 Deadline Exceeded")
+
+    async def generate_content_async(self, prompt, request_options=None):
+        self.calls += 1
+        await asyncio.sleep(60)   # ignore le délai: wait_for doit couper
+
+
+class Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class HealthyModel:
+    """Fournisseur rétabli"""
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        return Response("Réponse Gemini")
+
+
+def make_generator(delay=0.0, **kwargs):
+    generator = ResponseGenerator(Retrieval(delay), gemini_timeout_s=0.2, breaker_cooldown_s=60, **kwargs)
+    generator.gemini_model = HangingModel()
+    return generator
+
+
+def test_bounded_latency_during_incident():
+    """Gemini bloqué: délai dur par appel, puis disjoncteur ouvert et réponse immédiate"""
+    print("\n🧪 TEST INCIDENT GEMINI")
+    print("-" * 40)
+
+    generator = make_generator()
+    latencies = []
+    for i in range(6):
+        start = time.perf_counter()
+        response = generator.generate_response(f"Quels sont les frais pour {i} envois ?", "Awa")
+        latencies.append(time.perf_counter() - start)
+        assert response['source'] != 'gemini'
+    assert generator.gemini_model.calls == 3, "disjoncteur ouvert après 3 échecs"
+    assert max(latencies) < 0.5, f"{max(latencies):.2f}s"
+    assert max(latencies[3:]) < 0.1, "Gemini ignoré pendant le refroidissement"
+    assert generator.get_resilience_stats()['breaker']['state'] == 'open'
+    print(f"   ✅ Latence max {max(latencies):.2f}s, puis {max(latencies[3:]) * 1000:.0f}ms")
+
+
+def test_request_budget():
+    """Le délai Gemini est réduit au temps restant; budget épuisé: pas d'appel"""
+    print("\n🧪 TEST BUDGET PAR REQUÊTE")
+    print("-" * 40)
+
+    generator = make_generator(delay=0.3, request_budget_s=0.4, min_gemini_budget_s=0.05)
+    generator.gemini_timeout_s = 5.0
+    start = time.perf_counter()
+    generator.generate_response("Quels sont les frais ?", "Awa")
+    assert time.perf_counter() - start < 0.6
+    assert generator.gemini_model.timeouts[0] <= 0.1 + 1e-6
+
+    generator = make_generator(delay=0.3, request_budget_s=0.3)
+    generator.generate_response("Quels sont les frais ?", "Awa")
+    assert generator.gemini_model.calls == 0
+    print("   ✅ Budget propagé jusqu'à l'appel Gemini")
+
+
+def test_fallbacks_not_cached():
+    """Les réponses de repli pendant l'incident ne sont pas resservies après le rétablissement"""
+    print("\n🧪 TEST REPLI NON MIS EN CACHE")
+    print("-" * 40)
+
+    question = "Quels sont les frais ?"
+    generator = make_generator(shared_cache_path=os.path.join(tempfile.mkdtemp(), "responses.db"))
+    for _ in range(4):   # 3 délais dépassés, puis disjoncteur ouvert
+        response = generator.generate_response(question, "Awa")
+        assert response['degraded'] and not response.get('cached')
+    stream = generator.generate_response_stream(question, "Awa")
+    list(stream)
+    assert stream.response['degraded'] and not stream.response.get('cached')
+    response = asyncio.run(generator.agenerate_response(question, "Awa"))
+    assert response['degraded'] and not response.get('cached')
+    assert generator.gemini_model.calls == 3
+    assert generator.shared_cache.get('responses', "quels sont les frais", "v1") is None
+
+    # Gemini rétabli: la même question l'atteint, puis sa réponse est mise en cache
+    generator.gemini_model = HealthyModel()
+    generator.gemini_breaker.cooldown_s = 0
+    response = generator.generate_response(question, "Awa")
+    assert response['source'] == 'gemini' and not response.get('cached')
+    assert generator.generate_response(question, "Awa")['cached']
+
+    # Sans Gemini configuré, la réponse de la base n'est pas un repli: elle est mise en cache
+    generator = make_generator()
+    generator.gemini_model = None
+    assert 'degraded' not in generator.generate_response(question, "Awa")
+    assert generator.generate_response(question, "Awa")['cached']
+    print("   ✅ Seule la réponse Gemini rétablie est mise en cache")
+
+
+def test_async_hard_timeout():
+    """Mode async: l'appel est coupé au délai même si le client l'ignore"""
+    print("\n🧪 TEST DÉLAI DUR ASYNC")
+    print("-" * 40)
+
+    generator = make_generator()
+    start = time.perf_counter()
+    response = asyncio.run(generator.agenerate_response("Quels sont les frais ?", "Awa"))
+    duration = time.perf_counter() - start
+    assert response['source'] != 'gemini' and duration < 0.5, f"{duration:.2f}s"
+    assert generator.get_resilience_stats()['breaker']['failures'] == 1
+    print(f"   ✅ Réponse de la base en {duration:.2f}s")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Échéance", run_test(test_deadline)),
+        ("Disjoncteur", run_test(test_circuit_breaker)),
+        ("Incident Gemini", run_test(test_bounded_latency_during_incident)),
+        ("Budget par requête", run_test(test_request_budget)),
+        ("Repli non mis en cache", run_test(test_fallbacks_not_cached)),
+        ("Délai dur async", run_test(test_async_hard_timeout)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
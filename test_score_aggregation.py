@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test de l'agrégation des scores par Q&A pour ZamaPay
+Compare le max-pooling vectorisé à un calcul de référence en Python
+"""
+
+import numpy as np
+from score_aggregation import QaScoreAggregator
+
+
+def reference_top_k(row_scores, row_qa, top_k, confidence_threshold):
+    """Meilleure ligne de chaque Q&A puis tri, calculé ligne par ligne"""
+    best = {}
+    for row, qa in enumerate(row_qa):
+        if qa not in best or row_scores[row] > row_scores[best[qa]]:
+            best[qa] = row
+    ranked = sorted(best.items(), key=lambda item: -row_scores[item[1]])[:top_k]
+    return [(int(qa), float(row_scores[row]), row) for qa, row in ranked if row_scores[row] >= confidence_threshold]
+
+
+def test_matches_reference():
+    """Les top-k Q&A distinctes correspondent au calcul de référence"""
+    print("🧪 TEST AGRÉGATION PAR Q&A")
+    print("-" * 40)
+
+    rng = np.random.default_rng(42)
+    row_qa = rng.integers(0, 25, size=200)
+    similarities = rng.random((6, 200))
+    aggregator = QaScoreAggregator(row_qa)
+
+    for top_k in (1, 3, 25, 40):
+        results = aggregator.top_k(similarities, top_k, confidence_threshold=0.2)
+        for row_scores, query_results in zip(similarities, results):
+            assert query_results == reference_top_k(row_scores, row_qa, top_k, 0.2)
+    print("   ✅ Résultats identiques à la référence")
+
+
+def test_variations_do_not_crowd_out():
+    """Une Q&A aux nombreuses variations n'occupe qu'une place du top-k"""
+    print("\n🧪 TEST VARIATIONS MULTIPLES")
+    print("-" * 40)
+
+    row_qa = [0] * 12 + [1, 2]
+    similarities = np.array([[0.9] * 12 + [0.5, 0.4]])
+    results = QaScoreAggregator(row_qa).top_k(similarities, 3, confidence_threshold=0.1)[0]
+    assert [qa for qa, _, _ in results] == [0, 1, 2]
+    print("   ✅ 3 Q&A distinctes retournées")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Référence", run_test(test_matches_reference)),
+        ("Variations", run_test(test_variations_do_not_crowd_out)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test de la recherche groupée (search_batch) des trois systèmes de recherche ZamaPay
+Chaque lot doit rendre exactement les résultats de search requête par requête
+"""
+
+import os
+import json
+import tempfile
+import numpy as np
+from retrieval_system import RetrievalSystem
+from unified_retrieval import UnifiedRetrievalSystem
+from test_index_wal import fake_embed, make_retrieval
+from test_unified_retrieval import QA_PAIRS, make_system
+
+QUERIES = [
+    "frais de transfert",
+    "uemoa",
+    "Comment ouvrir un compte zamapay ?",
+    "frais de transfert",
+    "question sans rapport",
+    "orange money",
+]
+THRESHOLDS = (-1.0, 0.1, 0.5)
+
+
+def summarize(results):
+    """(identifiant de Q&A, score arrondi) de chaque résultat"""
+    return [(result['qa_data']['id'], round(float(result['score']), 5)) for result in results]
+
+
+def assert_batch_matches_search(system, top_k=3):
+    assert system.search_batch([], top_k) == []
+    for threshold in THRESHOLDS:
+        batch = system.search_batch(QUERIES, top_k, threshold)
+        assert len(batch) == len(QUERIES)
+        for query, results in zip(QUERIES, batch):
+            expected = summarize(system.search(query, top_k, threshold))
+            assert summarize(results) == expected, (query, threshold)
+        assert any(batch), f"aucun résultat au seuil {threshold}"
+
+
+def write_knowledge_base(directory):
+    path = os.path.join(directory, "knowledge_base.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'qa_pairs': QA_PAIRS}, f, ensure_ascii=False)
+    return path
+
+
+def test_retrieval_system_batch():
+    """RetrievalSystem (TF-IDF): lot identique aux recherches unitaires"""
+    print("🧪 TEST LOT RETRIEVALSYSTEM")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        system = RetrievalSystem(write_knowledge_base(directory), os.path.join(directory, "tfidf.bin"))
+        assert_batch_matches_search(system)
+    print("   ✅ Résultats identiques")
+
+
+def test_unified_batch():
+    """UnifiedRetrievalSystem en modes FAISS, hybride et TF-IDF: lot identique aux recherches unitaires"""
+    print("\n🧪 TEST LOT UNIFIEDRETRIEVALSYSTEM")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        assert_batch_matches_search(make_system(directory))
+        assert_batch_matches_search(make_system(directory, hybrid=True))
+        assert_batch_matches_search(make_system(directory, query_batching=True))
+
+        tfidf = UnifiedRetrievalSystem(write_knowledge_base(directory), use_faiss=False,
+                                       tfidf_index_path=os.path.join(directory, "tfidf.bin"))
+        assert_batch_matches_search(tfidf)
+    print("   ✅ Résultats identiques dans les quatre modes")
+
+
+def test_faiss_gemini_batch():
+    """FAISSGeminiRetrieval: lot identique aux recherches unitaires, seuil appliqué au lot"""
+    print("\n🧪 TEST LOT FAISSGEMINIRETRIEVAL")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "kb.json"), 'w', encoding='utf-8') as f:
+            json.dump({'qa_pairs': QA_PAIRS}, f, ensure_ascii=False)
+        retrieval = make_retrieval(directory, query_embed_fn=fake_embed)
+        assert retrieval.search_batch([]) == []
+
+        def assert_same(results, expected, query):
+            # Scores 1 / (1 + distance L2): comparés en tolérance relative
+            assert [document['question'] for document, _ in results] == \
+                [document['question'] for document, _ in expected], query
+            assert np.allclose([score for _, score in results], [score for _, score in expected], rtol=1e-5), query
+
+        batch = retrieval.search_batch(QUERIES, top_k=3)
+        for query, results in zip(QUERIES, batch):
+            assert_same(results, retrieval.search(query, top_k=3), query)
+
+        threshold = float(np.median([score for results in batch for _, score in results]))
+        filtered = retrieval.search_batch(QUERIES, top_k=3, confidence_threshold=threshold)
+        for query, results in zip(QUERIES, filtered):
+            expected = [(document, score) for document, score in retrieval.search(query, top_k=3) if score >= threshold]
+            assert_same(results, expected, query)
+        assert 0 < sum(len(results) for results in filtered) < sum(len(results) for results in batch)
+    print("   ✅ Résultats identiques")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("RetrievalSystem", run_test(test_retrieval_system_batch)),
+        ("UnifiedRetrievalSystem", run_test(test_unified_batch)),
+        ("FAISSGeminiRetrieval", run_test(test_faiss_gemini_batch)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test du cache partagé SQLite pour ZamaPay
+Vérifie le partage entre processus, la version de la base, l'expiration, la
+réutilisation des réponses par un autre worker et l'invalidation quand le contenu
+de la base change sans que sa taille change
+"""
+
+import os
+import sys
+import json
+import subprocess
+import tempfile
+from shared_cache import SharedCache
+from response_generator import ResponseGenerator
+from unified_retrieval import UnifiedRetrievalSystem
+
+
+def test_shared_between_processes():
+    """Une entrée écrite par un autre processus est lue ici, après son arrêt"""
+    print("🧪 TEST PARTAGE ENTRE PROCESSUS")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        writer = (
+            "from shared_cache import SharedCache\n"
+            f"SharedCache({path!r}).put('kb', 'frais', [{{'score': 0.9, 'qa_data': {{'id': 7}}}}], 'v1')\n"
+        )
+        subprocess.run([sys.executable, "-c", writer], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        cache = SharedCache(path)
+        assert cache.get('kb', 'frais', 'v1') == [{'score': 0.9, 'qa_data': {'id': 7}}]
+        assert cache.get('kb', 'frais', 'v2') is None, "autre version de la base"
+        assert cache.get('responses', 'frais', 'v1') is None, "espace de noms distinct"
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses']) == (1, 2)
+    print("   ✅ Entrée relue par un autre processus")
+
+
+def test_expiry_and_pruning():
+    """Les entrées expirées sont ignorées; le nettoyage garde les plus récemment lues"""
+    print("\n🧪 TEST EXPIRATION ET NETTOYAGE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        expired = SharedCache(os.path.join(directory, "expired.sqlite3"), ttl=0)
+        expired.put('kb', 'frais', [1])
+        assert expired.get('kb', 'frais') is None
+
+        cache = SharedCache(os.path.join(directory, "cache.sqlite3"), max_entries=3, prune_every=1000)
+        for i in range(5):
+            cache.put('kb', f"q{i}", [i])
+        cache.get('kb', "q0")
+        cache.prune()
+        assert cache.get_stats()['entries'] == {'kb': 3}
+        assert cache.get('kb', "q0") == [0] and cache.get('kb', "q1") is None
+    print("   ✅ Cache borné")
+
+
+class Retrieval:
+    """Recherche factice qui compte les appels"""
+
+    use_faiss = False
+    kb_version = "v1"
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, top_k=3, confidence_threshold=0.1):
+        self.calls += 1
+        return [{'score': 0.9, 'qa_data': {'id': 1, 'question_principale': "Frais", 'reponse': "Frais de 1%"}}]
+
+
+def test_workers_reuse_each_other():
+    """Un second worker réutilise la recherche et la réponse du premier"""
+    print("\n🧪 TEST WORKERS")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        first, second = Retrieval(), Retrieval()
+
+        worker_a = ResponseGenerator(first, shared_cache_path=path)
+        worker_a.gemini_model = None
+        answer = worker_a.generate_response("Quels sont les frais ?", "Awa")
+
+        worker_b = ResponseGenerator(second, shared_cache_path=path)
+        worker_b.gemini_model = None
+        reused = worker_b.generate_response("quels sont les frais", "Moussa")
+        assert second.calls == 0
+        assert reused['cached'] and reused['response'] == answer['response'].replace("Awa", "Moussa")
+
+        assert worker_b._search_knowledge_base("Quels sont les frais ?")[0]['qa_data']['id'] == 1
+        assert second.calls == 0
+        assert worker_b.get_cache_info()['shared_cache']['hits'] == 2
+    print("   ✅ Aucun calcul dans le second worker")
+
+
+def write_kb(path, fee):
+    """Base d'une seule Q&A: seul le montant des frais change d'une version à l'autre"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"qa_pairs": [{
+            "id": 1, "question_principale": "Quels sont les frais de transfert ?",
+            "reponse": f"Les frais de transfert sont de {fee}.", "categorie": "frais", "variations": []
+        }]}, f, ensure_ascii=False)
+    return path
+
+
+def fake_embed(texts):
+    """Embedding local déterministe (sans appel API)"""
+    return [[float(len(text) % 97)] * 768 for text in texts]
+
+
+def test_kb_edit_invalidates():
+    """Une base modifiée de même taille ne relit pas les réponses de l'ancienne"""
+    print("\n🧪 TEST BASE MODIFIÉE")
+    print("-" * 40)
+
+    question = "Quels sont les frais de transfert ?"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+
+        def worker(fee):
+            kb_path = write_kb(os.path.join(directory, "kb.json"), fee)
+            retrieval = UnifiedRetrievalSystem(
+                kb_path, use_faiss=False, tfidf_index_path=os.path.join(directory, f"tfidf_{fee}.bin")
+            )
+            generator = ResponseGenerator(retrieval, shared_cache_path=path)
+            generator.gemini_model = None
+            return generator
+
+        first = worker("1%").generate_response(question, "Awa")
+        assert "1%" in first['response'] and not first.get('cached')
+        assert worker("1%").generate_response(question, "Awa")['cached'], "même contenu: réutilisée"
+
+        edited = worker("2%").generate_response(question, "Awa")
+        assert not edited.get('cached') and "2%" in edited['response'] and "1%" not in edited['response']
+        print("   ✅ Recherche par TF-IDF: réponse recalculée")
+
+        # Index FAISS Gemini: la version suit le contenu et survit au redémarrage
+        from faiss_gemini_system import FAISSGeminiRetrieval
+
+        def faiss_retrieval(name, fee):
+            return FAISSGeminiRetrieval(
+                knowledge_base_path=write_kb(os.path.join(directory, f"{name}.json"), fee),
+                index_path=os.path.join(directory, f"{name}.bin"),
+                metadata_path=os.path.join(directory, f"{name}.zpc"),
+                gemini_api_key="test-key",
+                embed_fn=fake_embed
+            )
+
+        cache = SharedCache(path)
+        original = faiss_retrieval("original", "1%")
+        cache.put('responses', "quels sont les frais de transfert", first, original.kb_version)
+        edited = faiss_retrieval("edited", "2%")
+        assert len(edited.documents) == len(original.documents)
+        assert cache.get('responses', "quels sont les frais de transfert", edited.kb_version) is None
+        restarted = faiss_retrieval("original", "1%")
+        assert cache.get('responses', "quels sont les frais de transfert", restarted.kb_version) is not None
+        print("   ✅ Index FAISS Gemini: même taille, version différente")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Processus", run_test(test_shared_between_processes)),
+        ("Expiration", run_test(test_expiry_and_pruning)),
+        ("Workers", run_test(test_workers_reuse_each_other)),
+        ("Base modifiée", run_test(test_kb_edit_invalidates)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test de l'index TF-IDF persistant pour ZamaPay
+Vérifie la sauvegarde, le rechargement mappé en mémoire, l'invalidation et
+les sauvegardes concurrentes
+"""
+
+import os
+import tempfile
+import threading
+import numpy as np
+from columnar_store import write_array_file
+from tfidf_index import MAGIC, FORMAT_VERSION, TfidfIndexArtifact, load_or_build_tfidf_index, compute_fingerprint
+
+TEXTS = [
+    "quels sont vos frais",
+    "combien coûte un transfert",
+    "délai de transfert uemoa",
+    "comment créer une tontine digitale",
+]
+REF_QA = [0, 0, 1, 2]
+REF_TYPE = [0, 1, 0, 0]
+
+
+def test_roundtrip():
+    """L'artefact rechargé donne les mêmes vecteurs que l'artefact entraîné"""
+    print("🧪 TEST ALLER-RETOUR INDEX TF-IDF")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tfidf_index.bin")
+        built = load_or_build_tfidf_index(path, TEXTS, REF_QA, REF_TYPE)
+        assert os.path.exists(path)
+
+        loaded = TfidfIndexArtifact.load(path, expected_fingerprint=built.fingerprint)
+        assert loaded is not None
+        assert not loaded.matrix.data.flags.writeable
+        assert not loaded.matrix.indptr.flags.writeable
+        print("   ✅ Tableaux mappés en mémoire")
+
+        assert np.allclose(built.matrix.toarray(), loaded.matrix.toarray())
+        assert list(loaded.ref_qa) == REF_QA and list(loaded.ref_type) == REF_TYPE
+
+        query = ["frais transfert uemoa"]
+        assert np.allclose(
+            built.vectorizer.transform(query).toarray(),
+            loaded.vectorizer.transform(query).toarray()
+        )
+        print("   ✅ Vecteurs et requêtes identiques après rechargement")
+
+
+def test_stale_artifact_rebuilt():
+    """Un artefact dont l'empreinte ne correspond plus est reconstruit"""
+    print("\n🧪 TEST INVALIDATION INDEX TF-IDF")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tfidf_index.bin")
+        load_or_build_tfidf_index(path, TEXTS, REF_QA, REF_TYPE)
+
+        new_texts = TEXTS + ["sécurité des données"]
+        new_ref_qa = REF_QA + [3]
+        new_ref_type = REF_TYPE + [0]
+        fingerprint = compute_fingerprint(new_texts, new_ref_qa, new_ref_type)
+
+        assert TfidfIndexArtifact.load(path, expected_fingerprint=fingerprint) is None
+        rebuilt = load_or_build_tfidf_index(path, new_texts, new_ref_qa, new_ref_type)
+        assert rebuilt.matrix.shape[0] == len(new_texts)
+        assert TfidfIndexArtifact.load(path, expected_fingerprint=fingerprint) is not None
+        print("   ✅ Artefact obsolète ignoré puis reconstruit")
+
+
+def test_concurrent_writers():
+    """Deux processus qui sauvegardent le même index ne partagent pas de fichier temporaire"""
+    print("\n🧪 TEST SAUVEGARDES CONCURRENTES")
+    print("-" * 40)
+
+    artifacts = [
+        load_or_build_tfidf_index(None, TEXTS, REF_QA, REF_TYPE),
+        load_or_build_tfidf_index(None, TEXTS + ["sécurité des données"], REF_QA + [3], REF_TYPE + [0]),
+    ]
+    fingerprints = {artifact.fingerprint for artifact in artifacts}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "tfidf_index.bin")
+        results = []
+        barrier = threading.Barrier(len(artifacts))
+
+        def writer(artifact):
+            for _ in range(20):
+                barrier.wait()
+                results.append(artifact.save(path))
+
+        threads = [threading.Thread(target=writer, args=(artifact,)) for artifact in artifacts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [True] * 40, "une sauvegarde a échoué"
+        loaded = TfidfIndexArtifact.load(path)
+        assert loaded is not None and loaded.fingerprint in fingerprints
+        assert os.listdir(tmp_dir) == ["tfidf_index.bin"], "fichier temporaire orphelin"
+        print("   ✅ 40 sauvegardes concurrentes, fichier final valide")
+
+        # Échec du renommage (cible = répertoire): le fichier temporaire est supprimé
+        os.mkdir(os.path.join(tmp_dir, "occupé"))
+        try:
+            write_array_file(os.path.join(tmp_dir, "occupé"), MAGIC, FORMAT_VERSION, {}, {'x': np.zeros(3)})
+            assert False, "le renommage aurait dû échouer"
+        except OSError:
+            pass
+        assert sorted(os.listdir(tmp_dir)) == ["occupé", "tfidf_index.bin"]
+        print("   ✅ Fichier temporaire supprimé après un échec")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Aller-retour", run_test(test_roundtrip)),
+        ("Invalidation", run_test(test_stale_artifact_rebuilt)),
+        ("Sauvegardes concurrentes", run_test(test_concurrent_writers)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test du système de recherche unifié ZamaPay
+Utilise le petit modèle ONNX local de test_encoder_backends (sans torch ni Hub)
+"""
+
+import os
+import json
+import copy
+import tempfile
+import numpy as np
+import faiss
+from response_generator import ResponseGenerator
+from test_encoder_backends import build_model_directory
+from unified_retrieval import UnifiedRetrievalSystem
+
+QA_PAIRS = [
+    {'id': 1, 'question_principale': "Quels sont les frais de transfert ?",
+     'variations': ["frais transfert orange money", "frais compte zamapay"], 'reponse': "1% du montant", 'categorie': 'frais'},
+    {'id': 2, 'question_principale': "Comment ouvrir un compte zamapay ?",
+     'variations': ["ouvrir compte", "créer compte zamapay"], 'reponse': "Depuis l'application", 'categorie': 'compte'},
+    {'id': 3, 'question_principale': "Puis-je envoyer vers la zone UEMOA ?",
+     'variations': ["UEMOA", "pays de l'UEMOA"], 'reponse': "Oui, les 8 pays", 'categorie': 'pays'},
+    {'id': 4, 'question_principale': "Orange money est-il accepté ?",
+     'variations': ["orange money transfert", "payer avec orange money"], 'reponse': "Oui", 'categorie': 'operateurs'},
+]
+
+
+def make_system(directory, qa_pairs=QA_PAIRS, **options):
+    """Système FAISS + encodeur ONNX local; index et métadonnées dans directory"""
+    if not os.path.exists(os.path.join(directory, "model.onnx")):
+        build_model_directory(directory)
+    kb_path = os.path.join(directory, "knowledge_base.json")
+    with open(kb_path, 'w', encoding='utf-8') as f:
+        json.dump({'qa_pairs': qa_pairs}, f, ensure_ascii=False)
+    return UnifiedRetrievalSystem(
+        kb_path, use_faiss=True, encoder_backend='onnx', model_name=directory,
+        index_path=os.path.join(directory, "index.bin"),
+        metadata_path=os.path.join(directory, "metadata.zpc"),
+        tfidf_index_path=os.path.join(directory, "tfidf.bin"),
+        **options
+    )
+
+
+def assert_index_matches_texts(system):
+    """Chaque identifiant de l'index porte l'embedding de son texte, sans vecteur orphelin"""
+    stored_ids = set(faiss.vector_to_array(system.index.id_map).tolist())
+    assert stored_ids == set(system.vector_ids), "identifiants de l'index != textes de la base"
+    expected = system._encode_normalized(system.texts)
+    for row, vector_id in enumerate(system.vector_ids):
+        assert np.allclose(system.index.reconstruct(int(vector_id)), expected[row], atol=1e-5), system.texts[row]
+
+
+class RecordingModel:
+    """Modèle Gemini factice: compte les appels"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls += 1
+        raise RuntimeError("Gemini ne devrait pas être appelé")
+
+
+def test_hybrid_lexical_match_is_decisive():
+    """Un terme exact propre à une Q&A (BM25) la classe première au-dessus du seuil Gemini"""
+    print("🧪 TEST ACCORD LEXICAL HYBRIDE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        system = make_system(directory, hybrid=True)
+        dense = system._search_dense_candidates(["uemoa"], 3)[0]
+        assert dense[0]['qa_data']['id'] != 3 and max(r['score'] for r in dense) < 0.6, "dense seul: indécis"
+
+        results = system.search("uemoa", top_k=3)
+        assert results[0]['qa_data']['id'] == 3
+        assert results[0]['score'] >= 0.6, results[0]['score']
+
+        # Terme partagé par plusieurs Q&A: pas de marge lexicale, score dense inchangé
+        shared = system.search("frais orange money", top_k=3)
+        assert all(r['score'] == r['dense_score'] for r in shared)
+
+        generator = ResponseGenerator(system)
+        generator.gemini_model = RecordingModel()
+        kb_results = generator._search_knowledge_base("uemoa")
+        assert kb_results[0]['qa_data']['id'] == 3
+        assert not generator._should_use_gemini(kb_results, "uemoa")
+
+        # Ordre de fusion conservé même quand les scores ne sont pas décroissants
+        fused = system.search("transfert uemoa", top_k=3)
+        assert [r['score'] for r in fused] != sorted((r['score'] for r in fused), reverse=True)
+        kb_results = generator._search_knowledge_base("transfert uemoa")
+        assert [r['qa_data']['id'] for r in kb_results] == [r['qa_data']['id'] for r in fused]
+
+        response = generator.generate_response("uemoa", "Awa")
+        assert response['source'] == 'knowledge_base' and "8 pays" in response['response']
+        assert generator.gemini_model.calls == 0
+    print("   ✅ Q&A lexicale décisive servie par la base")
+
+
+def test_incremental_sync():
+    """Q&A modifiée, ajoutée et retirée: seules leurs entrées changent dans l'index"""
+    print("\n🧪 TEST MISE À JOUR INCRÉMENTALE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        system = make_system(directory)
+        before = {key: list(entry['ids']) for key, entry in system.qa_entries.items()}
+        next_id = system.next_id
+
+        qa_pairs = copy.deepcopy(QA_PAIRS)
+        qa_pairs[1]['variations'] = ["ouvrir compte zamapay", "compte money"]
+        del qa_pairs[3]
+        qa_pairs.append({'id': 5, 'question_principale': "Frais transfert uemoa",
+                         'variations': ["money uemoa"], 'reponse': "0,5%", 'categorie': 'frais'})
+        system = make_system(directory, qa_pairs)
+
+        assert set(system.qa_entries) == {'1', '2', '3', '5'}
+        assert system.qa_entries['1']['ids'] == before['1'] and system.qa_entries['3']['ids'] == before['3']
+        assert min(system.qa_entries['2']['ids'] + system.qa_entries['5']['ids']) >= next_id, "nouveaux identifiants"
+        assert system.index.ntotal == len(system.texts) == 11
+        assert_index_matches_texts(system)
+        assert system.search("money uemoa", top_k=1)[0]['qa_data']['id'] == 5
+
+        # Au redémarrage sans modification: index chargé tel quel
+        reloaded = make_system(directory, qa_pairs)
+        assert {key: entry['ids'] for key, entry in reloaded.qa_entries.items()} == \
+            {key: entry['ids'] for key, entry in system.qa_entries.items()}
+    print("   ✅ Delta appliqué, vecteurs cohérents avec les textes")
+
+
+def test_checksum_mismatch_forces_rebuild():
+    """Index et métadonnées désynchronisés (sauvegarde interrompue): reconstruction complète"""
+    print("\n🧪 TEST EMPREINTE DE L'INDEX")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        system = make_system(directory)
+        qa_pairs = copy.deepcopy(QA_PAIRS)
+        qa_pairs[0]['variations'].append("frais uemoa")
+        stale_index = faiss.serialize_index(system.index)
+        make_system(directory, qa_pairs)
+
+        # Arrêt entre les deux renommages: nouvel index absent, métadonnées à jour
+        with open(system.index_path, 'wb') as f:
+            f.write(stale_index.tobytes())
+        assert system.load_index(system.index_path, system.metadata_path) is None
+
+        rebuilt = make_system(directory, qa_pairs)
+        assert rebuilt.next_id == len(rebuilt.texts), "identifiants renumérotés: reconstruction complète"
+        assert_index_matches_texts(rebuilt)
+        assert rebuilt.load_index(rebuilt.index_path, rebuilt.metadata_path) is not None
+    print("   ✅ Désynchronisation détectée, index reconstruit")
+
+
+def test_duplicate_ids_are_kept_apart():
+    """Deux Q&A au même identifiant restent deux entrées distinctes"""
+    print("\n🧪 TEST IDENTIFIANTS EN DOUBLE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        qa_pairs = copy.deepcopy(QA_PAIRS)
+        qa_pairs[3]['id'] = 1
+        system = make_system(directory, qa_pairs)
+
+        assert set(system.qa_entries) == {'pos-0', '2', '3', 'pos-3'}
+        assert system.index.ntotal == len(system.texts) == 12
+        assert_index_matches_texts(system)
+        found = {r['qa_data']['categorie'] for r in system.search("orange money", top_k=4, confidence_threshold=-1)}
+        assert {'frais', 'operateurs'} <= found
+    print("   ✅ Q&A indexées par position")
+
+
+def test_flooding_variations_widen_search():
+    """Les variations d'une seule Q&A occupent les top_k × m premiers voisins: la recherche s'élargit"""
+    print("\n🧪 TEST ÉLARGISSEMENT DE LA RECHERCHE")
+    print("-" * 40)
+
+    with tempfile.TemporaryDirectory() as directory:
+        flood = {'id': 1, 'question_principale': "frais", 'reponse': "1%", 'categorie': 'frais',
+                 'variations': ["frais " * n + suffix for n in range(2, 6) for suffix in ("", "transfert", "compte")]}
+        system = make_system(directory, [flood] + copy.deepcopy(QA_PAIRS[1:]), oversample_factor=3)
+
+        query = system._encode_queries(["frais"])
+        _, first_hits = system.index.search(query, 3 * system.oversample_factor)
+        assert {system.qa_positions[system.id_to_position[int(i)]] for i in first_hits[0]} == {0}, \
+            "les 9 premiers voisins appartiennent à la même Q&A"
+
+        results = system.search("frais", top_k=3, confidence_threshold=-1)
+        assert len(results) == 3 and len({r['qa_data']['id'] for r in results}) == 3
+        assert results[0]['qa_data']['id'] == 1
+
+        # En lot: seule la requête inondée est relancée, l'autre garde ses résultats
+        batch = system.search_batch(["frais", "orange money"], top_k=3, confidence_threshold=-1)
+        assert [r['qa_data']['id'] for r in batch[0]] == [r['qa_data']['id'] for r in results]
+        assert len({r['qa_data']['id'] for r in batch[1]}) == 3
+    print("   ✅ 3 Q&A distinctes malgré les variations en tête")
+
+
+def run_test(test_function):
+    """Exécute un test et retourne son statut"""
+    try:
+        test_function()
+        return True
+    except AssertionError as e:
+        print(f"   ❌ Échec: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    results = [
+        ("Accord lexical hybride", run_test(test_hybrid_lexical_match_is_decisive)),
+        ("Mise à jour incrémentale", run_test(test_incremental_sync)),
+        ("Empreinte de l'index", run_test(test_checksum_mismatch_forces_rebuild)),
+        ("Identifiants en double", run_test(test_duplicate_ids_are_kept_apart)),
+        ("Élargissement de la recherche", run_test(test_flooding_variations_widen_search)),
+    ]
+    print("\n" + "=" * 40)
+    for test_name, success in results:
+        print(f"   {test_name}: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
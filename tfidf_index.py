@@ -0,0 +1,200 @@
+"""
+Index TF-IDF persistant et mappable en mémoire pour ZamaPay
+Évite de réentraîner le TfidfVectorizer à chaque démarrage du processus
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from typing import List, Optional
+from columnar_store import read_array_file, write_array_file
+
+# Format binaire commun (voir columnar_store.write_array_file)
+MAGIC = b"ZPTFIDF\x00"
+FORMAT_VERSION = 1
+
+REF_TYPES = ('main', 'variation')
+
+# Paramètres du vectoriseur sérialisés avec l'artefact
+VECTORIZER_PARAMS = {
+    'lowercase': True,
+    'token_pattern': r'(?u)\b\w\w+\b',
+    'norm': 'l2',
+    'use_idf': True,
+    'smooth_idf': True,
+    'sublinear_tf': False,
+}
+
+
+def compute_fingerprint(texts: List[str], ref_qa: List[int], ref_type: List[int]) -> str:
+    """
+    Calcule l'empreinte du corpus indexé
+
+    Args:
+        texts: Textes prétraités à vectoriser
+        ref_qa: Position de la Q&A source de chaque texte
+        ref_type: Type de chaque texte (index dans REF_TYPES)
+
+    Returns:
+        Empreinte SHA-256 hexadécimale
+    """
+    payload = json.dumps({
+        'version': FORMAT_VERSION,
+        'params': VECTORIZER_PARAMS,
+        'texts': texts,
+        'ref_qa': [int(q) for q in ref_qa],
+        'ref_type': [int(t) for t in ref_type],
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TfidfIndexArtifact:
+    """Vocabulaire, poids IDF, matrice CSR et table de références d'un index TF-IDF"""
+
+    def __init__(
+        self,
+        vectorizer: TfidfVectorizer,
+        matrix: csr_matrix,
+        ref_qa: np.ndarray,
+        ref_type: np.ndarray,
+        fingerprint: str
+    ):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.ref_qa = ref_qa
+        self.ref_type = ref_type
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, texts: List[str], ref_qa: List[int], ref_type: List[int], fingerprint: str = None):
+        """
+        Entraîne un TfidfVectorizer sur les textes et construit l'artefact
+
+        Args:
+            texts: Textes prétraités
+            ref_qa: Position de la Q&A source de chaque texte
+            ref_type: Type de chaque texte (index dans REF_TYPES)
+            fingerprint: Empreinte du corpus (calculée si absente)
+
+        Returns:
+            TfidfIndexArtifact
+        """
+        vectorizer = TfidfVectorizer(stop_words=None, **VECTORIZER_PARAMS)
+        matrix = vectorizer.fit_transform(texts).astype(np.float32).tocsr()
+        return cls(
+            vectorizer,
+            matrix,
+            np.asarray(ref_qa, dtype=np.int32),
+            np.asarray(ref_type, dtype=np.uint8),
+            fingerprint or compute_fingerprint(texts, ref_qa, ref_type)
+        )
+
+    def save(self, path: str) -> bool:
+        """
+        Écrit l'artefact de manière atomique (fichier temporaire + renommage)
+
+        Args:
+            path: Chemin du fichier binaire
+
+        Returns:
+            True si la sauvegarde a réussi
+        """
+        arrays = {
+            'idf': np.asarray(self.vectorizer.idf_, dtype=np.float64),
+            'indptr': np.asarray(self.matrix.indptr, dtype=np.int32),
+            'indices': np.asarray(self.matrix.indices, dtype=np.int32),
+            'data': np.asarray(self.matrix.data, dtype=np.float32),
+            'ref_qa': np.asarray(self.ref_qa, dtype=np.int32),
+            'ref_type': np.asarray(self.ref_type, dtype=np.uint8),
+        }
+
+        header = {
+            'fingerprint': self.fingerprint,
+            'shape': [int(s) for s in self.matrix.shape],
+            'params': VECTORIZER_PARAMS,
+            'vocabulary': {term: int(col) for term, col in self.vectorizer.vocabulary_.items()},
+        }
+
+        try:
+            write_array_file(path, MAGIC, FORMAT_VERSION, header, arrays)
+            print(f"💾 Index TF-IDF sauvegardé: {path}")
+            return True
+        except Exception as e:
+            print(f"❌ Erreur sauvegarde index TF-IDF: {e}")
+            return False
+
+    @classmethod
+    def load(cls, path: str, expected_fingerprint: str = None) -> Optional["TfidfIndexArtifact"]:
+        """
+        Charge l'artefact en mappant les tableaux en mémoire (lecture seule)
+
+        Args:
+            path: Chemin du fichier binaire
+            expected_fingerprint: Empreinte attendue, l'artefact est ignoré si elle diffère
+
+        Returns:
+            TfidfIndexArtifact ou None si absent, obsolète ou invalide
+        """
+        if not os.path.exists(path):
+            return None
+
+        try:
+            header, arrays = read_array_file(path, MAGIC, FORMAT_VERSION)
+        except Exception as e:
+            print(f"⚠️ Index TF-IDF ignoré: {e}")
+            return None
+
+        if expected_fingerprint and header['fingerprint'] != expected_fingerprint:
+            print("🔄 Index TF-IDF obsolète (base de connaissances modifiée)")
+            return None
+
+        try:
+            vectorizer = TfidfVectorizer(stop_words=None, vocabulary=header['vocabulary'], **header['params'])
+            vectorizer.idf_ = np.asarray(arrays['idf'])
+
+            matrix = csr_matrix(
+                (arrays['data'], arrays['indices'], arrays['indptr']),
+                shape=tuple(header['shape']),
+                copy=False
+            )
+
+            return cls(vectorizer, matrix, arrays['ref_qa'], arrays['ref_type'], header['fingerprint'])
+
+        except Exception as e:
+            print(f"❌ Erreur chargement index TF-IDF: {e}")
+            return None
+
+
+def load_or_build_tfidf_index(path: str, texts: List[str], ref_qa: List[int], ref_type: List[int]) -> TfidfIndexArtifact:
+    """
+    Charge l'artefact TF-IDF s'il correspond au corpus, sinon le reconstruit et le sauvegarde
+
+    Args:
+        path: Chemin du fichier binaire (None pour ne rien persister)
+        texts: Textes prétraités
+        ref_qa: Position de la Q&A source de chaque texte
+        ref_type: Type de chaque texte (index dans REF_TYPES)
+
+    Returns:
+        TfidfIndexArtifact
+    """
+    fingerprint = compute_fingerprint(texts, ref_qa, ref_type)
+
+    if path:
+        artifact = TfidfIndexArtifact.load(path, expected_fingerprint=fingerprint)
+        if artifact is not None:
+            print(f"✅ Index TF-IDF chargé depuis {path}: {artifact.matrix.shape[0]} questions")
+            return artifact
+
+    artifact = TfidfIndexArtifact.build(texts, ref_qa, ref_type, fingerprint)
+    if path:
+        artifact.save(path)
+    return artifact
+
+
+def ref_type_code(type_name: str) -> int:
+    """Code numérique d'un type de référence ('main' ou 'variation')"""
+    return REF_TYPES.index(type_name)
@@ -1,47 +1,88 @@
 # unified_retrieval.py
 import os
 import json
-import pickle
+import hashlib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from lazy_loading import LazyModule, module_available
+from query_batcher import QueryBatcher
+from columnar_store import ColumnarStore, temporary_path
+from bm25_index import BM25Index
+from passage_index import PassageIndex
+from embedding_cache import EmbeddingCache
+# L'encodeur (PyTorch ou ONNX Runtime) n'est importé qu'à la création du modèle
+from encoder_backends import create_encoder, encoder_available, cosine_agreement
 
-# ✅ CORRECTION: Gestion robuste des imports FAISS
-try:
-    import faiss
-    FAISS_AVAILABLE = True
-    print("✅ FAISS disponible")
-except ImportError as e:
-    FAISS_AVAILABLE = False
-    print(f"⚠️ FAISS non disponible: {e}")
+# Dépendances lourdes importées au premier usage (scikit-learn ~1.5 s, scipy, faiss):
+# l'import de ce module ne coûte plus que numpy
+sklearn_text = LazyModule('sklearn.feature_extraction.text')
+sklearn_pairwise = LazyModule('sklearn.metrics.pairwise')
+tfidf_index = LazyModule('tfidf_index')
+score_aggregation = LazyModule('score_aggregation')
+faiss = LazyModule('faiss')
+index_factory = LazyModule('index_factory')
 
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-    print("✅ SentenceTransformer disponible")
-except ImportError as e:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
-    print(f"⚠️ SentenceTransformer non disponible: {e}")
+# ✅ CORRECTION: Gestion robuste des imports FAISS (détection sans import)
+FAISS_AVAILABLE = module_available('faiss')
+if FAISS_AVAILABLE:
+    print("✅ FAISS disponible")
+else:
+    print("⚠️ FAISS non disponible")
 
 class UnifiedRetrievalSystem:
-    def __init__(self, knowledge_base_path="knowledge_base.json", use_faiss=True):
+    INDEX_FORMAT_VERSION = 3
+
+    def __init__(self, knowledge_base_path="knowledge_base.json", use_faiss=True,
+                 tfidf_index_path="unified_tfidf_index.bin", model_name='all-MiniLM-L6-v2',
+                 index_path="unified_faiss_index.bin", metadata_path="unified_faiss_metadata.zpc",
+                 query_batching=False, batch_window_ms=5.0, max_batch_size=32,
+                 oversample_factor=3, hybrid=False, rrf_k=60, hybrid_candidates=10,
+                 index_mode='auto', pca_dim=128, target_recall=0.95,
+                 encoder_backend='torch', encoder_agreement_threshold=0.98,
+                 embedding_cache_size=10_000, embedding_cache_path=None):
         self.knowledge_base_path = knowledge_base_path
+        self.tfidf_index_path = tfidf_index_path
+        self.model_name = model_name
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.query_batcher = None
+        self.oversample_factor = oversample_factor
+        self.index_mode = index_mode
+        self.index_kind = None
+        self.pca_dim = pca_dim
+        self.target_recall = target_recall
+        self.encoder_backend = encoder_backend
+        self.encoder_agreement_threshold = encoder_agreement_threshold
+        self.index_encoder = encoder_backend
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        self.hybrid_candidates = hybrid_candidates
+        self.bm25 = None
+        self._dense_executor = None
+        
+        # Embeddings des requêtes déjà vues (persistés si embedding_cache_path est fourni)
+        self.embedding_cache = EmbeddingCache(embedding_cache_size, embedding_cache_path)
         
         # ✅ CORRECTION: Vérifier la disponibilité réelle
-        self.use_faiss = use_faiss and FAISS_AVAILABLE and SENTENCE_TRANSFORMERS_AVAILABLE
+        self.use_faiss = use_faiss and FAISS_AVAILABLE and encoder_available(encoder_backend)
         
         if use_faiss and not self.use_faiss:
-            print("🔍 Fallback vers TF-IDF (FAISS ou SentenceTransformer non disponible)")
+            print(f"🔍 Fallback vers TF-IDF (FAISS ou encodeur {encoder_backend} non disponible)")
         
         self.knowledge_base = self.load_knowledge_base(knowledge_base_path)
+        self.kb_version = self._compute_kb_version()
+        
+        # Index des sections de réponses (contexte ciblé pour Gemini)
+        self.passage_index = PassageIndex(self.knowledge_base['qa_pairs'])
+        print(f"✅ Index de passages: {len(self.passage_index)} sections")
         
         if self.use_faiss:
-            # Essayer de charger l'index existant d'abord
-            if not self.load_index():
-                # Sinon créer un nouvel index
-                self._initialize_faiss()
-                self.save_index()
+            # Charge l'index existant et ne ré-encode que les Q&A modifiées
+            self._initialize_faiss()
+            if self.use_faiss and query_batching:
+                self.enable_query_batching(batch_window_ms, max_batch_size)
         else:
             self._initialize_tfidf()
     
@@ -66,70 +107,264 @@ class UnifiedRetrievalSystem:
         """Crée une structure par défaut"""
         return {"qa_pairs": []}
     
+    def _compute_kb_version(self):
+        """Empreinte du contenu de la base (invalide les réponses mises en cache)"""
+        payload = json.dumps(self.knowledge_base.get('qa_pairs', []), ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    
     def _initialize_faiss(self):
-        """Initialise FAISS si disponible"""
+        """Initialise FAISS si disponible (chargement + mise à jour incrémentale de l'index)"""
         try:
-            if not FAISS_AVAILABLE or not SENTENCE_TRANSFORMERS_AVAILABLE:
-                raise ImportError("FAISS ou SentenceTransformer non disponible")
+            if not FAISS_AVAILABLE or not encoder_available(self.encoder_backend):
+                raise ImportError(f"FAISS ou encodeur {self.encoder_backend} non disponible")
             
             # Charger le modèle d'embedding
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("✅ Modèle SentenceTransformer chargé")
-            
-            # Préparer les textes pour l'embedding
-            self.texts = []
-            self.qa_mapping = []
+            self.model = create_encoder(self.encoder_backend, self.model_name)
+            print(f"✅ Encodeur {self.encoder_backend} chargé: {self.model_name}")
             
-            for qa in self.knowledge_base['qa_pairs']:
-                # Question principale
-                self.texts.append(qa['question_principale'])
-                self.qa_mapping.append({
-                    'type': 'main',
-                    'qa_data': qa
-                })
-                
-                # Variations
-                for variation in qa.get('variations', []):
-                    self.texts.append(variation)
-                    self.qa_mapping.append({
-                        'type': 'variation', 
-                        'qa_data': qa
-                    })
+            # Préparer les textes par Q&A avec leur empreinte de contenu
+            qa_entries = self._collect_qa_entries()
             
-            # Générer les embeddings
-            if self.texts:
-                embeddings = self.model.encode(self.texts, convert_to_numpy=True)
-                
-                # Créer l'index FAISS
-                dimension = embeddings.shape[1]
-                self.index = faiss.IndexFlatIP(dimension)
-                faiss.normalize_L2(embeddings)
-                self.index.add(embeddings)
-                
-                print(f"✅ FAISS initialisé avec {len(self.texts)} embeddings")
-            else:
+            if not any(entry['texts'] for entry in qa_entries.values()):
                 print("❌ Aucun texte à vectoriser")
                 self.use_faiss = False
                 self._initialize_tfidf()
+                return
+            
+            metadata = self.load_index(self.index_path, self.metadata_path)
+            
+            # En mode 'auto', le type d'index suit la taille du corpus
+            n_texts = sum(len(entry['texts']) for entry in qa_entries.values())
+            expected_kind = index_factory.resolve_index_mode(self.index_mode, n_texts, self.target_recall)
+            if metadata is not None and metadata['index_kind'] != expected_kind:
+                print(f"🔄 Type d'index adapté au corpus: {metadata['index_kind']} -> {expected_kind}")
+                metadata = None
+            
+            # Index construit avec un autre backend: réutilisable seulement si les embeddings concordent
+            if metadata is not None and metadata['index_encoder'] != self.encoder_backend:
+                if not self._encoder_matches_index(metadata, qa_entries):
+                    metadata = None
+            
+            if metadata is not None:
+                changed = self._sync_index(metadata, qa_entries)
+            else:
+                self._build_full_index(qa_entries)
+                changed = True
+            
+            self._rebuild_mapping(qa_entries)
+            if changed:
+                self.save_index(self.index_path, self.metadata_path)
+            
+            print(f"✅ FAISS initialisé avec {len(self.texts)} embeddings")
+            
+            if self.hybrid:
+                self._initialize_bm25()
                 
         except Exception as e:
             print(f"❌ Erreur initialisation FAISS: {e}")
             self.use_faiss = False
             self._initialize_tfidf()
     
+    def _qa_key(self, qa, position, duplicate_ids=()):
+        """
+        Clé stable d'une Q&A dans les métadonnées de l'index
+        
+        Son identifiant, ou sa position s'il manque ou s'il est partagé par
+        plusieurs Q&A (sinon elles seraient fusionnées en une seule entrée)
+        """
+        if 'id' not in qa or str(qa['id']) in duplicate_ids:
+            return f"pos-{position}"
+        return str(qa['id'])
+    
+    def _qa_content_hash(self, qa):
+        """Empreinte des textes encodés d'une Q&A (question, variations, modèle)"""
+        payload = json.dumps({
+            'question': qa.get('question_principale', ''),
+            'variations': qa.get('variations', []),
+            'model': self.model_name
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _collect_qa_entries(self):
+        """Regroupe par Q&A les textes à encoder et leur empreinte"""
+        qa_pairs = self.knowledge_base['qa_pairs']
+        id_counts = Counter(str(qa['id']) for qa in qa_pairs if 'id' in qa)
+        duplicate_ids = {qa_id for qa_id, count in id_counts.items() if count > 1}
+        if duplicate_ids:
+            print(f"⚠️ Identifiants de Q&A en double ({', '.join(sorted(duplicate_ids))}): "
+                  f"ces Q&A sont indexées par position")
+        
+        qa_entries = {}
+        for position, qa in enumerate(qa_pairs):
+            texts = [qa['question_principale']] + list(qa.get('variations', []))
+            types = ['main'] + ['variation'] * (len(texts) - 1)
+            qa_entries[self._qa_key(qa, position, duplicate_ids)] = {
+                'position': position,
+                'hash': self._qa_content_hash(qa),
+                'texts': texts,
+                'types': types,
+                'ids': []
+            }
+        return qa_entries
+    
+    def _encoder_matches_index(self, metadata, qa_entries, sample_size=32):
+        """
+        Compare l'encodeur courant aux vecteurs stockés pour des textes inchangés
+        
+        Returns:
+            True si l'accord cosinus minimal atteint encoder_agreement_threshold
+            (ou si les vecteurs stockés ne sont pas reconstructibles)
+        """
+        samples = []
+        for key, entry in qa_entries.items():
+            stored = metadata['qa_entries'].get(key)
+            if stored is not None and stored['hash'] == entry['hash']:
+                samples.extend(zip(entry['texts'], stored['ids']))
+        samples = samples[:sample_size]
+        if not samples:
+            return True
+        
+        try:
+            stored_vectors = np.vstack([self.index.reconstruct(int(vector_id)) for _, vector_id in samples])
+        except Exception as e:
+            print(f"⚠️ Accord des encodeurs non vérifiable ({self.index_kind}): {e}")
+            return True
+        
+        agreement = cosine_agreement(self._encode_normalized([text for text, _ in samples]), stored_vectors)
+        print(f"📐 Accord {self.encoder_backend} / {metadata['index_encoder']}: "
+              f"cosinus moyen {agreement['mean']:.4f}, min {agreement['min']:.4f}")
+        if agreement['min'] < self.encoder_agreement_threshold:
+            print(f"🔄 Encodeur {self.encoder_backend} incompatible avec l'index, reconstruction")
+            return False
+        return True
+    
+    def _encode_normalized(self, texts):
+        """Encode des textes et normalise les vecteurs pour la similarité cosinus"""
+        embeddings = self.model.encode(texts, convert_to_numpy=True).astype('float32')
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _encode_queries(self, queries):
+        """Embeddings normalisés des requêtes, via le cache (seules les nouvelles sont encodées)"""
+        model_id = f"{self.encoder_backend}:{self.model_name}"
+        return self.embedding_cache.get_or_compute(model_id, list(queries), self._encode_normalized)
+    
+    def _build_full_index(self, qa_entries):
+        """Encode toute la base et crée un index FAISS à identifiants"""
+        all_texts = []
+        for entry in qa_entries.values():
+            entry['ids'] = list(range(len(all_texts), len(all_texts) + len(entry['texts'])))
+            all_texts.extend(entry['texts'])
+        
+        embeddings = self._encode_normalized(all_texts)
+        self.index_kind = index_factory.resolve_index_mode(self.index_mode, len(all_texts), self.target_recall)
+        self.index_encoder = self.encoder_backend
+        base_index = index_factory.create_index(self.index_kind, embeddings.shape[1], 'ip', embeddings,
+                                  self.pca_dim, target_recall=self.target_recall)
+        self.index = faiss.IndexIDMap2(base_index)
+        self.index.add_with_ids(embeddings, np.arange(len(all_texts), dtype='int64'))
+        self.next_id = len(all_texts)
+        print(f"🔨 Index FAISS construit ({self.index_kind}): {len(all_texts)} textes encodés "
+              f"{index_factory.get_search_params(self.index) or ''}")
+    
+    def _sync_index(self, metadata, qa_entries):
+        """
+        Applique à l'index chargé le delta avec la base de connaissances actuelle
+        
+        Returns:
+            True si l'index a été modifié
+        """
+        stored_entries = metadata['qa_entries']
+        self.next_id = metadata['next_id']
+        
+        ids_to_remove = []
+        keys_to_encode = []
+        for key, entry in qa_entries.items():
+            stored = stored_entries.get(key)
+            if stored is not None and stored['hash'] == entry['hash']:
+                entry['ids'] = list(stored['ids'])
+            else:
+                if stored is not None:
+                    ids_to_remove.extend(stored['ids'])
+                keys_to_encode.append(key)
+        
+        for key, stored in stored_entries.items():
+            if key not in qa_entries:
+                ids_to_remove.extend(stored['ids'])
+        
+        if not ids_to_remove and not keys_to_encode:
+            print("✅ Index FAISS à jour")
+            return False
+        
+        if ids_to_remove and not index_factory.supports_removal(self.index):
+            print(f"🔄 Index {self.index_kind} sans suppression possible, reconstruction complète")
+            self._build_full_index(qa_entries)
+            return True
+        
+        if ids_to_remove:
+            self.index.remove_ids(np.array(ids_to_remove, dtype='int64'))
+        
+        texts_to_encode = []
+        for key in keys_to_encode:
+            entry = qa_entries[key]
+            entry['ids'] = list(range(self.next_id, self.next_id + len(entry['texts'])))
+            self.next_id += len(entry['texts'])
+            texts_to_encode.extend(entry['texts'])
+        
+        if texts_to_encode:
+            embeddings = self._encode_normalized(texts_to_encode)
+            new_ids = np.array([i for key in keys_to_encode for i in qa_entries[key]['ids']], dtype='int64')
+            self.index.add_with_ids(embeddings, new_ids)
+        
+        print(f"🔄 Index FAISS mis à jour: {len(texts_to_encode)} textes encodés, "
+              f"{len(ids_to_remove)} retirés")
+        return True
+    
+    def _rebuild_mapping(self, qa_entries):
+        """Reconstruit textes et références depuis la base actuelle"""
+        self.qa_entries = qa_entries
+        self.texts = []
+        self.qa_mapping = []
+        self.vector_ids = []
+        self.qa_positions = []
+        
+        for entry in qa_entries.values():
+            qa = self.knowledge_base['qa_pairs'][entry['position']]
+            for text, text_type, vector_id in zip(entry['texts'], entry['types'], entry['ids']):
+                self.texts.append(text)
+                self.qa_mapping.append({
+                    'type': text_type,
+                    'qa_data': qa
+                })
+                self.vector_ids.append(vector_id)
+                self.qa_positions.append(entry['position'])
+        
+        self.id_to_position = {vector_id: position for position, vector_id in enumerate(self.vector_ids)}
+    
+    def _initialize_bm25(self):
+        """Index lexical BM25 sur les mêmes textes que l'index FAISS (mode hybride)"""
+        self.bm25 = BM25Index(self.texts)
+        self.lexical_aggregator = score_aggregation.QaScoreAggregator(self.qa_positions)
+        # Les résultats denses portent la Q&A elle-même: retrouver sa position pour la fusion
+        self._qa_position_by_id = {id(qa): position for position, qa in enumerate(self.knowledge_base['qa_pairs'])}
+        self._dense_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dense-search")
+        print(f"✅ BM25 initialisé avec {len(self.bm25.postings)} termes (recherche hybride)")
+    
     def _initialize_tfidf(self):
-        """Initialise TF-IDF (fallback)"""
-        self.vectorizer = TfidfVectorizer(stop_words=None)
+        """Initialise TF-IDF (fallback), rechargé depuis l'artefact persistant si à jour"""
+        self.vectorizer = sklearn_text.TfidfVectorizer(stop_words=None)
         
         # Préparer les textes pour TF-IDF
         texts_to_vectorize = []
+        ref_qa = []
         self.qa_references = []
         
-        for qa in self.knowledge_base['qa_pairs']:
+        for qa_position, qa in enumerate(self.knowledge_base['qa_pairs']):
             # Question principale
             question_text = self.preprocess_text(qa['question_principale'])
             if question_text:
                 texts_to_vectorize.append(question_text)
+                ref_qa.append(qa_position)
                 self.qa_references.append({
                     'type': 'main',
                     'qa_data': qa
@@ -140,13 +375,18 @@ class UnifiedRetrievalSystem:
                 variation_text = self.preprocess_text(variation)
                 if variation_text:
                     texts_to_vectorize.append(variation_text)
+                    ref_qa.append(qa_position)
                     self.qa_references.append({
                         'type': 'variation',
                         'qa_data': qa
                     })
         
         if texts_to_vectorize:
-            self.qa_vectors = self.vectorizer.fit_transform(texts_to_vectorize)
+            ref_type = [tfidf_index.ref_type_code(ref['type']) for ref in self.qa_references]
+            artifact = tfidf_index.load_or_build_tfidf_index(self.tfidf_index_path, texts_to_vectorize, ref_qa, ref_type)
+            self.vectorizer = artifact.vectorizer
+            self.qa_vectors = artifact.matrix
+            self.qa_aggregator = score_aggregation.QaScoreAggregator(artifact.ref_qa)
             print(f"✅ TF-IDF initialisé avec {len(texts_to_vectorize)} questions")
         else:
             self.qa_vectors = None
@@ -167,84 +407,366 @@ class UnifiedRetrievalSystem:
         else:
             return self._search_tfidf(query, top_k, confidence_threshold)
     
+    def search_batch(self, queries, top_k=3, confidence_threshold=0.1):
+        """
+        Recherche groupée: un seul encodage et une seule recherche matricielle
+        
+        Args:
+            queries: Liste de requêtes
+            top_k: Nombre de résultats par requête
+            confidence_threshold: Score minimum
+            
+        Returns:
+            Une liste de résultats par requête, dans le même ordre
+        """
+        if not queries:
+            return []
+        if self.use_faiss:
+            return self._search_faiss_batch(queries, top_k, confidence_threshold)
+        else:
+            return self._search_tfidf_batch(queries, top_k, confidence_threshold)
+    
+    def search_passages(self, query, qa_ids=None, top_k=3):
+        """Sections de réponses les plus pertinentes (limitées éventuellement à certaines Q&A)"""
+        return self.passage_index.search(query, qa_ids, top_k)
+    
+    def get_index_info(self):
+        """Type d'index construit et paramètres de recherche actuels"""
+        if not self.use_faiss or not hasattr(self, 'index'):
+            return {'backend': 'tfidf'}
+        return {
+            'backend': 'faiss',
+            'index_mode': self.index_mode,
+            'index_kind': self.index_kind,
+            'encoder_backend': self.encoder_backend,
+            'ntotal': int(self.index.ntotal),
+            'search_params': index_factory.get_search_params(self.index),
+        }
+    
+    def set_search_params(self, nprobe=None, ef_search=None, persist=False):
+        """
+        Ajuste le compromis rappel / latence à chaud
+        
+        Args:
+            nprobe: Listes IVF sondées (index 'ivf')
+            ef_search: Taille de la file de recherche HNSW (index 'hnsw')
+            persist: Sauvegarde les paramètres avec l'index
+        """
+        if not self.use_faiss or not hasattr(self, 'index'):
+            return {}
+        
+        params = {}
+        if nprobe is not None and self.index_kind == 'ivf':
+            params['nprobe'] = int(nprobe)
+        if ef_search is not None and self.index_kind == 'hnsw':
+            params['efSearch'] = int(ef_search)
+        index_factory.apply_search_params(self.index, params)
+        
+        if persist:
+            self.save_index(self.index_path, self.metadata_path)
+        return index_factory.get_search_params(self.index)
+    
+    def benchmark_index_modes(self, modes=None, k=3):
+        """
+        Rappel@k et latence de chaque mode d'index compressé
+        
+        Les variations de la base servent de requêtes étiquetées: chacune doit retrouver
+        sa Q&A parmi les autres textes indexés (elle-même est exclue des résultats).
+        
+        Returns:
+            Le rapport (une ligne par mode), aussi affiché sous forme de tableau
+        """
+        if not self.use_faiss:
+            print("⚠️ Benchmark indisponible sans FAISS")
+            return []
+        
+        vectors = self._encode_normalized(self.texts)
+        query_rows = [row for row, ref in enumerate(self.qa_mapping) if ref['type'] == 'variation']
+        report = index_factory.benchmark_index_modes(
+            vectors,
+            vectors[query_rows],
+            query_labels=[self.qa_positions[row] for row in query_rows],
+            vector_labels=self.qa_positions,
+            modes=modes or index_factory.INDEX_MODES,
+            k=k,
+            metric='ip',
+            query_rows=query_rows,
+            pca_dim=self.pca_dim
+        )
+        print(f"📊 Benchmark des index ({len(vectors)} vecteurs, {len(query_rows)} variations):")
+        index_factory.print_benchmark_report(report)
+        return report
+    
+    def enable_query_batching(self, window_ms=5.0, max_batch_size=32):
+        """Regroupe les recherches FAISS concurrentes en lots (une passe d'encodage par lot)"""
+        if self.query_batcher is not None:
+            self.query_batcher.close()
+        self.query_batcher = QueryBatcher(self._search_faiss_batch, window_ms, max_batch_size)
+        print(f"⚡ Micro-batching activé: fenêtre {window_ms} ms, lots de {max_batch_size} max")
+    
+    def disable_query_batching(self):
+        """Revient à un encodage par requête"""
+        if self.query_batcher is not None:
+            self.query_batcher.close()
+            self.query_batcher = None
+    
+    def get_batching_metrics(self):
+        """Métriques du micro-batching (taille des lots, délais d'attente)"""
+        if self.query_batcher is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.query_batcher.get_metrics()}
+    
+    def embed_queries(self, queries):
+        """Embeddings normalisés de questions (None sans encodeur, en mode TF-IDF)"""
+        if not self.use_faiss:
+            return None
+        return self._encode_queries(queries)
+    
+    def get_embedding_cache_stats(self):
+        """Compteurs du cache d'embeddings de requêtes (succès, échecs, évictions)"""
+        return self.embedding_cache.get_stats()
+    
     def _search_faiss(self, query, top_k, confidence_threshold):
         """Recherche avec FAISS"""
+        if self.query_batcher is not None:
+            return self.query_batcher.search(query, top_k, confidence_threshold)
+        return self._search_faiss_batch([query], top_k, confidence_threshold)[0]
+    
+    def _search_faiss_batch(self, queries, top_k, confidence_threshold):
+        """Recherche FAISS groupée"""
         if not hasattr(self, 'index') or self.index.ntotal == 0:
-            return []
+            return [[] for _ in queries]
+        
+        if self.bm25 is not None:
+            return self._search_hybrid_batch(queries, top_k, confidence_threshold)
         
         try:
-            # Générer l'embedding de la requête
-            query_embedding = self.model.encode([query], convert_to_numpy=True)
+            # Générer les embeddings normalisés des requêtes en une passe
+            query_embeddings = self._encode_queries(queries)
+            return self._search_embeddings(query_embeddings, top_k, confidence_threshold)
             
-            # Normaliser pour similarité cosinus
-            faiss.normalize_L2(query_embedding)
+        except Exception as e:
+            print(f"⚠️ Erreur recherche FAISS: {e}, utilisation TF-IDF")
+            return self._search_tfidf_batch(queries, top_k, confidence_threshold)
+    
+    def _search_embeddings(self, query_embeddings, top_k, confidence_threshold):
+        """
+        Recherche dans l'index FAISS pour des embeddings de requêtes déjà normalisés
+        
+        Demande top_k × m voisins et les regroupe par Q&A distincte; m n'est doublé
+        que pour les requêtes qui n'ont pas encore top_k Q&A distinctes.
+        """
+        n_vectors = len(self.texts)
+        batch_results = [[] for _ in range(len(query_embeddings))]
+        pending = list(range(len(query_embeddings)))
+        oversample = self.oversample_factor
+        
+        while pending:
+            k = min(top_k * oversample, n_vectors)
+            scores, indices = self.index.search(query_embeddings[pending], k)
             
-            # Recherche
-            scores, indices = self.index.search(query_embedding, min(top_k, len(self.texts)))
+            still_pending = []
+            for query_row, row_scores, row_ids in zip(pending, scores, indices):
+                results, exhausted = self._collapse_hits(row_scores, row_ids, top_k, confidence_threshold)
+                batch_results[query_row] = results
+                if len(results) < top_k and not exhausted and k < n_vectors:
+                    still_pending.append(query_row)
             
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.texts) and score >= confidence_threshold:
-                    qa_ref = self.qa_mapping[idx]
-                    results.append({
-                        'qa_data': qa_ref['qa_data'],
-                        'score': float(score),
-                        'match_type': qa_ref['type'],
-                        'matched_text': self.texts[idx]
-                    })
+            pending = still_pending
+            oversample *= 2
+        
+        return batch_results
+    
+    def _collapse_hits(self, row_scores, row_ids, top_k, confidence_threshold):
+        """
+        Regroupe des voisins triés par score en Q&A distinctes (meilleur texte de chaque Q&A)
+        
+        Returns:
+            (résultats, True si un score sous le seuil a été atteint)
+        """
+        results = []
+        seen_qa = set()
+        for score, vector_id in zip(row_scores, row_ids):
+            if score < confidence_threshold:
+                return results, True
+            position = self.id_to_position.get(int(vector_id))
+            if position is None or self.qa_positions[position] in seen_qa:
+                continue
+            seen_qa.add(self.qa_positions[position])
+            qa_ref = self.qa_mapping[position]
+            results.append({
+                'qa_data': qa_ref['qa_data'],
+                'score': float(score),
+                'match_type': qa_ref['type'],
+                'matched_text': self.texts[position]
+            })
+            if len(results) == top_k:
+                break
+        return results, False
+    
+    def _search_dense_candidates(self, queries, candidate_k):
+        """Candidats denses sans seuil, pour la fusion hybride"""
+        query_embeddings = self._encode_queries(queries)
+        return self._search_embeddings(query_embeddings, candidate_k, -1.0)
+    
+    def _search_hybrid_batch(self, queries, top_k, confidence_threshold):
+        """
+        Recherche hybride: FAISS et BM25 en parallèle, fusionnés par Reciprocal Rank Fusion
+        
+        Chaque Q&A reçoit sum(1 / (rrf_k + rang)) sur les deux listes de candidats;
+        ce 'rrf_score' ne sert qu'à l'ordre des résultats.
+        
+        Le 'score' exposé (seuils Gemini / tontine, confiance affichée) part du cosinus
+        dense, sur la même échelle qu'en mode FAISS seul. Une Q&A trouvée uniquement
+        par BM25 n'est pas parmi les candidats denses: son cosinus est au plus celui du
+        dernier candidat dense, son score est donc min(similarité lexicale, ce plancher).
+        Sans recherche dense (erreur FAISS), le score est la similarité lexicale.
+        
+        Accord lexical: la première Q&A de BM25 reçoit au moins son avance de similarité
+        lexicale sur la Q&A lexicale suivante ('lexical_margin'). Un terme exact propre
+        à une seule Q&A ("UEMOA") la rend décisive; un terme partagé n'apporte rien.
+        """
+        candidate_k = max(top_k, self.hybrid_candidates)
+        dense_future = self._dense_executor.submit(self._search_dense_candidates, queries, candidate_k)
+        
+        bm25_scores, lexical_similarity = self.bm25.score_batch(list(queries))
+        lexical_batch = self.lexical_aggregator.top_k(bm25_scores, candidate_k, 1e-9)
+        
+        try:
+            dense_batch = dense_future.result()
+        except Exception as e:
+            print(f"⚠️ Erreur recherche FAISS: {e}, utilisation BM25 seul")
+            dense_batch = [[] for _ in queries]
+        
+        batch_results = []
+        for dense_results, lexical_matches, similarity in zip(dense_batch, lexical_batch, lexical_similarity):
+            fused = {}
+            dense_floor = min((result['score'] for result in dense_results), default=None)
             
-            return results
+            for rank, result in enumerate(dense_results, start=1):
+                position = self._qa_position_by_id[id(result['qa_data'])]
+                fused[position] = {
+                    'qa_data': result['qa_data'],
+                    'rrf_score': 1.0 / (self.rrf_k + rank),
+                    'dense_score': result['score'],
+                    'lexical_score': 0.0,
+                    'dense_candidate': True,
+                    'match_type': result['match_type'],
+                    'matched_text': result['matched_text']
+                }
             
-        except Exception as e:
-            print(f"⚠️ Erreur recherche FAISS: {e}, utilisation TF-IDF")
-            return self._search_tfidf(query, top_k, confidence_threshold)
+            lexical_rows = [row for _, _, row in lexical_matches]
+            lexical_margin = 0.0
+            if lexical_rows:
+                runner_up = float(similarity[lexical_rows[1]]) if len(lexical_rows) > 1 else 0.0
+                lexical_margin = float(similarity[lexical_rows[0]]) - runner_up
+            
+            for rank, (position, _, row) in enumerate(lexical_matches, start=1):
+                entry = fused.setdefault(position, {
+                    'qa_data': self.qa_mapping[row]['qa_data'],
+                    'rrf_score': 0.0,
+                    'dense_score': 0.0,
+                    'dense_candidate': False,
+                    'match_type': self.qa_mapping[row]['type'],
+                    'matched_text': self.texts[row]
+                })
+                entry['rrf_score'] += 1.0 / (self.rrf_k + rank)
+                entry['lexical_score'] = float(similarity[row])
+                entry['lexical_margin'] = lexical_margin if rank == 1 else 0.0
+            
+            results = []
+            for entry in sorted(fused.values(), key=lambda e: e['rrf_score'], reverse=True):
+                if entry['dense_candidate']:
+                    entry['score'] = entry['dense_score']
+                elif dense_floor is None:
+                    entry['score'] = entry['lexical_score']
+                else:
+                    entry['score'] = max(0.0, min(entry['lexical_score'], dense_floor))
+                entry['score'] = max(entry['score'], entry.get('lexical_margin', 0.0))
+                if entry['score'] >= confidence_threshold:
+                    results.append(entry)
+                if len(results) == top_k:
+                    break
+            batch_results.append(results)
+        
+        return batch_results
     
     def _search_tfidf(self, query, top_k, confidence_threshold):
         """Recherche avec TF-IDF"""
-        if self.qa_vectors is None or self.qa_vectors.shape[0] == 0:
-            return []
+        return self._search_tfidf_batch([query], top_k, confidence_threshold)[0]
+    
+    def _search_tfidf_batch(self, queries, top_k, confidence_threshold):
+        """Recherche TF-IDF groupée: une transformation et un produit matriciel"""
+        if getattr(self, 'qa_vectors', None) is None or self.qa_vectors.shape[0] == 0:
+            return [[] for _ in queries]
         
         try:
-            query_vec = self.vectorizer.transform([self.preprocess_text(query)])
-            similarities = cosine_similarity(query_vec, self.qa_vectors)
+            query_vecs = self.vectorizer.transform([self.preprocess_text(query) for query in queries])
+            similarities = sklearn_pairwise.cosine_similarity(query_vecs, self.qa_vectors)
             
-            top_indices = np.argsort(similarities[0])[-top_k:][::-1]
-            
-            results = []
-            for idx in top_indices:
-                score = similarities[0][idx]
-                if score >= confidence_threshold:
-                    qa_ref = self.qa_references[idx]
-                    
-                    # Éviter les doublons
-                    qa_id = qa_ref['qa_data'].get('id')
-                    if not any(r['qa_data'].get('id') == qa_id for r in results):
-                        results.append({
-                            'qa_data': qa_ref['qa_data'],
-                            'score': float(score),
-                            'match_type': qa_ref['type']
-                        })
+            # Meilleur score par Q&A (question ou variation), top-k sans doublons
+            batch_results = []
+            for matches in self.qa_aggregator.top_k(similarities, top_k, confidence_threshold):
+                results = []
+                for _, score, row in matches:
+                    qa_ref = self.qa_references[row]
+                    results.append({
+                        'qa_data': qa_ref['qa_data'],
+                        'score': score,
+                        'match_type': qa_ref['type']
+                    })
+                batch_results.append(results)
             
-            return results
+            return batch_results
             
         except Exception as e:
             print(f"⚠️ Erreur recherche TF-IDF: {e}")
-            return []
+            return [[] for _ in queries]
 
-    def save_index(self, index_path="unified_faiss_index.bin", metadata_path="unified_faiss_metadata.pkl"):
-        """Sauvegarde l'index FAISS et les métadonnées"""
+    def save_index(self, index_path="unified_faiss_index.bin", metadata_path="unified_faiss_metadata.zpc"):
+        """
+        Sauvegarde l'index FAISS et les métadonnées colonnaires (empreintes par Q&A)
+        
+        Les deux fichiers sont écrits dans des fichiers temporaires puis renommés
+        atomiquement. Les métadonnées portent l'empreinte du fichier d'index: un arrêt
+        entre les deux renommages est détecté au chargement (index reconstruit).
+        """
         if hasattr(self, 'index') and self.use_faiss and FAISS_AVAILABLE:
+            tmp_index_path = temporary_path(index_path)
             try:
-                faiss.write_index(self.index, index_path)
+                faiss.write_index(self.index, tmp_index_path)
                 
-                # Sauvegarder les métadonnées
-                metadata = {
-                    'texts': self.texts,
-                    'qa_mapping': self.qa_mapping,
-                    'knowledge_base_path': self.knowledge_base_path
-                }
-                with open(metadata_path, 'wb') as f:
-                    pickle.dump(metadata, f)
+                # Métadonnées: une ligne par Q&A, identifiants des vecteurs en tableaux entiers
+                qa_keys = list(self.qa_entries)
+                id_offsets = np.cumsum([0] + [len(self.qa_entries[key]['ids']) for key in qa_keys])
+                ColumnarStore.write(
+                    metadata_path,
+                    string_columns={
+                        'qa_key': qa_keys,
+                        'qa_hash': [self.qa_entries[key]['hash'] for key in qa_keys],
+                    },
+                    int_columns={
+                        'qa_id_offsets': id_offsets,
+                        'qa_vector_ids': [i for key in qa_keys for i in self.qa_entries[key]['ids']],
+                        'vector_ids': self.vector_ids,
+                        'vector_qa': [self.qa_entries[key]['position'] for key in qa_keys
+                                      for _ in self.qa_entries[key]['ids']],
+                        'vector_type': [0 if t == 'main' else 1 for key in qa_keys
+                                        for t in self.qa_entries[key]['types']],
+                    },
+                    attributes={
+                        'format_version': self.INDEX_FORMAT_VERSION,
+                        'model_name': self.model_name,
+                        'index_mode': self.index_mode,
+                        'index_kind': self.index_kind,
+                        'index_encoder': self.index_encoder,
+                        'search_params': index_factory.get_search_params(self.index),
+                        'next_id': self.next_id,
+                        'knowledge_base_path': self.knowledge_base_path,
+                        'index_checksum': self._file_checksum(tmp_index_path)
+                    }
+                )
+                os.replace(tmp_index_path, index_path)
                 
                 print(f"💾 Index Unified sauvegardé: {index_path}")
                 return True
@@ -252,24 +774,72 @@ class UnifiedRetrievalSystem:
             except Exception as e:
                 print(f"❌ Erreur sauvegarde index: {e}")
                 return False
+            finally:
+                if os.path.exists(tmp_index_path):
+                    os.remove(tmp_index_path)
         return False
+    
+    @staticmethod
+    def _file_checksum(path):
+        """Empreinte SHA-256 d'un fichier (lu par blocs)"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()[:16]
 
-    def load_index(self, index_path="unified_faiss_index.bin", metadata_path="unified_faiss_metadata.pkl"):
-        """Charge l'index FAISS et les métadonnées"""
+    def load_index(self, index_path="unified_faiss_index.bin", metadata_path="unified_faiss_metadata.zpc"):
+        """
+        Charge l'index FAISS et les métadonnées
+        
+        Returns:
+            Les métadonnées si l'index est réutilisable, None sinon
+        """
         if self.use_faiss and FAISS_AVAILABLE and os.path.exists(index_path) and os.path.exists(metadata_path):
             try:
-                self.index = faiss.read_index(index_path)
+                store = ColumnarStore.open(metadata_path)
+                attributes = store.attributes
                 
-                with open(metadata_path, 'rb') as f:
-                    metadata = pickle.load(f)
-                    self.texts = metadata['texts']
-                    self.qa_mapping = metadata['qa_mapping']
+                if attributes.get('format_version') != self.INDEX_FORMAT_VERSION:
+                    print("🔄 Index Unified au format obsolète, reconstruction")
+                    return None
                 
-                print(f"✅ Index Unified chargé: {len(self.texts)} embeddings")
-                return True
+                if attributes.get('model_name') != self.model_name:
+                    print("🔄 Modèle d'embedding modifié, reconstruction de l'index")
+                    return None
+                
+                if attributes.get('index_mode', 'flat') != self.index_mode:
+                    print(f"🔄 Mode d'index modifié ({self.index_mode}), reconstruction de l'index")
+                    return None
+                
+                if attributes.get('index_checksum') != self._file_checksum(index_path):
+                    print("🔄 Index et métadonnées désynchronisés (sauvegarde interrompue), reconstruction")
+                    return None
+                
+                id_offsets = store.int_column('qa_id_offsets')
+                vector_ids = store.int_column('qa_vector_ids')
+                qa_entries = {}
+                for row in range(len(store)):
+                    qa_entries[store.get('qa_key', row)] = {
+                        'hash': store.get('qa_hash', row),
+                        'ids': [int(i) for i in vector_ids[id_offsets[row]:id_offsets[row + 1]]]
+                    }
+                
+                self.index = faiss.read_index(index_path)
+                self.index_kind = attributes.get('index_kind', 'flat')
+                self.index_encoder = attributes.get('index_encoder', 'torch')
+                index_factory.apply_search_params(self.index, attributes.get('search_params', {}))
+                print(f"✅ Index Unified chargé ({self.index_kind}): {self.index.ntotal} embeddings")
+                return {
+                    'index_kind': self.index_kind,
+                    'index_encoder': self.index_encoder,
+                    'format_version': attributes['format_version'],
+                    'model_name': attributes['model_name'],
+                    'next_id': attributes['next_id'],
+                    'qa_entries': qa_entries
+                }
                 
             except Exception as e:
                 print(f"❌ Erreur chargement index: {e}")
-                return False
-        return False
-        
+                return None
+        return None